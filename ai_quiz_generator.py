@@ -1,8 +1,627 @@
-def generate_quiz(subject, num_questions, difficulty):
+import re
+import json
+import time
+import random
+import asyncio
+import logging
+import weakref
+import functools
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from metrics import metrics
+from generation_cache import GenerationCache
+from rate_limiter import LLMConcurrencyController
+from structured_logging import log_payload, payload_logger
+
+logger = logging.getLogger(__name__)
+payload_log = payload_logger(__name__)
+
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+@functools.cache
+def _httpx():
+    # Imported on the first async generation rather than at worker startup
+    try:
+        import httpx
+    except ImportError:  # agenerate_questions falls back to a thread per call
+        return None
+    return httpx
+
+
+async def _close_with_loop(client):
+    try:
+        yield
+    finally:
+        await client.aclose()
+
+
+class QuizGenerator:
+    def __init__(self, cache=None, limiter=None, pool_size=4, max_retries=2):
+        self.api_url = "http://localhost:11434/api/generate"
+        self.model = "mistral"
+        self.temperature = 0.7
+        self.connect_timeout = 5
+        self.read_timeout = 180
+        self.max_questions = 20  # Per prompt; larger requests go through generate_questions_fanout
+        self.max_fanout_questions = 100
+        self.fanout_threshold = 10  # Requests above this many questions are fanned out
+        self.fanout_chunk_size = 5
+        self.fanout_workers = 4
+        self.fanout_rounds = 2  # Extra rounds allowed for re-requesting a shortfall
+        self.max_retries = max_retries
+        self.retry_backoff = 0.5
+        self.cache = cache  # Optional GenerationCache
+        # Shared admission control for the model server (rate + max in-flight calls)
+        self.limiter = limiter or LLMConcurrencyController()
+        self._session = None  # requests.Session, built on first use
+        self._session_lock = threading.Lock()
+        self._async_clients = weakref.WeakKeyDictionary()  # event loop -> (httpx.AsyncClient, closer)
+        self._pool_size = pool_size
+        self._fanout_executor = None  # Built on first fan-out, sized to the limiter
+        self._fanout_lock = threading.Lock()
+
+    def init_app(self, app):
+        config = app.config
+        self.api_url = config.get('LLM_API_URL', self.api_url)
+        self.model = config.get('LLM_MODEL', self.model)
+        self.connect_timeout = config.get('LLM_CONNECT_TIMEOUT', self.connect_timeout)
+        self.read_timeout = config.get('LLM_READ_TIMEOUT', self.read_timeout)
+        self.max_retries = config.get('LLM_MAX_RETRIES', self.max_retries)
+        self._pool_size = config.get('LLM_POOL_SIZE', self._pool_size)
+        self._session = None
+        self.max_fanout_questions = config.get('LLM_MAX_FANOUT_QUESTIONS', self.max_fanout_questions)
+        self.fanout_chunk_size = config.get('LLM_FANOUT_CHUNK_SIZE', self.fanout_chunk_size)
+        self.fanout_threshold = config.get('LLM_FANOUT_THRESHOLD', self.fanout_threshold)
+        self.fanout_workers = config.get('LLM_FANOUT_WORKERS', self.fanout_workers)
+
+        # Reuse earlier generations for identical topic/difficulty/type/count requests
+        self.cache = GenerationCache(
+            max_entries=config['GENERATION_CACHE_SIZE'],
+            ttl=config['GENERATION_CACHE_TTL'],
+            db_path=config['GENERATION_CACHE_PATH']
+        )
+        # One admission controller for every call to the model server
+        self.limiter = LLMConcurrencyController(
+            rate=config['LLM_RATE_PER_SECOND'],
+            burst=config['LLM_BURST'],
+            max_in_flight=config['LLM_MAX_IN_FLIGHT'],
+            queue_timeout=config['LLM_QUEUE_TIMEOUT'],
+            lock_dir=config['LLM_LOCK_DIR']
+        )
+
+    @property
+    def fanout_executor(self):
+        if self._fanout_executor is None:
+            with self._fanout_lock:
+                if self._fanout_executor is None:
+                    # More chunks in flight than limiter slots would only sit out the queue timeout
+                    workers = max(1, min(self.fanout_workers, self.limiter.max_in_flight))
+                    self._fanout_executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='quiz-fanout')
+        return self._fanout_executor
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session(self._pool_size, self.max_retries)
+        return self._session
+
+    def _build_session(self, pool_size, max_retries):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Keep-alive connections to the model server, retried with jittered backoff
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # Generation requests are safe to repeat
+            backoff_factor=self.retry_backoff,
+            backoff_jitter=self.retry_backoff,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        return session
+
+    @property
+    def timeouts(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    @contextmanager
+    def _observed_call(self, mode, prompt):
+        # Callers set 'response_bytes' and, for a non-2xx answer, 'outcome'
+        call = {'outcome': 'ok', 'response_bytes': 0}
+        started = time.perf_counter()
+        try:
+            yield call
+        except Exception:
+            call['outcome'] = 'error'
+            raise
+        finally:
+            metrics.llm_duration.observe(time.perf_counter() - started, mode=mode, outcome=call['outcome'])
+            metrics.llm_prompt_bytes.observe(len(prompt.encode('utf-8')), mode=mode)
+            metrics.llm_response_bytes.observe(call['response_bytes'], mode=mode)
+
+    def _build_prompt(self, prompt_data):
+        if not prompt_data.get('topics'):
+            raise ValueError("At least one topic is required")
+
+        question_type = prompt_data.get('type', 'multiple choice').lower()
+        num_questions = min(int(prompt_data.get('num_questions', 1)), self.max_questions)
+        difficulty = prompt_data.get('difficulty', 'medium').lower()
+
+        prompt = f"""Generate exactly {num_questions} {difficulty} difficulty {question_type} questions about {', '.join(prompt_data['topics'])}.
+
+            Format each question as follows:
+            1. Question text?
+            ||CorrectAnswer
+
+            For multiple choice, include options like:
+            1. Question text?
+            A) Option 1
+            B) Option 2
+            C) Option 3
+            D) Option 4
+            ||CorrectLetter
+
+            Return ONLY the questions in this format, one per line.
+            Do NOT include any additional text or explanations."""
+
+        return prompt, num_questions
+
+    def _request_body(self, prompt, stream):
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {"temperature": self.temperature}
+        }
+
+    def _cache_key(self, prompt_data, num_questions):
+        if self.cache is None:
+            return None
+        # 'chunk' keeps identical fan-out sub-prompts from sharing one entry
+        return self.cache.make_key(
+            dict(prompt_data, num_questions=num_questions, chunk=prompt_data.get('chunk', 0)),
+            self.model,
+            self.temperature
+        )
+
+    def _cached_questions(self, prompt_data, cache_key):
+        # 'bypass_cache' skips the lookup but the fresh result still refreshes the entry
+        if cache_key is None or prompt_data.get('bypass_cache'):
+            return None
+        return self.cache.get(cache_key)
+
+    def stream_questions(self, prompt_data):
+        """Yield (question_text, answer) tuples as soon as the model finishes each one.
+
+        Reads Ollama's NDJSON stream and stops reading (closing the connection,
+        which makes Ollama stop generating) once ``num_questions`` valid
+        questions have been parsed. Raises on transport errors and if the
+        stream produced no questions at all.
+        """
+        prompt, num_questions = self._build_prompt(prompt_data)
+        cache_key = self._cache_key(prompt_data, num_questions)
+        cached = self._cached_questions(prompt_data, cache_key)
+        if cached is not None:
+            yield from cached
+            return
+
+        questions = []
+        for question in self._stream_from_model(prompt, num_questions):
+            questions.append(question)
+            yield question
+
+        if not questions:
+            metrics.llm_parse_failures.inc(reason='no_questions')
+            raise ValueError("No valid questions found in response - please try different topics or parameters")
+        if cache_key:
+            self.cache.set(cache_key, questions)
+
+    def _stream_from_model(self, prompt, num_questions):
+        logger.debug("Streaming request to API: %s", self.api_url)
+        parser = IncrementalQuestionParser()
+        emitted = 0
+
+        # The slot is held until the stream is exhausted or closed
+        with self.limiter.slot(), self._observed_call('stream', prompt) as call, self.session.post(
+            self.api_url,
+            json=self._request_body(prompt, stream=True),
+            timeout=self.timeouts,
+            stream=True
+        ) as response:
+            if not response.ok:
+                call['outcome'] = 'http_error'
+            response.raise_for_status()
+
+            for line in response.iter_lines():
+                call['response_bytes'] += len(line)
+                if not line:
+                    continue
+                chunk = json.loads(line)
+                if chunk.get('error'):
+                    raise ValueError(chunk['error'])
+
+                pending = parser.feed(chunk.get('response', ''))
+                if chunk.get('done'):
+                    pending += parser.finish()
+
+                for question in pending:
+                    yield question
+                    emitted += 1
+                    if emitted >= num_questions:
+                        return
+
+                if chunk.get('done'):
+                    break
+
+    def generate_questions(self, prompt_data):
+        try:
+            prompt, num_questions = self._build_prompt(prompt_data)
+            cache_key = self._cache_key(prompt_data, num_questions)
+            cached = self._cached_questions(prompt_data, cache_key)
+            if cached is not None:
+                return cached[:num_questions], None
+
+            logger.debug("Sending request to API: %s", self.api_url)
+            log_payload(payload_log, "Request prompt: %s", prompt)
+
+            with self.limiter.slot(), self._observed_call('sync', prompt) as call:
+                response = self.session.post(
+                    self.api_url,
+                    json=self._request_body(prompt, stream=False),
+                    timeout=self.timeouts
+                )
+                call['response_bytes'] = len(response.content)
+                if not response.ok:
+                    call['outcome'] = 'http_error'
+
+            log_payload(payload_log, "Raw API response %s: %.500s", response.status_code, response.text)
+
+            response.raise_for_status()
+
+            response_data = response.json()
+            questions = self._parse_response(response_data)
+
+            questions = questions[:num_questions]
+            if cache_key:
+                self.cache.set(cache_key, questions)
+            return questions, None
+
+        except Exception as e:
+            logger.error(f"Generation failed: {str(e)}", exc_info=True)
+            return None, str(e)
+
+    def generate_questions_fanout(self, prompt_data, on_progress=None):
+        """Split a large request into small concurrent prompts and merge the results.
+
+        Each sub-prompt asks for ``fanout_chunk_size`` questions (one topic per
+        chunk when ``split_topics`` is set). Duplicates are dropped and only the
+        shortfall is re-requested, for up to ``fanout_rounds`` extra rounds.
+        ``on_progress`` is called with the merged list after every chunk.
+        Returns (questions, error) like generate_questions.
+        """
+        try:
+            if not prompt_data.get('topics'):
+                raise ValueError("At least one topic is required")
+            num_questions = min(int(prompt_data.get('num_questions', 1)), self.max_fanout_questions)
+
+            questions = []
+            seen = set()
+            errors = []
+            for round_number in range(self.fanout_rounds + 1):
+                shortfall = num_questions - len(questions)
+                if shortfall <= 0:
+                    break
+
+                chunks = self._fanout_chunks(prompt_data, shortfall, round_number)
+                futures = [self.fanout_executor.submit(self.generate_questions, chunk) for chunk in chunks]
+                for future in as_completed(futures):
+                    chunk_questions, error = future.result()
+                    if error:
+                        errors.append(error)
+                        continue
+                    for question, answer in chunk_questions:
+                        key = _dedupe_key(question)
+                        if key not in seen and len(questions) < num_questions:
+                            seen.add(key)
+                            questions.append((question, answer))
+                    if on_progress:
+                        on_progress(list(questions))
+
+            if not questions:
+                raise ValueError(errors[0] if errors else "No questions could be generated")
+            if len(questions) < num_questions:
+                logger.warning(f"Fan-out generated {len(questions)} of {num_questions} questions")
+            return questions, None
+
+        except Exception as e:
+            logger.error(f"Fan-out generation failed: {str(e)}", exc_info=True)
+            return None, str(e)
+
+    def _fanout_chunks(self, prompt_data, count, round_number):
+        topics = prompt_data['topics']
+        per_topic = prompt_data.get('split_topics') and len(topics) > 1
+        chunks = []
+        for index, start in enumerate(range(0, count, self.fanout_chunk_size)):
+            chunk = dict(
+                prompt_data,
+                num_questions=min(self.fanout_chunk_size, count - start),
+                chunk=index
+            )
+            if per_topic:
+                chunk['topics'] = [topics[index % len(topics)]]
+            if round_number:
+                # Cached answers for a chunk are what produced the shortfall
+                chunk['bypass_cache'] = True
+            chunks.append(chunk)
+        return chunks
+
+    async def agenerate_questions(self, prompt_data):
+        """Async variant of generate_questions, returning (questions, error).
+
+        Uses a pooled httpx.AsyncClient when httpx is installed so many
+        generations can share one worker; otherwise the blocking session call
+        runs in a thread.
+        """
+        try:
+            prompt, num_questions = self._build_prompt(prompt_data)
+            cache_key = self._cache_key(prompt_data, num_questions)
+            cached = self._cached_questions(prompt_data, cache_key)
+            if cached is not None:
+                return cached[:num_questions], None
+
+            async with self.limiter.aslot():
+                with self._observed_call('async', prompt) as call:
+                    response_data = await self._apost(self._request_body(prompt, stream=False), call)
+            questions = self._parse_response(response_data)[:num_questions]
+
+            if cache_key:
+                self.cache.set(cache_key, questions)
+            return questions, None
+
+        except Exception as e:
+            logger.error(f"Async generation failed: {str(e)}", exc_info=True)
+            return None, str(e)
+
+    async def _apost(self, body, call):
+        httpx = _httpx()
+        if httpx is None:
+            response = await asyncio.to_thread(
+                self.session.post, self.api_url, json=body, timeout=self.timeouts
+            )
+            call['response_bytes'] = len(response.content)
+            if not response.ok:
+                call['outcome'] = 'http_error'
+            response.raise_for_status()
+            return response.json()
+
+        client = await self._async_client()
+        for attempt in range(self.max_retries + 1):
+            last_attempt = attempt == self.max_retries
+            try:
+                response = await client.post(self.api_url, json=body)
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    call['response_bytes'] = len(response.content)
+                    if not response.is_success:
+                        call['outcome'] = 'http_error'
+                    response.raise_for_status()
+                    return response.json()
+            except (httpx.ConnectError, httpx.ReadError, httpx.RemoteProtocolError):
+                if last_attempt:
+                    raise
+            await asyncio.sleep(self.retry_backoff * (2 ** attempt) + random.uniform(0, self.retry_backoff))
+
+    async def _async_client(self):
+        # httpx clients are bound to the event loop they were first used on
+        loop = asyncio.get_running_loop()
+        entry = self._async_clients.get(loop)
+        if entry is None:
+            httpx = _httpx()
+            client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self._pool_size,
+                    max_keepalive_connections=self._pool_size
+                )
+            )
+            # The loop finalizes this generator when it shuts down (asyncio.run does), closing the pool
+            closer = _close_with_loop(client)
+            await closer.__anext__()
+            entry = self._async_clients[loop] = (client, closer)
+        return entry[0]
+
+    async def aclose(self):
+        """Close the running loop's httpx client, for loops that never shut down their async generators"""
+        entry = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if entry:
+            await entry[1].aclose()
+
+    def _parse_response(self, response_data):
+        generated_text = ""
+        if isinstance(response_data, dict):
+            generated_text = response_data.get("response", "")
+            if not isinstance(generated_text, str):
+                logger.warning("Response is not a string but a %s", type(generated_text).__name__)
+                generated_text = str(generated_text)
+        else:
+            logger.warning("Response is not a dictionary but a %s", type(response_data).__name__)
+            generated_text = str(response_data)
+
+        log_payload(payload_log, "Generated text:\n%s", generated_text)
+
+        questions = []
+        question_blocks = []
+
+        if '1.' in generated_text:
+            question_blocks = re.split(r'\n\s*\d+\.', generated_text)
+            question_blocks = [block.strip() for block in question_blocks if block.strip()]
+            if question_blocks and not question_blocks[0].startswith('1.'):
+                question_blocks.pop(0) if not '||' in question_blocks[0] else None
+        else:
+            question_blocks = [block.strip() for block in generated_text.split('\n\n') if block.strip()]
+
+        logger.debug("Found %d potential question blocks", len(question_blocks))
+
+        for block in question_blocks:
+            if '||' in block:
+                parts = block.split('||', 1)
+                question_text = parts[0].strip()
+                answer_text = parts[1].strip()
+
+                # Check for invalid content
+                if '[object Object]' in question_text or '[object Object]' in answer_text:
+                    logger.debug("Skipping invalid block with [object Object]: %.100s", block)
+                    metrics.llm_parse_failures.inc(reason='invalid_block')
+                    continue
+                if not question_text or not answer_text:
+                    logger.debug("Skipping empty question/answer in block: %.100s", block)
+                    metrics.llm_parse_failures.inc(reason='invalid_block')
+                    continue
+
+                questions.append((question_text, answer_text))
+            else:
+                logger.debug("Skipping block without delimiter: %.50s", block)
+
+        if not questions:
+            logger.debug("Trying line-by-line parsing")
+            current_question = []
+            for line in generated_text.split('\n'):
+                line = line.strip()
+                if '||' in line:
+                    parts = line.split('||', 1)
+                    question_part = parts[0].strip()
+                    answer_part = parts[1].strip()
+                    if question_part:
+                        current_question.append(question_part)
+                    if current_question:
+                        question_text = '\n'.join(current_question)
+                        questions.append((question_text, answer_part))
+                        current_question = []
+                else:
+                    if line and line[0].isdigit() and '. ' in line and current_question:
+                        current_question = [line]
+                    elif line:
+                        current_question.append(line)
+            if current_question:
+                logger.debug("Unprocessed lines: %s", current_question)
+
+        if not questions:
+            metrics.llm_parse_failures.inc(reason='no_questions')
+            logger.error("No questions found in generated text. Raw output: " + generated_text[:200])
+            raise ValueError("No valid questions found in response - please try different topics or parameters")
+
+        logger.debug("Parsed %d questions", len(questions))
+        return questions
+
+
+def _dedupe_key(question_text):
+    # Compare on the question stem only, ignoring case, punctuation and spacing
+    stem = question_text.split('\n', 1)[0]
+    return re.sub(r'\W+', ' ', stem).strip().lower()
+
+
+class IncrementalQuestionParser:
+    """Parse ``N. question ... ||answer`` blocks out of text that arrives in pieces.
+
+    ``feed`` returns the (question_text, answer) tuples completed by the new
+    text; a block is complete once the line holding its ``||`` delimiter ends.
     """
-    Generate quiz questions using AI. This is a placeholder function.
-    In a real implementation, you would call your AI model here.
-    
+
+    _numbered_line = re.compile(r'^\d+\.\s*')
+
+    def __init__(self):
+        self._buffer = ''
+        self._current = []
+
+    def feed(self, text):
+        self._buffer += text
+        *lines, self._buffer = self._buffer.split('\n')
+        return [q for q in (self._parse_line(line) for line in lines) if q]
+
+    def finish(self):
+        line, self._buffer = self._buffer, ''
+        question = self._parse_line(line)
+        self._current = []
+        return [question] if question else []
+
+    def _parse_line(self, line):
+        line = line.strip()
+        if not line:
+            return None
+
+        if '||' not in line:
+            if self._numbered_line.match(line):
+                # A new numbered question drops any unterminated previous block
+                self._current = [self._numbered_line.sub('', line, count=1)]
+            else:
+                self._current.append(line)
+            return None
+
+        question_part, answer_text = (part.strip() for part in line.split('||', 1))
+        if question_part:
+            self._current.append(self._numbered_line.sub('', question_part, count=1))
+        question_text = '\n'.join(self._current).strip()
+        self._current = []
+
+        if not question_text or not answer_text or '[object Object]' in question_text + answer_text:
+            metrics.llm_parse_failures.inc(reason='invalid_block')
+            return None
+        return question_text, answer_text
+
+
+# Create instance of QuizGenerator
+quiz_generator = QuizGenerator()
+
+
+def format_questions(questions_tuples):
+    """Convert (question_text, answer) tuples into the dict format used for Quiz questions"""
+    formatted_questions = []
+    for question_text, answer in questions_tuples:
+        # Extract options for multiple choice questions
+        options = []
+
+        # Parse options from question text if it's multiple choice
+        lines = question_text.split('\n')
+
+        # Filter out the first line (the question itself)
+        option_lines = [line for line in lines[1:] if line.strip()]
+
+        # Extract options if they exist
+        if option_lines and any(line.startswith(('A)', 'B)', 'C)', 'D)')) for line in option_lines):
+            for line in option_lines:
+                if line.strip() and any(line.startswith(prefix) for prefix in ['A)', 'B)', 'C)', 'D)']):
+                    options.append(line[2:].strip())  # Remove option letter and parenthesis
+
+        # If we couldn't parse options properly, create dummy options
+        if not options and answer.upper() in ['A', 'B', 'C', 'D']:
+            options = ["Option A", "Option B", "Option C", "Option D"]
+
+        # Create the question object
+        question = {
+            'question': lines[0] if lines else question_text,
+            'options': options,
+            'correct_answer': answer
+        }
+
+        formatted_questions.append(question)
+
+    return formatted_questions
+
+
+def generate_quiz(subject, num_questions, difficulty):
+    """Adapter function to bridge the old and new quiz generation logic
+
     Returns a list of question dictionaries with format:
     {
         'question': 'What is 2+2?',
@@ -10,50 +629,18 @@ def generate_quiz(subject, num_questions, difficulty):
         'correct_answer': '4'
     }
     """
-    # Placeholder - replace with your actual AI quiz generation code
-    questions = []
-    
-    sample_questions = {
-        'math': [
-            {
-                'question': 'What is 2+2?',
-                'options': ['3', '4', '5', '6'],
-                'correct_answer': '4'
-            },
-            {
-                'question': 'What is 5×5?',
-                'options': ['20', '25', '30', '35'],
-                'correct_answer': '25'
-            }
-        ],
-        'science': [
-            {
-                'question': 'What is the chemical symbol for water?',
-                'options': ['H2O', 'CO2', 'O2', 'N2'],
-                'correct_answer': 'H2O'
-            },
-            {
-                'question': 'What is the closest planet to the Sun?',
-                'options': ['Earth', 'Venus', 'Mercury', 'Mars'],
-                'correct_answer': 'Mercury'
-            }
-        ],
-        'literature': [
-            {
-                'question': 'Who wrote "Romeo and Juliet"?',
-                'options': ['Charles Dickens', 'William Shakespeare', 'Jane Austen', 'Mark Twain'],
-                'correct_answer': 'William Shakespeare'
-            },
-            {
-                'question': 'What is the name of the main character in "The Great Gatsby"?',
-                'options': ['Jay Gatsby', 'Nick Carraway', 'Tom Buchanan', 'Daisy Buchanan'],
-                'correct_answer': 'Jay Gatsby'
-            }
-        ]
+    prompt_data = {
+        'topics': [subject],
+        'num_questions': num_questions,
+        'difficulty': difficulty,
+        'type': 'multiple choice'
     }
-    
-    # Get sample questions based on subject or use default
-    subject_questions = sample_questions.get(subject.lower(), sample_questions['math'])
-    
-    # Return requested number of questions (or all available if less)
-    return subject_questions[:min(num_questions, len(subject_questions))]
\ No newline at end of file
+
+    questions_tuples, error = quiz_generator.generate_questions(prompt_data)
+
+    if error or not questions_tuples:
+        logger.error(f"Quiz generation failed: {error}")
+        return []
+
+    # Convert to format expected by the original application
+    return format_questions(questions_tuples)
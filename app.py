@@ -1,40 +1,114 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash, jsonify
+"""ClassQuiz web app.
+
+``create_app`` builds and wires an application; nothing touches the database
+or starts a thread at import time. Routes live on the ``main`` blueprint.
+
+    flask --app app db upgrade     # create/upgrade the schema (explicit deploy step)
+    flask --app app run            # or: gunicorn 'app:create_app()'
+"""
+from flask import Flask, Blueprint, current_app, render_template, request, redirect, url_for, session, flash, jsonify, abort
+from flask import Response, stream_with_context, send_file
 from flask_wtf import FlaskForm
 from wtforms import SelectField, DateTimeField, SubmitField
 from wtforms.validators import DataRequired
 from models import db, User, Quiz, Classroom, Question, QuizResult
-from models import QuizAssignment
+from models import QuizAssignment, QuizResponses, GenerationJob, StudentQuizSummary, StudentSummary, student_classroom
+from generation_jobs import generation_queue, FINISHED_STATUSES
+from ai_quiz_generator import quiz_generator
+from question_bank import create_question_bank
+from write_behind import WriteBehindQueue
+import migrations
+import database
+import structured_logging
+from structured_logging import log_payload, payload_logger
+import student_summary
+from reports import report_engine
+import quiz_authoring
+import bulk_io
+from page_cache import page_cache
+from credentials import credential_service, CredentialServiceBusy
+from grading import grading_pipeline
+from metrics import metrics, CONTENT_TYPE as METRICS_CONTENT_TYPE
+from profiling import request_profiler
+import io
 import os
 import time
 import json
 import logging
-import requests
-import mysql.connector
 from flask_cors import CORS
-from dotenv import load_dotenv
-from mysql.connector import Error as DBError
 from functools import wraps
+from sqlalchemy.exc import IntegrityError
 from datetime import datetime 
 
-# Set up logging with DEBUG level
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
 logger = logging.getLogger(__name__)
+payload_log = payload_logger(__name__)
+
+bp = Blueprint('main', __name__)
+
+
+def create_app(config=None, **overrides):
+    """Build the app from a config object or import path (default: APP_CONFIG or config.Config)"""
+    app = Flask(__name__, template_folder='templates')
+    app.config.from_object(config or os.getenv('APP_CONFIG', 'config.Config'))
+    app.config.update(overrides)
+    app.config['QUESTION_WRITER_SPOOL_DIR'] = app.config.get('QUESTION_WRITER_SPOOL_DIR') or os.path.join(
+        app.instance_path, 'question_spool'
+    )
+    app.config['GRADING_SPOOL_DIR'] = app.config.get('GRADING_SPOOL_DIR') or os.path.join(
+        app.instance_path, 'grading_spool'
+    )
+    CORS(app)
+
+    # JSON logs written by a background listener, levels per module
+    structured_logging.init_app(app)
+
+    # Request, SQL and model-server histograms for /metrics
+    metrics.init_app(app)
+
+    # Stack-sampled captures of requests with a signed X-Profile-Token or picked by PROFILE_SAMPLE_RATE
+    request_profiler.init_app(app)
+
+    # Pool settings, then db.init_app, then SQLite pragmas on the engines it created
+    database.init_app(app, db)
+
+    # `flask db upgrade`: schema creation is a deploy step, not something every worker does on boot
+    migrations.init_app(app)
+
+    # Dashboard read model follows result/assignment/enrolment writes
+    student_summary.init_app(app)
+
+    # Teacher list pages, rebuilt only when their quizzes/classrooms change
+    page_cache.init_app(app)
+
+    # Password hashing in a bounded worker pool, with rehash on login when parameters change
+    credential_service.init_app(app)
+
+    # `flask quiz import/export`
+    bulk_io.init_app(app)
+
+    # Class report aggregates, cached per teacher until their results change
+    report_engine.init_app(app)
+
+    # Quiz submissions are graded in batches by a background grader (replays its spool after a restart)
+    grading_pipeline.init_app(app)
+
+    # Model endpoint client: generation cache and rate limits (the HTTP pool opens on first use)
+    quiz_generator.init_app(app)
+
+    # External question bank (pooled connections and schema set up on first save)
+    question_writer = WriteBehindQueue(create_question_bank(app))
+    # Generated rows reach the question bank in batches from a background flusher
+    question_writer.init_app(app)
 
-load_dotenv()
-app = Flask(__name__, template_folder='templates')
-CORS(app)
-app.config['SECRET_KEY'] = 'your_secret_key'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///classquiz.db'
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Background workers for AI quiz generation (resumes jobs left over from a restart)
+    generation_queue.init_app(app)
 
-db.init_app(app)
+    metrics.register_cache('page', page_cache.stats)
+    metrics.register_cache('report', report_engine.stats)
+    metrics.register_cache('generation', lambda: quiz_generator.cache.stats() if quiz_generator.cache else None)
 
-# Replace before_first_request with app context
-with app.app_context():
-    db.create_all()
+    app.register_blueprint(bp)
+    return app
 
 # Decorator for requiring teacher access
 def teacher_required(f):
@@ -42,7 +116,7 @@ def teacher_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session or session['user_type'] != 'teacher':
             flash('Teacher access required', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
@@ -52,268 +126,36 @@ def student_required(f):
     def decorated_function(*args, **kwargs):
         if 'user_id' not in session or session['user_type'] != 'student':
             flash('Student access required', 'error')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         return f(*args, **kwargs)
     return decorated_function
 
+def student_can_access_quiz(student_id, quiz_id):
+    """Single EXISTS query: is the quiz assigned to any classroom the student is enrolled in?"""
+    return db.session.query(
+        db.exists().where(
+            student_classroom.c.user_id == student_id,
+            student_classroom.c.classroom_id == QuizAssignment.classroom_id,
+            QuizAssignment.quiz_id == quiz_id
+        )
+    ).scalar()
+
 class AssignQuizForm(FlaskForm):
     classroom_id = SelectField('Classroom', validators=[DataRequired()], coerce=int)
     due_date = DateTimeField('Due Date', validators=[DataRequired()], format='%Y-%m-%dT%H:%M')
     submit = SubmitField('Assign Quiz')
 
-class DatabaseManager:
-    @staticmethod
-    def get_connection():
-        try:
-            return mysql.connector.connect(
-                host=os.getenv('DB_HOST'),
-                user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD'),
-                database=os.getenv('DB_NAME'),
-                port=int(os.getenv('DB_PORT', 3306)),
-                connect_timeout=5
-            )
-        except DBError as e:
-            logger.error(f"Database connection failed: {str(e)}")
-            return None
-
-    @staticmethod
-    def save_questions(questions):
-        db = DatabaseManager.get_connection()
-        if not db:
-            return False, "Database unavailable"
-        try:
-            with db.cursor() as cursor:
-                cursor.execute("""
-                    CREATE TABLE IF NOT EXISTS questions (
-                        id INT AUTO_INCREMENT PRIMARY KEY,
-                        topics JSON NOT NULL,
-                        question_text TEXT NOT NULL,
-                        correct_answer TEXT NOT NULL,
-                        question_type VARCHAR(50) NOT NULL,
-                        difficulty VARCHAR(50) NOT NULL,
-                        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                    )
-                """)
-                cursor.executemany(
-                    """INSERT INTO questions 
-                    (topics, question_text, correct_answer, question_type, difficulty) 
-                    VALUES (%s, %s, %s, %s, %s)""",
-                    questions
-                )
-                db.commit()
-                return True, ""
-        except Exception as e:
-            db.rollback()
-            logger.error(f"Database error: {str(e)}")
-            return False, str(e)
-        finally:
-            if db and db.is_connected():
-                db.close()
-
-class QuizGenerator:
-    _last_request_time = 0
-    
-    def __init__(self):
-        self.api_url = "http://localhost:11434/api/generate"
-        self.model = "mistral"
-        self.timeout = 180
-        self.max_questions = 20
-        self.min_request_interval = 1
-
-    def generate_questions(self, prompt_data):
-        try:
-            if not prompt_data.get('topics'):
-                raise ValueError("At least one topic is required")
-                
-            question_type = prompt_data.get('type', 'multiple choice').lower()
-            num_questions = min(int(prompt_data.get('num_questions', 1)), self.max_questions)
-            difficulty = prompt_data.get('difficulty', 'medium').lower()
-
-            current_time = time.time()
-            elapsed = current_time - self._last_request_time
-            if elapsed < self.min_request_interval:
-                time.sleep(self.min_request_interval - elapsed)
-            self._last_request_time = time.time()
-
-            prompt = f"""Generate exactly {num_questions} {difficulty} difficulty {question_type} questions about {', '.join(prompt_data['topics'])}.
-            
-            Format each question as follows:
-            1. Question text?
-            ||CorrectAnswer
-            
-            For multiple choice, include options like:
-            1. Question text?
-            A) Option 1
-            B) Option 2
-            C) Option 3
-            D) Option 4
-            ||CorrectLetter
-            
-            Return ONLY the questions in this format, one per line.
-            Do NOT include any additional text or explanations."""
-
-            logger.debug(f"Sending request to API: {self.api_url}")
-            logger.debug(f"Request prompt: {prompt}")
-            
-            response = requests.post(
-                self.api_url,
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {"temperature": 0.7}
-                },
-                timeout=self.timeout
-            )
-            
-            print(f"Raw API response status code: {response.status_code}")
-            print(f"Raw API response content: {response.text[:500]}...")
-            
-            response.raise_for_status()
-            
-            response_data = response.json()
-            print(f"API response type: {type(response_data)}")
-            print(f"API response keys: {response_data.keys() if isinstance(response_data, dict) else 'Not a dict'}")
-            
-            generated_text = ""
-            if isinstance(response_data, dict):
-                generated_text = response_data.get("response", "")
-                if not isinstance(generated_text, str):
-                    print(f"Warning: Response is not a string but a {type(generated_text)}")
-                    generated_text = str(generated_text)
-            else:
-                print(f"Warning: Response is not a dictionary but a {type(response_data)}")
-                generated_text = str(response_data)
-            
-            logger.debug(f"Extracted generated text (first 200 chars):\n{generated_text[:200]}...")
-            print(f"Full generated text:\n{generated_text}")
-            
-            questions = []
-            question_blocks = []
-            
-            if '1.' in generated_text:
-                import re
-                question_blocks = re.split(r'\n\s*\d+\.', generated_text)
-                question_blocks = [block.strip() for block in question_blocks if block.strip()]
-                if question_blocks and not question_blocks[0].startswith('1.'):
-                    question_blocks.pop(0) if not '||' in question_blocks[0] else None
-            else:
-                question_blocks = [block.strip() for block in generated_text.split('\n\n') if block.strip()]
-            
-            print(f"Found {len(question_blocks)} potential question blocks")
-            
-            for block in question_blocks:
-                if '||' in block:
-                    parts = block.split('||', 1)
-                    question_text = parts[0].strip()
-                    answer_text = parts[1].strip()
-                    
-                    # Check for invalid content
-                    if '[object Object]' in question_text or '[object Object]' in answer_text:
-                        print(f"Skipping invalid block with [object Object]: {block[:100]}...")
-                        continue
-                    if not question_text or not answer_text:
-                        print(f"Skipping empty question/answer in block: {block[:100]}...")
-                        continue
-                    
-                    questions.append((question_text, answer_text))
-                    print(f"Parsed question: {question_text[:50]}... Answer: {answer_text}")
-                else:
-                    print(f"Skipping block without delimiter: {block[:50]}...")
-            
-            if not questions:
-                print("Trying line-by-line parsing")
-                current_question = []
-                for line in generated_text.split('\n'):
-                    line = line.strip()
-                    if '||' in line:
-                        parts = line.split('||', 1)
-                        question_part = parts[0].strip()
-                        answer_part = parts[1].strip()
-                        if question_part:
-                            current_question.append(question_part)
-                        if current_question:
-                            question_text = '\n'.join(current_question)
-                            questions.append((question_text, answer_part))
-                            current_question = []
-                    else:
-                        if line and line[0].isdigit() and '. ' in line and current_question:
-                            current_question = [line]
-                        elif line:
-                            current_question.append(line)
-                if current_question:
-                    print(f"Unprocessed lines: {current_question}")
-            
-            if not questions:
-                logger.error("No questions found in generated text. Raw output: " + generated_text[:200])
-                raise ValueError("No valid questions found in response - please try different topics or parameters")
-                
-            print(f"Successfully parsed {len(questions)} questions")
-            return questions[:num_questions], None
-            
-        except Exception as e:
-            logger.error(f"Generation failed: {str(e)}", exc_info=True)
-            return None, str(e)
-
-# Create instance of QuizGenerator
-quiz_generator = QuizGenerator()
-
-def generate_quiz(subject, num_questions, difficulty):
-    """Adapter function to bridge the old and new quiz generation logic"""
-    prompt_data = {
-        'topics': [subject],
-        'num_questions': num_questions,
-        'difficulty': difficulty,
-        'type': 'multiple choice'
-    }
-    
-    questions_tuples, error = quiz_generator.generate_questions(prompt_data)
-    
-    if error or not questions_tuples:
-        logger.error(f"Quiz generation failed: {error}")
-        return []
-    
-    # Convert to format expected by the original application
-    formatted_questions = []
-    for question_text, answer in questions_tuples:
-        # Extract options for multiple choice questions
-        options = []
-        
-        # Parse options from question text if it's multiple choice
-        lines = question_text.split('\n')
-        
-        # Filter out the first line (the question itself)
-        option_lines = [line for line in lines[1:] if line.strip()]
-        
-        # Extract options if they exist
-        if option_lines and any(line.startswith(('A)', 'B)', 'C)', 'D)')) for line in option_lines):
-            for line in option_lines:
-                if line.strip() and any(line.startswith(prefix) for prefix in ['A)', 'B)', 'C)', 'D)']):
-                    options.append(line[2:].strip())  # Remove option letter and parenthesis
-        
-        # If we couldn't parse options properly, create dummy options
-        if not options and answer.upper() in ['A', 'B', 'C', 'D']:
-            options = ["Option A", "Option B", "Option C", "Option D"]
-        
-        # Create the question object
-        question = {
-            'question': lines[0] if lines else question_text,
-            'options': options,
-            'correct_answer': answer
-        }
-        
-        formatted_questions.append(question)
-    
-    return formatted_questions
-
-
-
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.route('/login', methods=['GET', 'POST'])
+@bp.route('/metrics')
+def metrics_endpoint():
+    if not metrics.authorized(request):
+        abort(401)
+    return Response(metrics.render(), content_type=METRICS_CONTENT_TYPE)
+
+@bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         email = request.form['email']
@@ -321,25 +163,37 @@ def login():
         role = request.form.get('role', 'student')
         
         user = User.query.filter_by(email=email, user_type=role).first()
+        # The hash can wait for a worker under load: return the pooled connection meanwhile
+        db.session.close()
         
-        if user and user.check_password(password):
+        try:
+            valid = user is not None and user.check_password(password)
+        except CredentialServiceBusy:
+            flash('The server is busy. Please try again in a moment.', 'error')
+            return render_template('login.html'), 503
+        
+        if valid:
             session['user_id'] = user.id
             session['user_type'] = user.user_type
             session['name'] = user.name
+            # Stores a rehashed password, if any; otherwise there is nothing to flush
+            db.session.add(user)
+            db.session.commit()
             flash('Login successful!', 'success')
-            return redirect(url_for('teacher_dashboard' if user.user_type == 'teacher' else 'student_dashboard'))
+            return redirect(url_for('main.teacher_dashboard' if user.user_type == 'teacher' else 'main.student_dashboard'))
         else:
             flash('Invalid email/password or account type', 'error')
     
     return render_template('login.html')
 
-@app.route('/logout')
+@bp.route('/logout')
 def logout():
     session.clear()
-    return redirect(url_for('index'))
+    return redirect(url_for('main.index'))
 
-@app.route('/teacher-dashboard')
+@bp.route('/teacher-dashboard')
 @teacher_required
+@page_cache.cached
 def teacher_dashboard():
     teacher_id = session['user_id']
     quizzes = Quiz.query.filter_by(teacher_id=teacher_id).all()
@@ -347,91 +201,45 @@ def teacher_dashboard():
     
     return render_template('teacher_dashboard.html', quizzes=quizzes, classrooms=classrooms)
 
-@app.route('/student-dashboard')
+@bp.route('/student-dashboard')
 @student_required
 def student_dashboard():
     student_id = session['user_id']
+    page = max(request.args.get('page', 1, type=int), 1)
+    per_page = current_app.config['STUDENT_DASHBOARD_PAGE_SIZE']
     
-    # Get the student with their enrolled classrooms
-    student = User.query.options(
-        db.joinedload(User.enrolled_classrooms)
-    ).get(student_id)
-    
-    if not student:
-        flash('Student not found', 'error')
-        return redirect(url_for('login'))
-    
-    available_quizzes = []
-    completed_quizzes = []
-    
-    # Get all quiz results for this student in one query
-    student_results = {
-        result.quiz_id: result 
-        for result in QuizResult.query.filter_by(user_id=student_id).all()
-    }
-    
-    # Get classroom IDs for the student
-    classroom_ids = [classroom.id for classroom in student.enrolled_classrooms]
+    # Everything comes from the precomputed read model (see student_summary.py)
+    summary = db.session.get(StudentSummary, student_id) or StudentSummary(
+        user_id=student_id, available_count=0, completed_count=0, score_total=0
+    )
     
-    # Get all assignments for these classrooms
-    assignments = QuizAssignment.query.filter(
-        QuizAssignment.classroom_id.in_(classroom_ids)
+    # Available quizzes by due date (ascending, undated last)
+    available_quizzes = StudentQuizSummary.query.filter_by(
+        user_id=student_id, result_id=None
+    ).order_by(
+        StudentQuizSummary.due_date.is_(None), StudentQuizSummary.due_date
     ).all()
     
-    # Create a dictionary of quiz_id -> assignment details
-    quiz_assignments = {}
-    for assignment in assignments:
-        quiz_assignments[assignment.quiz_id] = assignment
-    
-    # Get all quizzes from these assignments
-    quiz_ids = [assignment.quiz_id for assignment in assignments]
-    assigned_quizzes = Quiz.query.filter(Quiz.id.in_(quiz_ids)).all()
-    
-    # Process each assigned quiz
-    for quiz in assigned_quizzes:
-        # Check if student has completed this quiz
-        result = student_results.get(quiz.id)
-        assignment = quiz_assignments.get(quiz.id)
-        
-        if result:
-            completed_quizzes.append({
-                'quiz': quiz,
-                'result': result,
-                'date_taken': result.date_taken,
-                'score': result.score,
-                'due_date': assignment.due_date if assignment else None
-            })
-        else:
-            # Add due date to available quizzes
-            if assignment:
-                quiz.due_date = assignment.due_date
-                available_quizzes.append(quiz)
-    
-    # Calculate average score
-    avg_score = 0
-    if completed_quizzes:
-        avg_score = round(
-            sum(result['score'] for result in completed_quizzes) / 
-            len(completed_quizzes),
-            1
-        )
-    
-    # Sort available quizzes by due date (ascending)
-    max_date = datetime.max
-    available_quizzes.sort(key=lambda x: x.due_date or max_date)
-    
-    # Sort completed quizzes by completion date (newest first)
-    completed_quizzes.sort(key=lambda x: x['date_taken'], reverse=True)
+    # One page of completed quizzes, newest first
+    completed_quizzes = StudentQuizSummary.query.filter(
+        StudentQuizSummary.user_id == student_id,
+        StudentQuizSummary.result_id.isnot(None)
+    ).order_by(
+        StudentQuizSummary.completed_date.desc()
+    ).limit(per_page).offset((page - 1) * per_page).all()
     
     return render_template(
         'student_dashboard.html',
         available_quizzes=available_quizzes,
         completed_quizzes=completed_quizzes,
-        avg_score=avg_score
+        summary=summary,
+        avg_score=summary.average_score,
+        page=page,
+        pages=max((summary.completed_count + per_page - 1) // per_page, 1)
     )
 
 # ADD TO app.py - New route
-@app.route('/classroom/<int:classroom_id>')
+@bp.route('/classroom/<int:classroom_id>')
 @teacher_required
 def classroom_details(classroom_id):
     classroom = Classroom.query.get_or_404(classroom_id)
@@ -439,23 +247,16 @@ def classroom_details(classroom_id):
     # Verify the classroom belongs to the current teacher
     if classroom.teacher_id != session['user_id']:
         flash('You do not have permission to view this classroom', 'error')
-        return redirect(url_for('classrooms'))
-    
-    # Get all assignments for this classroom
-    assignments = QuizAssignment.query.filter_by(classroom_id=classroom.id).all()
+        return redirect(url_for('main.classrooms'))
     
-    # Create a list of quizzes with their due dates
-    assigned_quizzes = []
-    for assignment in assignments:
-        quiz = Quiz.query.get(assignment.quiz_id)
-        if quiz:
-            assigned_quizzes.append({
-                'quiz': quiz,
-                'due_date': assignment.due_date
-            })
+    # Assignments and their quizzes in one joined query, sorted by due date
+    rows = db.session.query(Quiz, QuizAssignment.due_date).join(
+        QuizAssignment, QuizAssignment.quiz_id == Quiz.id
+    ).filter(
+        QuizAssignment.classroom_id == classroom.id
+    ).order_by(QuizAssignment.due_date).all()
     
-    # Sort by due date
-    assigned_quizzes.sort(key=lambda x: x['due_date'])
+    assigned_quizzes = [{'quiz': quiz, 'due_date': due_date} for quiz, due_date in rows]
     
     return render_template(
         'classroom_details.html',
@@ -463,43 +264,50 @@ def classroom_details(classroom_id):
         assigned_quizzes=assigned_quizzes
     )
 
-@app.route('/quizzes')
+@bp.route('/quizzes')
 @teacher_required
+@page_cache.cached
 def quizzes():
     teacher_id = session['user_id']
     quizzes = Quiz.query.filter_by(teacher_id=teacher_id).all()
     
     return render_template('quizzes.html', quizzes=quizzes)
 
-@app.route('/quiz/<int:quiz_id>', methods=['GET', 'POST'])
+@bp.route('/quiz/<int:quiz_id>', methods=['GET', 'POST'])
 @teacher_required
 def quiz_details(quiz_id):
-    quiz = Quiz.query.options(db.joinedload(Quiz.questions)).get_or_404(quiz_id)
+    quiz = Quiz.query.options(
+        db.selectinload(Quiz.questions).selectinload(Question.options)
+    ).get_or_404(quiz_id)
     
     if quiz.teacher_id != session['user_id']:
         flash('You do not have permission to view this quiz', 'error')
-        return redirect(url_for('quizzes'))
+        return redirect(url_for('main.quizzes'))
     
     if request.method == 'POST':
         for question in quiz.questions:
             question.text = request.form.get(f'question_{question.id}', question.text)
-            question.options = request.form.get(f'options_{question.id}', question.options)
             question.correct_answer = request.form.get(f'correct_{question.id}', question.correct_answer)
+            option_texts = [
+                request.form.get(f'option_{question.id}_{n}', option.text)
+                for n, option in enumerate(question.options, start=1)
+            ]
+            question.set_options(option_texts)
         db.session.commit()
         flash('Quiz updated successfully!')
-        return redirect(url_for('quiz_details', quiz_id=quiz.id))
+        return redirect(url_for('main.quiz_details', quiz_id=quiz.id))
     
     return render_template('quiz_details.html', quiz=quiz)
 
 # Add this route to handle creating a new classroom
-@app.route('/create-classroom', methods=['GET', 'POST'])
+@bp.route('/create-classroom', methods=['GET', 'POST'])
 @teacher_required
 def create_classroom():
     if request.method == 'POST':
         name = request.form['name'].strip()
         if not name:
             flash('Classroom name is required')
-            return redirect(url_for('create_classroom'))
+            return redirect(url_for('main.create_classroom'))
         
         new_classroom = Classroom(
             name=name,
@@ -510,12 +318,12 @@ def create_classroom():
         db.session.commit()
         
         flash('Classroom created successfully!')
-        return redirect(url_for('classrooms'))
+        return redirect(url_for('main.classrooms'))
     
     return render_template('create_classroom.html')
 
 # Add this route to handle viewing quiz results
-@app.route('/quiz-results/<int:result_id>')
+@bp.route('/quiz-results/<int:result_id>')
 @student_required
 def quiz_results(result_id):
     result = QuizResult.query.get_or_404(result_id)
@@ -523,56 +331,53 @@ def quiz_results(result_id):
     
     if result.user_id != session['user_id']:
         flash('You do not have permission to view this result', 'error')
-        return redirect(url_for('student_dashboard'))
+        return redirect(url_for('main.student_dashboard'))
     
     return render_template('quiz_results.html', result=result, quiz=quiz)
 
-@app.route('/classrooms')
+@bp.route('/classrooms')
 @teacher_required
+@page_cache.cached
 def classrooms():
     teacher_id = session['user_id']
     classrooms = Classroom.query.filter_by(teacher_id=teacher_id).all()
     
     return render_template('classrooms.html', classrooms=classrooms)
 
-@app.route('/reports')
+@bp.route('/reports')
 @teacher_required
 def reports():
     teacher_id = session['user_id']
-    quizzes = Quiz.query.filter_by(teacher_id=teacher_id).all()
-    return render_template('reports.html', quizzes=quizzes)
+    classes = report_engine.class_reports(teacher_id)
+    return render_template('reports.html', classes=classes)
+
+@bp.route('/admin/profiles')
+@teacher_required
+def profiles():
+    if not request_profiler.is_admin(db.session.get(User, session['user_id']).email):
+        abort(404)
+    return render_template('profiles.html', captures=request_profiler.captures())
 
-@app.route('/create-quiz', methods=['GET', 'POST'])
+@bp.route('/admin/profiles/<capture_id>.folded')
+@teacher_required
+def profile_folded(capture_id):
+    if not request_profiler.is_admin(db.session.get(User, session['user_id']).email):
+        abort(404)
+    path = request_profiler.folded_path(capture_id)
+    if path is None:
+        abort(404)
+    return send_file(path, mimetype='text/plain', as_attachment=True, download_name=f"{capture_id}.folded")
+
+@bp.route('/create-quiz', methods=['GET', 'POST'])
 @teacher_required
 def create_quiz():
     if request.method == 'POST':
-        title = request.form['title'].strip()
-        description = request.form['description'].strip()
-        
-        if not title:
-            flash('Quiz title is required')
-            return redirect(url_for('create_quiz'))
-        
-        new_quiz = Quiz(
-            title=title,
-            description=description,
-            teacher_id=session['user_id']
-        )
-        
-        db.session.add(new_quiz)
-        db.session.commit()
-        
-        # Handle questions creation here
-        # We'll extract questions from the form
+        # Extract questions from the form
         questions_data = []
         i = 1
         while f'question_{i}' in request.form:
             question_text = request.form[f'question_{i}'].strip()
             
-            if not question_text:
-                i += 1
-                continue
-                
             options = []
             
             # Get options if they exist
@@ -586,28 +391,35 @@ def create_quiz():
             correct_answer = request.form.get(f'correct_{i}', '').strip()
             
             # Validate correct answer
-            if not correct_answer:
+            if question_text and not correct_answer:
                 flash(f'Question {i} is missing a correct answer')
-                continue
-                
-            # Create a new question
-            question = Question(
-                quiz_id=new_quiz.id,
-                text=question_text,
-                options=",".join(options) if options else "",
-                correct_answer=correct_answer
-            )
-            
-            db.session.add(question)
+            elif question_text:
+                questions_data.append({
+                    'text': question_text,
+                    'options': options,
+                    'correct_answer': correct_answer
+                })
             i += 1
         
-        db.session.commit()
+        # Quiz and questions are written together, so a failure leaves nothing behind
+        try:
+            quiz_authoring.create_quizzes(session['user_id'], [{
+                'title': request.form['title'],
+                'description': request.form['description'],
+                'questions': questions_data
+            }])
+            db.session.commit()
+        except quiz_authoring.QuizValidationError as e:
+            db.session.rollback()
+            flash(str(e))
+            return redirect(url_for('main.create_quiz'))
+        
         flash('Quiz created successfully!')
-        return redirect(url_for('quizzes'))
+        return redirect(url_for('main.quizzes'))
     
     return render_template('create_quiz.html')
 
-@app.route('/ai-generate-quiz', methods=['GET', 'POST'])
+@bp.route('/ai-generate-quiz', methods=['GET', 'POST'])
 @teacher_required
 def ai_generate_quiz():
     if request.method == 'POST':
@@ -615,7 +427,7 @@ def ai_generate_quiz():
         
         if not subject:
             flash('Subject is required')
-            return redirect(url_for('ai_generate_quiz'))
+            return redirect(url_for('main.ai_generate_quiz'))
             
         try:
             num_questions = int(request.form['num_questions'])
@@ -623,50 +435,34 @@ def ai_generate_quiz():
                 raise ValueError("Number of questions must be positive")
         except ValueError:
             flash('Number of questions must be a positive number')
-            return redirect(url_for('ai_generate_quiz'))
+            return redirect(url_for('main.ai_generate_quiz'))
             
         difficulty = request.form['difficulty']
         
-        # Call AI quiz generation function
-        questions = generate_quiz(subject, num_questions, difficulty)
-        
-        if not questions:
-            flash('Failed to generate quiz. Please try again.')
-            return redirect(url_for('ai_generate_quiz'))
-        
-        new_quiz = Quiz(
-            title=f"{subject} Quiz",
-            description=f"AI-generated quiz about {subject}",
-            teacher_id=session['user_id'],
-            difficulty=difficulty
+        # Queue the generation; the worker creates the quiz once the model responds
+        generation_queue.submit(
+            {
+                'topics': [subject],
+                'num_questions': num_questions,
+                'difficulty': difficulty,
+                'type': 'multiple choice',
+                'bypass_cache': bool(request.form.get('bypass_cache'))
+            },
+            teacher_id=session['user_id']
         )
-        
-        db.session.add(new_quiz)
-        db.session.commit()
-        
-        # Add AI generated questions to the quiz
-        for q in questions:
-            question = Question(
-                quiz_id=new_quiz.id,
-                text=q['question'],
-                options=",".join(q['options']),
-                correct_answer=q['correct_answer']
-            )
-            db.session.add(question)
-        
-        db.session.commit()
-        flash('AI-generated quiz created successfully!')
-        return redirect(url_for('quizzes'))
+        flash('Quiz generation started. The quiz will appear in your list when it is ready.')
+        return redirect(url_for('main.quizzes'))
     
     return render_template('create_quiz.html', ai_generate=True)
 
-@app.route('/assign-quiz-to-classroom/<int:classroom_id>')
+@bp.route('/assign-quiz-to-classroom/<int:classroom_id>')
 @teacher_required
+@page_cache.cached
 def assign_quiz_form(classroom_id):
     classroom = Classroom.query.get_or_404(classroom_id)
     if classroom.teacher_id != session['user_id']:
         flash('You do not have permission to assign quizzes to this classroom', 'error')
-        return redirect(url_for('classrooms'))
+        return redirect(url_for('main.classrooms'))
     
     quizzes = Quiz.query.filter_by(teacher_id=session['user_id']).all()
     return render_template('select_quiz_to_assign.html', 
@@ -674,8 +470,8 @@ def assign_quiz_form(classroom_id):
                          quizzes=quizzes)
 
 # Update the route to make classroom_id optional
-@app.route('/assign-quiz/<int:quiz_id>', methods=['GET', 'POST'])
-@app.route('/assign-quiz/<int:quiz_id>/<int:classroom_id>', methods=['GET', 'POST'])
+@bp.route('/assign-quiz/<int:quiz_id>', methods=['GET', 'POST'])
+@bp.route('/assign-quiz/<int:quiz_id>/<int:classroom_id>', methods=['GET', 'POST'])
 @teacher_required
 def assign_quiz(quiz_id, classroom_id=None):
     quiz = Quiz.query.get_or_404(quiz_id)
@@ -683,7 +479,7 @@ def assign_quiz(quiz_id, classroom_id=None):
     # Verify the quiz belongs to the current teacher
     if quiz.teacher_id != session['user_id']:
         flash('You do not have permission to assign this quiz', 'error')
-        return redirect(url_for('quizzes'))
+        return redirect(url_for('main.quizzes'))
     
     # Get all classrooms belonging to the teacher for the dropdown
     classrooms = Classroom.query.filter_by(teacher_id=session['user_id']).all()
@@ -716,7 +512,7 @@ def assign_quiz(quiz_id, classroom_id=None):
             classroom = Classroom.query.get(classroom_id)
             if not classroom or classroom.teacher_id != session['user_id']:
                 flash('Invalid classroom', 'error')
-                return redirect(url_for('quizzes'))
+                return redirect(url_for('main.quizzes'))
             
             # Check if assignment already exists
             assignment = QuizAssignment.query.filter_by(
@@ -742,7 +538,7 @@ def assign_quiz(quiz_id, classroom_id=None):
                 flash('Quiz assigned successfully!', 'success')
             
             db.session.commit()
-            return redirect(url_for('classrooms'))
+            return redirect(url_for('main.classrooms'))
             
         except ValueError as e:
             flash(f'Invalid date format. Please use the date picker.', 'error')
@@ -755,64 +551,189 @@ def assign_quiz(quiz_id, classroom_id=None):
     # Pass the current datetime to the template for min attribute
     return render_template('assign_quiz.html', quiz=quiz, form=form, now=datetime.now())
 
-@app.route("/api/generate-quiz-api", methods=["POST"])
+@bp.route("/api/generate-quiz-api", methods=["POST"])
 def generate_quiz_api():
     try:
         if not request.is_json:
             return jsonify({"error": "Request must be JSON"}), 400
             
         data = request.get_json()
-        logger.debug(f"Received request data: {data}")
+        log_payload(payload_log, "Received request data: %s", data)
         
         if not data.get('topics'):
             return jsonify({"error": "At least one topic required"}), 400
 
-        questions, error = quiz_generator.generate_questions(data)
-        if error:
-            return jsonify({"error": error}), 400
-
-        if not questions:
-            return jsonify({"error": "No questions could be generated"}), 400
-
-        db_questions = [
-            (
-                json.dumps(data['topics']),
-                question,
-                answer,
-                data.get('type', 'multiple choice'),
-                data.get('difficulty', 'medium')
-            )
-            for question, answer in questions
-        ]
-
-        success, db_error = DatabaseManager.save_questions(db_questions)
+        job = generation_queue.submit(
+            data,
+            teacher_id=session.get('user_id') if session.get('user_type') == 'teacher' else None,
+            save_to_bank=True
+        )
         
-        response = {
+        return jsonify({
             "success": True,
-            "questions": [{"question": q, "answer": a} for q, a in questions],
-            "count": len(questions)
-        }
-        
-        # Debugging: Print final questions to check data
-        print("\nFinal questions to be sent in response:")
-        for idx, qa in enumerate(response["questions"]):
-            print(f"Question {idx + 1}: {qa['question']}")
-            print(f"Answer {idx + 1}: {qa['answer']}\n")
-        
-        if not success:
-            response.update({
-                "warning": "Questions generated but not saved",
-                "db_error": db_error
-            })
-            return jsonify(response), 207
-        
-        return jsonify(response), 200
+            "job_id": job.id,
+            "status": job.status,
+            "status_url": url_for('main.generation_job_status', job_id=job.id),
+            "events_url": url_for('main.generation_job_events', job_id=job.id)
+        }), 202
         
     except Exception as e:
         logger.error(f"Server error: {str(e)}", exc_info=True)
         return jsonify({"error": "Internal server error"}), 500
 
-@app.route('/signup', methods=['GET', 'POST'])
+@bp.route("/api/quizzes/bulk", methods=["POST"])
+@teacher_required
+def bulk_import_quizzes():
+    """Create one quiz or a list of quizzes, with all their questions, in one transaction"""
+    data = request.get_json(silent=True)
+    if isinstance(data, dict) and 'quizzes' in data:
+        data = data['quizzes']
+    quizzes = data if isinstance(data, list) else [data]
+    
+    try:
+        quiz_ids = quiz_authoring.create_quizzes(session['user_id'], quizzes)
+        db.session.commit()
+    except quiz_authoring.QuizValidationError as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({
+        "quizzes": [
+            {"id": quiz_id, "url": url_for('main.quiz_details', quiz_id=quiz_id)}
+            for quiz_id in quiz_ids
+        ]
+    }), 201
+
+@bp.route("/api/export/<kind>")
+@teacher_required
+def export_data(kind):
+    """Stream the teacher's quizzes or results as JSONL (default) or CSV"""
+    fmt = request.args.get('format', 'jsonl')
+    if kind not in bulk_io.KINDS or fmt not in bulk_io.FORMATS:
+        return jsonify({"error": "Unknown export"}), 404
+    return Response(
+        stream_with_context(bulk_io.export_lines(kind, session['user_id'], fmt)),
+        mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson',
+        headers={'Content-Disposition': f'attachment; filename="{kind}.{fmt}"'}
+    )
+
+@bp.route("/api/import/<kind>", methods=["POST"])
+@teacher_required
+def import_data(kind):
+    """Import JSONL (default) or CSV from the request body, read as a stream"""
+    fmt = request.args.get('format', 'csv' if request.mimetype == 'text/csv' else 'jsonl')
+    if kind not in bulk_io.KINDS or fmt not in bulk_io.FORMATS:
+        return jsonify({"error": "Unknown import"}), 404
+    lines = io.TextIOWrapper(request.stream, encoding='utf-8', newline='')
+    summary = bulk_io.import_lines(kind, session['user_id'], lines, fmt)
+    return jsonify(summary), 200
+
+@bp.route("/api/quizzes/<int:quiz_id>/item-analysis")
+@teacher_required
+def quiz_item_analysis(quiz_id):
+    quiz = db.session.get(Quiz, quiz_id)
+    if not quiz or quiz.teacher_id != session['user_id']:
+        return jsonify({"error": "Quiz not found"}), 404
+    import item_analysis  # Loads NumPy; only this endpoint needs it
+    if item_analysis.np is None:
+        return jsonify({"error": "Item analysis requires NumPy"}), 501
+    return jsonify(item_analysis.analyze_quiz(quiz_id)), 200
+
+@bp.route("/api/submissions/<receipt>")
+@student_required
+def submission_status(receipt):
+    status = grading_pipeline.status(receipt)
+    if not status or status['student_id'] != session['user_id']:
+        return jsonify({"error": "Submission not found"}), 404
+    return jsonify(status), 200
+
+@bp.route("/api/generation-jobs/<job_id>")
+def generation_job_status(job_id):
+    job = db.session.get(GenerationJob, job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict()), 200
+
+def _watch_job(job_id):
+    """Yield a generation job each time its status or partial result changes, until it finishes or times out"""
+    last_state = None
+    deadline = time.time() + generation_queue.generator.read_timeout * 2
+    while time.time() < deadline:
+        # End the previous read transaction so the worker's commits are visible
+        db.session.rollback()
+        job = db.session.get(GenerationJob, job_id)
+        state = (job.status, len(job.result or ''))
+        if state != last_state:
+            last_state = state
+            yield job
+        if job.status in FINISHED_STATUSES:
+            return
+        time.sleep(1)
+
+@bp.route("/api/generation-jobs/<job_id>/events")
+def generation_job_events(job_id):
+    if not db.session.get(GenerationJob, job_id):
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        job = None
+        for job in _watch_job(job_id):
+            yield f"event: status\ndata: {json.dumps(job.to_dict())}\n\n"
+        if job is None or job.status not in FINISHED_STATUSES:
+            yield "event: timeout\ndata: {}\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route("/api/generate-quiz-stream", methods=["GET", "POST"])
+@teacher_required
+def generate_quiz_stream():
+    """Server-sent events feed of questions as a queued generation job produces them"""
+    if request.method == 'POST':
+        if not request.is_json:
+            return jsonify({"error": "Request must be JSON"}), 400
+        data = request.get_json()
+    else:
+        # EventSource can only issue GET requests
+        data = {
+            'topics': [t.strip() for t in request.args.get('topics', '').split(',') if t.strip()],
+            'num_questions': request.args.get('num_questions', 1, type=int),
+            'difficulty': request.args.get('difficulty', 'medium'),
+            'type': request.args.get('type', 'multiple choice'),
+            'bypass_cache': request.args.get('bypass_cache', '').lower() in ('1', 'true')
+        }
+
+    if not data.get('topics'):
+        return jsonify({"error": "At least one topic required"}), 400
+
+    # The model runs on the generation workers; this request only relays the job's progress
+    job_id = generation_queue.submit(data, teacher_id=session['user_id']).id
+
+    def stream():
+        job, sent = None, 0
+        for job in _watch_job(job_id):
+            questions = json.loads(job.result) if job.result else []
+            for index, item in enumerate(questions[sent:], start=sent + 1):
+                payload = {"index": index, "question": item['question'], "answer": item['answer']}
+                yield f"event: question\ndata: {json.dumps(payload)}\n\n"
+            sent = max(sent, len(questions))
+        if job is not None and job.status == 'completed':
+            yield f"event: done\ndata: {json.dumps({'count': sent, 'job_id': job_id, 'quiz_id': job.quiz_id})}\n\n"
+        elif job is not None and job.status == 'failed':
+            yield f"event: error\ndata: {json.dumps({'error': job.error, 'count': sent, 'job_id': job_id})}\n\n"
+        else:
+            yield f"event: timeout\ndata: {json.dumps({'count': sent, 'job_id': job_id})}\n\n"
+
+    return Response(
+        stream_with_context(stream()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@bp.route('/signup', methods=['GET', 'POST'])
 def signup():
     if request.method == 'POST':
         try:
@@ -823,11 +744,11 @@ def signup():
             
             if not all([name, email, password]):
                 flash('All fields are required')
-                return redirect(url_for('signup'))
+                return redirect(url_for('main.signup'))
 
             if User.query.filter_by(email=email).first():
                 flash('Email already exists')
-                return redirect(url_for('signup'))
+                return redirect(url_for('main.signup'))
                 
             new_user = User(
                 name=name,
@@ -840,7 +761,7 @@ def signup():
             db.session.commit()
             
             flash('Account created successfully! Please login')
-            return redirect(url_for('login'))
+            return redirect(url_for('main.login'))
         
         except Exception as e:
             db.session.rollback()
@@ -849,67 +770,90 @@ def signup():
     
     return render_template('signup.html')
 
-@app.route('/teacher-login')
+@bp.route('/teacher-login')
 def teacher_login():
     return render_template('login.html', role='teacher')
 
-@app.route('/student-login')
+@bp.route('/student-login')
 def student_login():
     return render_template('login.html', role='student')
 
-@app.route('/take-quiz/<int:quiz_id>', methods=['GET', 'POST'])
+@bp.route('/take-quiz/<int:quiz_id>', methods=['GET', 'POST'])
 @student_required
 def take_quiz(quiz_id):
-    quiz = Quiz.query.get_or_404(quiz_id)
     student_id = session['user_id']
     
     # Check if quiz is accessible to this student
-    student = User.query.get(student_id)
-    can_access = False
-    
-    for classroom in student.enrolled_classrooms:
-        if quiz in classroom.quizzes:
-            can_access = True
-            break
-    
-    if not can_access:
+    if not student_can_access_quiz(student_id, quiz_id):
+        if not db.session.get(Quiz, quiz_id):
+            abort(404)
         flash('You do not have access to this quiz')
-        return redirect(url_for('student_dashboard'))
+        return redirect(url_for('main.student_dashboard'))
     
     # Check if student has already completed this quiz
     if QuizResult.query.filter_by(user_id=student_id, quiz_id=quiz_id).first():
         flash('You have already completed this quiz')
-        return redirect(url_for('student_dashboard'))
+        return redirect(url_for('main.student_dashboard'))
+    
+    if request.method == 'POST' and current_app.config['GRADING_ASYNC']:
+        # Queue for the batch grader, which loads the quiz itself: the request
+        # only needs the submitted fields. A full queue falls back to grading inline
+        answers = {
+            int(name[len('question_'):]): value
+            for name, value in request.form.items()
+            if name.startswith('question_') and name[len('question_'):].isdigit()
+        }
+        receipt = grading_pipeline.submit(student_id, quiz_id, answers)
+        if receipt:
+            if request.accept_mimetypes.best == 'application/json':
+                return jsonify({
+                    "receipt": receipt,
+                    "status_url": url_for('main.submission_status', receipt=receipt)
+                }), 202
+            flash(f'Quiz submitted (receipt {receipt[:8]}). Your score will appear on your dashboard shortly.')
+            return redirect(url_for('main.student_dashboard'))
+    
+    quiz = Quiz.query.options(
+        db.selectinload(Quiz.questions).selectinload(Question.options)
+    ).get_or_404(quiz_id)
     
     if request.method == 'POST':
-        # Process quiz submission
-        score = 0
-        total_questions = len(quiz.questions)
-        
-        for question in quiz.questions:
-            answer = request.form.get(f'question_{question.id}', '')
-            if answer.strip() == question.correct_answer.strip():
-                score += 1
-        
-        # Calculate percentage score
-        percentage = (score / total_questions) * 100 if total_questions > 0 else 0
+        # Grade the submission, keeping each answer for item analysis
+        responses = QuizResponses.from_answers(quiz.questions, {
+            question.id: request.form.get(f'question_{question.id}', '')
+            for question in quiz.questions
+        })
+        responses.quiz_id = quiz_id
+        percentage = responses.score
         
         # Save the result
         result = QuizResult(
             user_id=student_id,
             quiz_id=quiz_id,
-            score=percentage
+            score=percentage,
+            responses=responses
         )
         
         db.session.add(result)
-        db.session.commit()
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent submission already stored this student's attempt
+            db.session.rollback()
+            flash('You have already completed this quiz')
+            return redirect(url_for('main.student_dashboard'))
         
         flash(f'Quiz completed! Your score: {percentage:.1f}%')
-        return redirect(url_for('student_dashboard'))
+        return redirect(url_for('main.student_dashboard'))
     
     return render_template('take_quiz.html', quiz=quiz)
 
 if __name__ == "__main__":
+    app = create_app()
+    # The development server sets up its own schema; deployments run `flask db upgrade`
+    with app.app_context():
+        migrations.create_schema(db)
+
     required_vars = ['DB_HOST', 'DB_USER', 'DB_PASSWORD', 'DB_NAME']
     missing = [var for var in required_vars if not os.getenv(var)]
     
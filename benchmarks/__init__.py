@@ -0,0 +1 @@
+"""Offline benchmarks for ClassQuiz. Run modules with ``python -m benchmarks.<name>``."""
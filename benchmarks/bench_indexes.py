@@ -0,0 +1,87 @@
+"""Query plans and timings for the hot lookup paths before and after migration 2.
+
+Seeds a fresh SQLite database (100k quiz results by default), drops the
+lookup indexes to reproduce the old schema, measures, then applies the
+migrations and measures again.
+
+    python -m benchmarks.bench_indexes --results 100000 --repeat 200
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+from sqlalchemy import text
+import migrations
+from models import db, Classroom, Question, Quiz, QuizResult
+from benchmarks.seed import create_bench_app, seed
+
+QUERIES = {
+    'results_by_student': "SELECT * FROM quiz_result WHERE user_id = :user_id",
+    'result_by_student_and_quiz': "SELECT * FROM quiz_result WHERE user_id = :user_id AND quiz_id = :quiz_id",
+    'results_by_quiz': "SELECT * FROM quiz_result WHERE quiz_id = :quiz_id",
+    'quizzes_by_teacher': "SELECT * FROM quiz WHERE teacher_id = :teacher_id",
+    'classrooms_by_teacher': "SELECT * FROM classroom WHERE teacher_id = :teacher_id",
+    'questions_by_quiz': "SELECT * FROM question WHERE quiz_id = :quiz_id",
+}
+
+
+def measure(repeat, params):
+    report = {}
+    for name, sql in QUERIES.items():
+        plan = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params[0]).fetchall()
+        start = time.perf_counter()
+        for p in params[:repeat]:
+            db.session.execute(text(sql), p).fetchall()
+        elapsed = time.perf_counter() - start
+        report[name] = {
+            'plan': ' | '.join(row[-1] for row in plan),
+            'mean_ms': round(elapsed / repeat * 1000, 4)
+        }
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--results', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    path = os.path.join(tempfile.mkdtemp(), 'bench_indexes.db')
+    app = create_bench_app(path)
+    with app.app_context():
+        db.create_all()
+        migrations.applied_versions(db)
+        # Reproduce the pre-migration schema: no lookup indexes at all
+        for model in (QuizResult, Quiz, Classroom, Question):
+            for index in model.__table__.indexes:
+                index.drop(db.engine, checkfirst=True)
+
+        counts = seed(results=args.results)
+        rng = random.Random(7)
+        params = [
+            {'user_id': rng.randint(51, 50 + 2000), 'quiz_id': rng.randint(1, counts['quizzes']),
+             'teacher_id': rng.randint(1, 50)}
+            for _ in range(args.repeat)
+        ]
+
+        before = measure(args.repeat, params)
+        migrations.upgrade(db)
+        db.session.execute(text("ANALYZE"))
+        after = measure(args.repeat, params)
+
+    print(json.dumps({
+        'rows': counts,
+        'queries': {
+            name: {
+                'before': before[name], 'after': after[name],
+                'speedup': round(before[name]['mean_ms'] / max(after[name]['mean_ms'], 1e-6), 1)
+            }
+            for name in QUERIES
+        }
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
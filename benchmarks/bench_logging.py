@@ -0,0 +1,97 @@
+"""Per-request logging cost on the request thread: print()/DEBUG vs the queue.
+
+Each simulated generation request logs what the generator logged: the prompt,
+the raw model response, the generated text, a line per parsed question and a
+summary. "legacy" reproduces the old setup (root at DEBUG, a synchronous
+stream handler, print() of every payload). "structured" uses
+structured_logging at INFO with sampled payload dumps. Both write to the same
+temporary file.
+
+    python -m benchmarks.bench_logging --requests 2000
+"""
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import contextlib
+import structured_logging
+from structured_logging import log_payload, payload_logger
+from benchmarks.common import percentile
+
+QUESTIONS = 10
+GENERATED = '\n'.join(
+    f"{n}. What is the value of item {n} in the seeded sequence, and why? || Answer {n}" * 4
+    for n in range(1, QUESTIONS + 1)
+)
+RAW_RESPONSE = json.dumps({'model': 'mistral', 'response': GENERATED, 'done': True})
+PROMPT = 'Generate 10 medium multiple choice questions about ' + 'biology, ' * 20
+
+
+def legacy_request(logger):
+    logger.debug("Sending request to API: http://localhost:11434/api/generate")
+    logger.debug(f"Request prompt: {PROMPT}")
+    print("Raw API response status code: 200")
+    print(f"Raw API response content: {RAW_RESPONSE[:500]}...")
+    print(f"Full generated text:\n{GENERATED}")
+    for n in range(QUESTIONS):
+        print(f"Parsed question: {GENERATED[:50]}... Answer: Answer {n}")
+    print(f"Successfully parsed {QUESTIONS} questions")
+    logger.info(f"Generated {QUESTIONS} questions")
+
+
+def structured_request(logger, payload_log):
+    logger.debug("Sending request to API: %s", 'http://localhost:11434/api/generate')
+    log_payload(payload_log, "Request prompt: %s", PROMPT)
+    log_payload(payload_log, "Raw API response %s: %.500s", 200, RAW_RESPONSE)
+    log_payload(payload_log, "Generated text:\n%s", GENERATED)
+    logger.debug("Parsed %d questions", QUESTIONS)
+    logger.info(f"Generated {QUESTIONS} questions")
+
+
+def timed(requests, call):
+    latencies = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        call()
+        latencies.append(time.perf_counter() - start)
+    return {
+        'mean_us': round(sum(latencies) / len(latencies) * 1e6, 1),
+        'p50_us': percentile(latencies, 50, scale=1e6),
+        'p99_us': percentile(latencies, 99, scale=1e6)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--sample-rate', type=float, default=0.01)
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.NamedTemporaryFile('w', suffix='.log') as out:
+        root = logging.getLogger()
+        logger = logging.getLogger('bench')
+
+        handler = logging.StreamHandler(out)
+        handler.setFormatter(logging.Formatter(structured_logging.TEXT_FORMAT))
+        root.handlers[:] = [handler]
+        root.setLevel(logging.DEBUG)
+        with contextlib.redirect_stdout(out):
+            results['legacy'] = timed(args.requests, lambda: legacy_request(logger))
+
+        structured_logging.configure(level='INFO', payload_sample_rate=args.sample_rate, stream=out)
+        payload_log = payload_logger('bench')
+        results['structured'] = timed(args.requests, lambda: structured_request(logger, payload_log))
+        structured_logging.configure(
+            level='INFO', levels={'bench.payload': 'DEBUG'}, payload_sample_rate=args.sample_rate, stream=out
+        )
+        results['structured_payload_debug'] = timed(args.requests, lambda: structured_request(logger, payload_log))
+        structured_logging._stop()
+
+    print(json.dumps({**vars(args), 'results': results}, indent=2), file=sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Login storm: hundreds of students log in at the same moment.
+
+Boots the app on a seeded temporary database behind a threaded werkzeug
+server and fires ``--logins`` concurrent POST /login requests. Reports login
+p50/p99, failures and the peak memory of the server process.
+
+    python -m benchmarks.bench_login                       # pooled hashing
+    python -m benchmarks.bench_login --workers 0           # hash on the request threads, as before
+    python -m benchmarks.bench_login --method pbkdf2:sha256:600000   # every login also rehashes
+"""
+import os
+import json
+import time
+import argparse
+import resource
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.common import percentile, use_offline_env
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--logins', type=int, default=300)
+    parser.add_argument('--workers', type=int, default=min(4, os.cpu_count() or 1), help='0 hashes on the request thread')
+    parser.add_argument('--method', default='scrypt', help='PASSWORD_HASH_METHOD; seeded hashes use scrypt')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    use_offline_env(workdir, os.path.join(workdir, 'login.db'))
+    os.environ['PASSWORD_HASH_WORKERS'] = str(args.workers)
+    os.environ['PASSWORD_HASH_METHOD'] = args.method
+    # Unbounded when hashing inline, to reproduce a thread per concurrent hash
+    os.environ['PASSWORD_HASH_MAX_PENDING'] = str(args.logins if args.workers else args.logins + 1)
+    os.environ['PASSWORD_HASH_TIMEOUT'] = '120'
+
+    from werkzeug.serving import make_server
+    import migrations
+    from app import create_app
+    from credentials import credential_service
+    from models import db
+    from benchmarks.seed import seed, BENCH_PASSWORD
+
+    app = create_app(WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        migrations.create_schema(db)
+        seed(students=args.logins, results=0)
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    start_gate = threading.Barrier(args.logins)
+
+    def login(n):
+        form = {'email': f"student{n}@bench.test", 'password': BENCH_PASSWORD, 'role': 'student'}
+        start_gate.wait()
+        start = time.perf_counter()
+        try:
+            status = requests.post(f"{base_url}/login", data=form, allow_redirects=False).status_code
+        except requests.RequestException as e:
+            status = type(e).__name__
+        return time.perf_counter() - start, status
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.logins) as pool:
+        outcomes = list(pool.map(login, range(1, args.logins + 1)))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    latencies = [latency for latency, status in outcomes if status == 302]
+    failures = {}
+    for _, status in outcomes:
+        if status != 302:
+            failures[status] = failures.get(status, 0) + 1
+    print(json.dumps({
+        **vars(args),
+        'elapsed_s': round(elapsed, 2),
+        'logged_in': len(latencies),
+        'failures': failures,
+        'p50_ms': percentile(latencies, 50),
+        'p99_ms': percentile(latencies, 99),
+        'peak_rss_mb': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+        'credentials': credential_service.stats()
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,94 @@
+"""Compare the pooled question bank against a connection + DDL per save.
+
+    python -m benchmarks.bench_question_bank --saves 2000 --threads 4
+    python -m benchmarks.bench_question_bank --backend mysql   # uses DB_* env vars
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from question_bank import DatabaseManager, SQLiteQuestionBank
+from benchmarks.common import percentile
+
+
+class UnpooledSQLiteBank(SQLiteQuestionBank):
+    """Baseline: new connection and schema round-trip on every save, as before pooling"""
+
+    def _checkout(self):
+        return sqlite3.connect(self.path, timeout=5)
+
+    def save_questions(self, questions):
+        self._schema_ready = False
+        return super().save_questions(questions)
+
+
+class UnpooledMySQLBank(DatabaseManager):
+    def _checkout(self):
+        import mysql.connector
+        return mysql.connector.connect(
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME'),
+            port=int(os.getenv('DB_PORT', 3306)),
+            connect_timeout=5
+        )
+
+    def save_questions(self, questions):
+        self._schema_ready = False
+        return super().save_questions(questions)
+
+
+def run(bank, saves, threads, batch):
+    rows = [
+        (json.dumps(['benchmark']), f"Question {i}?", 'A', 'multiple choice', 'medium')
+        for i in range(batch)
+    ]
+    bank.ensure_schema()
+    latencies = []
+
+    def save(_):
+        start = time.perf_counter()
+        ok, error = bank.save_questions(rows)
+        latencies.append(time.perf_counter() - start)
+        if not ok:
+            raise RuntimeError(error)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(save, range(saves)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        'saves_per_second': round(saves / elapsed, 1),
+        'p50_ms': percentile(latencies, 50, digits=3),
+        'p99_ms': percentile(latencies, 99, digits=3)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--backend', choices=['sqlite', 'mysql'], default='sqlite')
+    parser.add_argument('--saves', type=int, default=1000)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=10, help='questions per save')
+    args = parser.parse_args()
+
+    if args.backend == 'mysql':
+        banks = {'per_call_connect': UnpooledMySQLBank(), 'pooled': DatabaseManager(pool_size=args.threads)}
+    else:
+        path = os.path.join(tempfile.mkdtemp(), 'question_bank.db')
+        banks = {
+            'per_call_connect': UnpooledSQLiteBank(path),
+            'pooled': SQLiteQuestionBank(path, pool_size=args.threads)
+        }
+
+    results = {name: run(bank, args.saves, args.threads, args.batch) for name, bank in banks.items()}
+    print(json.dumps({**vars(args), 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,120 @@
+"""Concurrent read/write throughput of the SQLite journal modes.
+
+Each mode gets a fresh database file with the app's schema and some seeded
+results. Reader threads then run the per-quiz score aggregate the reports use,
+while writer threads insert results in short transactions, all for
+``--seconds``. Engines are built with ``database.engine_options`` and
+``database.apply_pragmas``, so "wal" is the configuration the app runs with.
+
+    python -m benchmarks.bench_sqlite_modes --readers 8 --writers 2 --seconds 5
+"""
+import os
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+from datetime import datetime
+from sqlalchemy import create_engine, event, insert, select, func
+from sqlalchemy.exc import OperationalError
+import database
+from models import db, QuizResult
+
+MODES = {
+    # SQLite's defaults, as the app ran before engine configuration
+    'default': {'SQLITE_JOURNAL_MODE': 'DELETE', 'SQLITE_BUSY_TIMEOUT': 5000, 'SQLITE_SYNCHRONOUS': 'FULL'},
+    'wal': {'SQLITE_JOURNAL_MODE': 'WAL', 'SQLITE_BUSY_TIMEOUT': 5000, 'SQLITE_SYNCHRONOUS': 'NORMAL'},
+}
+
+
+def make_engine(path, config):
+    engine = create_engine(f"sqlite:///{path}", **database.engine_options(f"sqlite:///{path}", config))
+    pragmas = database.sqlite_pragmas(config)
+    event.listen(engine, 'connect', lambda conn, record: database.apply_pragmas(conn, pragmas))
+    return engine
+
+
+def run(mode, config, readers, writers, seconds, quizzes, seed_rows):
+    path = os.path.join(tempfile.mkdtemp(), f"{mode}.db")
+    engine = make_engine(path, config)
+    db.metadata.create_all(engine)
+    rng = random.Random(42)
+    with engine.begin() as conn:
+        conn.execute(insert(QuizResult.__table__), [
+            {'user_id': i, 'quiz_id': rng.randrange(quizzes), 'score': rng.uniform(0, 100), 'completed_date': datetime.utcnow()}
+            for i in range(seed_rows)
+        ])
+
+    stop = threading.Event()
+    counts = {'reads': 0, 'writes': 0, 'errors': 0}
+    lock = threading.Lock()
+    next_user = iter(range(seed_rows, 10 ** 9))
+
+    def reader():
+        local = random.Random()
+        while not stop.is_set():
+            try:
+                with engine.connect() as conn:
+                    conn.execute(
+                        select(func.count(), func.avg(QuizResult.score)).where(QuizResult.quiz_id == local.randrange(quizzes))
+                    ).one()
+                key = 'reads'
+            except OperationalError:
+                key = 'errors'
+            with lock:
+                counts[key] += 1
+
+    def writer():
+        local = random.Random()
+        while not stop.is_set():
+            with lock:
+                user_id = next(next_user)
+            try:
+                with engine.begin() as conn:
+                    conn.execute(insert(QuizResult.__table__).values(
+                        user_id=user_id, quiz_id=local.randrange(quizzes),
+                        score=local.uniform(0, 100), completed_date=datetime.utcnow()
+                    ))
+                key = 'writes'
+            except OperationalError:
+                key = 'errors'
+            with lock:
+                counts[key] += 1
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)]
+    threads += [threading.Thread(target=writer) for _ in range(writers)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    engine.dispose()
+
+    return {
+        'reads_per_second': round(counts['reads'] / seconds, 1),
+        'writes_per_second': round(counts['writes'] / seconds, 1),
+        'errors': counts['errors']
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--writers', type=int, default=2)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--quizzes', type=int, default=200)
+    parser.add_argument('--seed-rows', type=int, default=50000)
+    parser.add_argument('--mode', choices=sorted(MODES), action='append', help='Repeatable; defaults to all')
+    args = parser.parse_args()
+
+    results = {
+        mode: run(mode, MODES[mode], args.readers, args.writers, args.seconds, args.quizzes, args.seed_rows)
+        for mode in (args.mode or MODES)
+    }
+    print(json.dumps({**{k: v for k, v in vars(args).items() if k != 'mode'}, 'results': results}, indent=2))
+
+
+if __name__ == '__main__':
+    main()
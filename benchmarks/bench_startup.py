@@ -0,0 +1,91 @@
+"""Cold start of a worker: importing app and building it with create_app().
+
+Runs ``python -X importtime`` in a fresh interpreter for each repeat and
+reports the median import time of ``app`` together with the slowest
+top-level imports (cumulative), then the median wall time of
+``create_app()``. Nothing should open a database connection, start the
+model client or import numpy while a worker boots; a regression shows up
+here as a new entry in ``slowest_imports`` or a jump in ``import_ms``.
+
+    python -m benchmarks.bench_startup
+    python -m benchmarks.bench_startup --max-ms 600     # exit 1 above the budget (CI)
+"""
+import os
+import sys
+import json
+import argparse
+import tempfile
+import statistics
+import subprocess
+from benchmarks.common import offline_env
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CREATE_APP = (
+    "import time; start = time.perf_counter(); from app import create_app; create_app(); "
+    "print((time.perf_counter() - start) * 1000)"
+)
+
+
+def bench_env(workdir):
+    return {**os.environ, **offline_env(workdir, os.path.join(workdir, 'startup.db'))}
+
+
+def parse_importtime(stderr):
+    """{module: cumulative µs} for top-level imports, plus the cumulative time of ``app``"""
+    children = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        module = name.strip()
+        # A module is listed after its imports, indented two spaces per level below the top
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 0:
+            if module == 'app':
+                return children, int(cumulative)
+            children = {}
+        elif depth == 1:
+            children[module] = int(cumulative)
+    return {}, None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10)
+    parser.add_argument('--max-ms', type=float, help='Fail when the median import of app exceeds this')
+    args = parser.parse_args()
+
+    import_ms, create_ms, slowest = [], [], {}
+    with tempfile.TemporaryDirectory() as workdir:
+        env = bench_env(workdir)
+        for _ in range(args.repeat):
+            run = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', 'import app'],
+                cwd=ROOT, env=env, capture_output=True, text=True, check=True
+            )
+            top_level, app_us = parse_importtime(run.stderr)
+            import_ms.append(app_us / 1000)
+            for module, us in top_level.items():
+                slowest.setdefault(module, []).append(us / 1000)
+
+            run = subprocess.run(
+                [sys.executable, '-c', CREATE_APP], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+            )
+            create_ms.append(float(run.stdout.strip().splitlines()[-1]))
+
+    median_import = statistics.median(import_ms)
+    ranked = sorted(((statistics.median(times), module) for module, times in slowest.items()), reverse=True)
+    print(json.dumps({
+        **vars(args),
+        'import_ms': round(median_import, 1),
+        'create_app_ms': round(statistics.median(create_ms), 1),
+        'slowest_imports': {module: round(ms, 1) for ms, module in ranked[:args.top]}
+    }, indent=2))
+    if args.max_ms is not None and median_import > args.max_ms:
+        print(f"app import took {median_import:.1f} ms, budget is {args.max_ms:.1f} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Load test: a burst of concurrent quiz submissions against the real app.
+
+Boots the app on a seeded temporary database behind a threaded werkzeug
+server, then has ``--submissions`` students submit a quiz at the same moment
+over HTTP. Reports p50/p99 of the submit request itself and of the time until
+the score is stored (polled through /api/submissions/<receipt> in async mode;
+the same as the submit in sync mode).
+
+    python -m benchmarks.bench_submissions                 # async pipeline
+    python -m benchmarks.bench_submissions --mode sync     # grade inside the request
+"""
+import os
+import json
+import time
+import argparse
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from benchmarks.common import percentile, use_offline_env
+
+
+def pending_pairs(db, limit):
+    """(student_id, quiz_id) pairs the student may take and has not taken yet"""
+    from models import QuizAssignment, QuizResult, student_classroom
+
+    rows = db.session.query(student_classroom.c.user_id, QuizAssignment.quiz_id).join(
+        QuizAssignment, QuizAssignment.classroom_id == student_classroom.c.classroom_id
+    ).outerjoin(
+        QuizResult, (QuizResult.user_id == student_classroom.c.user_id) & (QuizResult.quiz_id == QuizAssignment.quiz_id)
+    ).filter(QuizResult.id.is_(None)).distinct().limit(limit).all()
+    return [tuple(row) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--mode', choices=['async', 'sync'], default='async')
+    parser.add_argument('--submissions', type=int, default=500)
+    parser.add_argument('--results', type=int, default=20000, help='results seeded beforehand')
+    parser.add_argument('--timeout', type=float, default=60, help='seconds to wait for grading')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    use_offline_env(workdir, os.path.join(workdir, 'submissions.db'))
+    os.environ['GRADING_ASYNC'] = 'true' if args.mode == 'async' else 'false'
+
+    from werkzeug.serving import make_server
+    import migrations
+    from app import create_app
+    from grading import grading_pipeline
+    from models import db, Question
+    from benchmarks.seed import seed
+
+    app = create_app(WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        migrations.create_schema(db)
+        seed(results=args.results)
+        pairs = pending_pairs(db, args.submissions)
+        answers = {}
+        for question in Question.query.filter(Question.quiz_id.in_({quiz_id for _, quiz_id in pairs})):
+            answers.setdefault(question.quiz_id, {})[f'question_{question.id}'] = question.correct_answer
+    if len(pairs) < args.submissions:
+        raise SystemExit(f"Only {len(pairs)} pending submissions in the seed; lower --results")
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    serializer = app.session_interface.get_signing_serializer(app)
+    cookie_name = app.config['SESSION_COOKIE_NAME']
+
+    start_gate = threading.Barrier(len(pairs))
+
+    def submit(pair):
+        student_id, quiz_id = pair
+        with requests.Session() as http:
+            http.cookies.set(cookie_name, serializer.dumps({'user_id': student_id, 'user_type': 'student'}))
+            start_gate.wait()
+            start = time.perf_counter()
+            response = http.post(
+                f"{base_url}/take-quiz/{quiz_id}", data=answers.get(quiz_id, {}),
+                headers={'Accept': 'application/json'}, allow_redirects=False
+            )
+            submitted = time.perf_counter() - start
+            if response.status_code == 302:  # graded inside the request
+                return submitted, submitted, None
+            if response.status_code != 202:
+                return submitted, None, f"HTTP {response.status_code}"
+
+            status_url = base_url + response.json()['status_url']
+            deadline = time.monotonic() + args.timeout
+            while time.monotonic() < deadline:
+                status = http.get(status_url).json()
+                if status.get('status') == 'graded':
+                    return submitted, time.perf_counter() - start, None
+                if status.get('status') != 'queued':
+                    return submitted, None, status.get('status')
+                time.sleep(0.2)
+            return submitted, None, 'timeout'
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(pairs)) as pool:
+        outcomes = list(pool.map(submit, pairs))
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    submit_times = [submitted for submitted, _, _ in outcomes]
+    graded_times = [graded for _, graded, _ in outcomes if graded is not None]
+    errors = {}
+    for _, _, error in outcomes:
+        if error:
+            errors[error] = errors.get(error, 0) + 1
+    print(json.dumps({
+        **vars(args),
+        'elapsed_s': round(elapsed, 2),
+        'graded': len(graded_times),
+        'errors': errors,
+        'submit_p50_ms': percentile(submit_times, 50),
+        'submit_p99_ms': percentile(submit_times, 99),
+        'graded_p50_ms': percentile(graded_times, 50),
+        'graded_p99_ms': percentile(graded_times, 99),
+        'pipeline': grading_pipeline.stats() if args.mode == 'async' else None
+    }, indent=2, default=str))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,31 @@
+"""Helpers shared by the benchmark scripts."""
+import os
+import math
+
+
+def percentile(values, p, scale=1000, digits=1):
+    """Nearest-rank ``p``th percentile of ``values`` (seconds), in milliseconds unless ``scale`` says otherwise"""
+    if not values:
+        return None
+    values = sorted(values)
+    return round(values[max(0, math.ceil(len(values) * p / 100) - 1)] * scale, digits)
+
+
+def offline_env(workdir, db_path):
+    """Settings for an app on the SQLite file ``db_path`` with its spools and caches under ``workdir``.
+
+    The question bank uses SQLite too, so the numbers do not depend on MySQL
+    being up.
+    """
+    return {
+        'DATABASE_URL': f"sqlite:///{db_path}",
+        'QUESTION_BANK_BACKEND': 'sqlite',
+        'QUESTION_WRITER_SPOOL_DIR': os.path.join(workdir, 'question_spool'),
+        'GRADING_SPOOL_DIR': os.path.join(workdir, 'grading_spool'),
+        'PAGE_CACHE_VERSIONS_PATH': os.path.join(workdir, 'page_cache_versions.db'),
+    }
+
+
+def use_offline_env(workdir, db_path):
+    """Apply ``offline_env`` to this process; call before config.py is imported, as Config reads the environment once"""
+    os.environ.update(offline_env(workdir, db_path))
@@ -0,0 +1,387 @@
+"""Scripted load on the main flows, with results saved as JSON to compare commits.
+
+Scenarios:
+- login: POST /login as a student (password hashing included)
+- student_dashboard, teacher_dashboard, reports: GET as a seeded user
+- take_quiz: POST a full submission for a quiz the student has not taken
+- ai_generate: POST /api/generate-quiz-api as a teacher, then poll the job
+  until it finishes
+
+Every scenario runs ``--requests`` operations (``--generations`` for
+ai_generate) from ``--concurrency`` threads. The result file records
+throughput, latency percentiles and failures per scenario, plus the commit,
+machine and dataset. ``--compare`` prints the change from an earlier file.
+
+Targets:
+- default: the Flask test client, in this process;
+- ``--http``: a threaded werkzeug server in this process, driven over HTTP;
+- ``--base-url``: an app that is already running on the same ``--db``. It
+  must share SECRET_KEY, because sessions are signed here instead of logging
+  in for every operation.
+
+take_quiz consumes pending (student, quiz) pairs. The two in-process targets
+therefore run on a copy of ``--db``. The model server is a local stub that
+answers after ``--llm-latency`` seconds, unless ``--llm-url`` is given.
+
+    python -m benchmarks.seed --db /tmp/bench.db --scale 100k
+    python -m benchmarks.load --db /tmp/bench.db
+    python -m benchmarks.load --db /tmp/bench.db --http --concurrency 16 --compare benchmarks/results/<earlier>.json
+"""
+import os
+import sys
+import json
+import time
+import sqlite3
+import argparse
+import platform
+import tempfile
+import threading
+import subprocess
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from benchmarks.common import percentile, use_offline_env
+from benchmarks.seed import SCALES, BENCH_PASSWORD, create_bench_app, seed
+
+SCENARIOS = ('login', 'student_dashboard', 'teacher_dashboard', 'reports', 'take_quiz', 'ai_generate')
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_revision():
+    def git(*args):
+        return subprocess.run(['git', *args], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    return {'commit': git('rev-parse', '--short', 'HEAD') or None, 'dirty': bool(git('status', '--porcelain', '-uno'))}
+
+
+# Model server stub
+
+def stub_questions(count=20):
+    return '\n\n'.join(
+        f"{n}. Load test question {n}?\nA) Alpha\nB) Beta\nC) Gamma\nD) Delta || B" for n in range(1, count + 1)
+    )
+
+
+def start_llm_stub(latency):
+    """Ollama-compatible /api/generate that answers every prompt after ``latency`` seconds"""
+    body = json.dumps({'model': 'stub', 'response': stub_questions(), 'done': True}).encode('utf-8')
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/api/generate"
+
+
+# Clients: request() returns (status, JSON body or None)
+
+class InProcessClient:
+    def __init__(self, app):
+        # No cookie jar: each operation sends the session it acts as
+        self._client = app.test_client(use_cookies=False)
+
+    def request(self, method, path, cookie=None, **kwargs):
+        headers = dict(kwargs.pop('headers', {}), **({'Cookie': f"session={cookie}"} if cookie else {}))
+        response = self._client.open(path, method=method, headers=headers, **kwargs)
+        return response.status_code, response.get_json(silent=True)
+
+
+class HttpClient:
+    def __init__(self, base_url):
+        import requests
+        self.base_url = base_url.rstrip('/')
+        self._session = requests.Session()
+        self._errors = requests.RequestException
+
+    def request(self, method, path, cookie=None, **kwargs):
+        headers = dict(kwargs.pop('headers', {}), **({'Cookie': f"session={cookie}"} if cookie else {}))
+        try:
+            response = self._session.request(
+                method, self.base_url + path, headers=headers, allow_redirects=False, timeout=120, **kwargs
+            )
+        except self._errors as e:
+            return type(e).__name__, None
+        finally:
+            self._session.cookies.clear()
+        try:
+            return response.status_code, response.json()
+        except ValueError:
+            return response.status_code, None
+
+
+# Fixtures
+
+def load_fixtures(db_path, limit):
+    """Users, pending (student, quiz) pairs with correct answers, and dataset counts"""
+    from benchmarks.bench_submissions import pending_pairs
+    from models import db, User, Quiz, Question, QuizResult, Classroom, QuizAssignment, student_classroom
+
+    app = create_bench_app(db_path)
+    with app.app_context():
+        students = User.query.filter_by(user_type='student').order_by(User.id).limit(limit).all()
+        teacher_ids = [row.id for row in User.query.filter_by(user_type='teacher').order_by(User.id).limit(limit)]
+        pairs = pending_pairs(db, limit)
+        answers = {}
+        for question in Question.query.filter(Question.quiz_id.in_({quiz_id for _, quiz_id in pairs})):
+            answers.setdefault(question.quiz_id, {})[f'question_{question.id}'] = question.correct_answer
+        counts = {
+            'users': User.query.count(), 'classrooms': Classroom.query.count(), 'quizzes': Quiz.query.count(),
+            'questions': Question.query.count(), 'assignments': QuizAssignment.query.count(),
+            'enrolments': db.session.query(student_classroom).count(), 'results': QuizResult.query.count()
+        }
+        db.engine.dispose()
+    if not students or not teacher_ids:
+        raise SystemExit(f"{db_path} has no seeded users; run python -m benchmarks.seed first")
+    return {
+        'student_emails': [student.email for student in students],
+        'student_ids': [student.id for student in students],
+        'teacher_ids': teacher_ids,
+        'pairs': pairs, 'answers': answers, 'counts': counts
+    }
+
+
+def session_signer(secret_key):
+    """Signs Flask session cookies the way the app does, so operations skip logging in"""
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+
+    signer_app = Flask(__name__)
+    signer_app.secret_key = secret_key
+    serializer = SecureCookieSessionInterface().get_signing_serializer(signer_app)
+    return lambda user_id, user_type: serializer.dumps({'user_id': user_id, 'user_type': user_type})
+
+
+# Scenarios: each operation returns (ok, status)
+
+def build_operations(fixtures, sign, args):
+    students = [sign(student_id, 'student') for student_id in fixtures['student_ids']]
+    teachers = [sign(teacher_id, 'teacher') for teacher_id in fixtures['teacher_ids']]
+    pairs = fixtures['pairs']
+
+    def login(client, n):
+        email = fixtures['student_emails'][n % len(fixtures['student_emails'])]
+        status, _ = client.request('POST', '/login', data={'email': email, 'password': BENCH_PASSWORD, 'role': 'student'})
+        return status == 302, status
+
+    def get(path, cookies):
+        def operation(client, n):
+            status, _ = client.request('GET', path, cookie=cookies[n % len(cookies)])
+            return status == 200, status
+        return operation
+
+    def take_quiz(client, n):
+        if n >= len(pairs):
+            return False, 'no pending pair'
+        student_id, quiz_id = pairs[n]
+        status, _ = client.request(
+            'POST', f"/take-quiz/{quiz_id}", cookie=sign(student_id, 'student'),
+            data=fixtures['answers'].get(quiz_id, {}), headers={'Accept': 'application/json'}
+        )
+        return status in (202, 302), status
+
+    def ai_generate(client, n):
+        cookie = teachers[n % len(teachers)]
+        # A new topic each time, so the generation cache does not answer
+        prompt = {'topics': [f"load topic {n} {time.time_ns()}"], 'num_questions': 5,
+                  'difficulty': 'medium', 'type': 'multiple choice'}
+        status, body = client.request('POST', '/api/generate-quiz-api', cookie=cookie, json=prompt)
+        if status != 202:
+            return False, status
+        deadline = time.monotonic() + args.generation_timeout
+        while time.monotonic() < deadline:
+            status, job = client.request('GET', body['status_url'], cookie=cookie)
+            if job and job['status'] in ('completed', 'failed'):
+                return job['status'] == 'completed', job['status']
+            time.sleep(0.05)
+        return False, 'timeout'
+
+    return {
+        'login': login,
+        'student_dashboard': get('/student-dashboard', students),
+        'teacher_dashboard': get('/teacher-dashboard', teachers),
+        'reports': get('/reports', teachers),
+        'take_quiz': take_quiz,
+        'ai_generate': ai_generate
+    }
+
+
+def run_scenario(operation, make_client, count, concurrency, warmup):
+    local = threading.local()
+
+    def client():
+        if not hasattr(local, 'client'):
+            local.client = make_client()
+        return local.client
+
+    def timed(n):
+        start = time.perf_counter()
+        ok, status = operation(client(), n)
+        return time.perf_counter() - start, ok, status
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda n: operation(client(), n), range(count, count + warmup)))
+        started = time.perf_counter()
+        outcomes = list(pool.map(timed, range(count)))
+        elapsed = time.perf_counter() - started
+
+    latencies = [latency for latency, ok, _ in outcomes if ok]
+    failures = {}
+    for _, ok, status in outcomes:
+        if not ok:
+            failures[str(status)] = failures.get(str(status), 0) + 1
+    return {
+        'requests': count,
+        'ok': len(latencies),
+        'failures': failures,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1) if elapsed else None,
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 1) if latencies else None,
+        'p50_ms': percentile(latencies, 50),
+        'p90_ms': percentile(latencies, 90),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': round(max(latencies) * 1000, 1) if latencies else None
+    }
+
+
+def compare(base, new):
+    for field in ('target', 'dataset'):
+        if base.get(field) != new.get(field):
+            print(f"Note: {field} differs from the base run ({base.get(field)} vs {new.get(field)})", file=sys.stderr)
+    print(f"{'scenario':<20}{'metric':<16}{'base':>12}{'new':>12}{'change':>10}")
+    for name, result in new['scenarios'].items():
+        before = base.get('scenarios', {}).get(name)
+        if not before:
+            continue
+        for metric in ('throughput_rps', 'p50_ms', 'p99_ms'):
+            old, current = before.get(metric), result.get(metric)
+            change = f"{(current - old) / old * 100:+.1f}%" if old and current is not None else '-'
+            print(f"{name:<20}{metric:<16}{str(old):>12}{str(current):>12}{change:>10}")
+
+
+def copy_database(db_path, workdir):
+    # The backup API also carries whatever is still in the -wal file
+    target = os.path.join(workdir, os.path.basename(db_path))
+    with sqlite3.connect(db_path) as source, sqlite3.connect(target) as copy:
+        source.backup(copy)
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--db', help='Seeded SQLite file; a temporary one at --scale is seeded when omitted')
+    parser.add_argument('--scale', choices=SCALES, default='10k', help='Seeder preset when --db is omitted')
+    parser.add_argument('--http', action='store_true', help='Drive a werkzeug server in this process over HTTP')
+    parser.add_argument('--base-url', help='Drive an already running app that uses --db')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS))
+    parser.add_argument('--requests', type=int, default=200, help='Operations per scenario')
+    parser.add_argument('--generations', type=int, default=10, help='Operations for ai_generate')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--warmup', type=int, default=5, help='Unrecorded operations before each scenario')
+    parser.add_argument('--llm-url', help='Model server to use instead of the stub')
+    parser.add_argument('--llm-latency', type=float, default=0.5, help='Seconds the stub takes per call')
+    parser.add_argument('--generation-timeout', type=float, default=120)
+    parser.add_argument('--output', help=f'Result file (default {os.path.relpath(RESULTS_DIR, ROOT)}/<time>-<commit>.json)')
+    parser.add_argument('--compare', help='Earlier result file to print changes against')
+    args = parser.parse_args()
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    workdir = tempfile.mkdtemp()
+    if args.db is None:
+        if args.base_url:
+            parser.error('--base-url needs the --db the running app uses')
+        import migrations
+        from models import db
+
+        args.db = os.path.join(workdir, 'load.db')
+        seed_app = create_bench_app(args.db)
+        with seed_app.app_context():
+            migrations.create_schema(db)
+            seed(**SCALES[args.scale])
+            db.engine.dispose()
+        db_path = args.db
+    else:
+        db_path = args.db if args.base_url else copy_database(args.db, workdir)
+
+    # take_quiz and the warmups draw from the same pending pairs
+    fixtures = load_fixtures(db_path, max(args.requests + args.warmup, args.concurrency) * 2)
+
+    llm_stub = None
+    server = None
+    if args.base_url:
+        from config import Config
+        sign = session_signer(Config.SECRET_KEY)
+        make_client = lambda: HttpClient(args.base_url)
+    else:
+        llm_url = args.llm_url
+        if llm_url is None and 'ai_generate' in scenarios:
+            llm_stub, llm_url = start_llm_stub(args.llm_latency)
+        use_offline_env(workdir, db_path)
+        os.environ.setdefault('LOG_LEVEL', 'WARNING')
+        if llm_url:
+            os.environ['LLM_API_URL'] = llm_url
+
+        from app import create_app
+        app = create_app()
+        sign = session_signer(app.secret_key)
+        if args.http:
+            from werkzeug.serving import make_server
+            server = make_server('127.0.0.1', 0, app, threaded=True)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            base_url = f"http://127.0.0.1:{server.server_port}"
+            make_client = lambda: HttpClient(base_url)
+        else:
+            make_client = lambda: InProcessClient(app)
+
+    operations = build_operations(fixtures, sign, args)
+    report = {
+        **git_revision(),
+        'recorded_at': datetime.now().isoformat(timespec='seconds'),
+        'target': 'http' if args.http else ('external' if args.base_url else 'in-process'),
+        'machine': {'python': platform.python_version(), 'platform': platform.platform(), 'cpus': os.cpu_count()},
+        'options': {key: value for key, value in vars(args).items() if key not in ('output', 'compare')},
+        'dataset': fixtures['counts'],
+        'scenarios': {}
+    }
+    for name in scenarios:
+        count = args.generations if name == 'ai_generate' else args.requests
+        # take_quiz warmups would use up pairs the measured run needs
+        warmup = 0 if name in ('take_quiz', 'ai_generate') else args.warmup
+        report['scenarios'][name] = run_scenario(operations[name], make_client, count, args.concurrency, warmup)
+        print(f"{name}: {json.dumps(report['scenarios'][name])}", file=sys.stderr)
+
+    if server:
+        server.shutdown()
+    if llm_stub:
+        llm_stub.shutdown()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{report['commit'] or 'nogit'}{'-dirty' if report['dirty'] else ''}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2))
+    print(f"Saved {output}", file=sys.stderr)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Query-count regression check for the hot routes.
+
+Boots the real app against a seeded temporary database, requests each route
+in ``BUDGETS`` as the right kind of user and counts the SQL statements it
+issues. Exits non-zero if any route goes over budget, so it can gate CI.
+
+    python -m benchmarks.query_budget
+"""
+import os
+import sys
+import json
+import tempfile
+import argparse
+from contextlib import contextmanager
+from sqlalchemy import event
+from benchmarks.common import use_offline_env
+
+# Route budgets: (name, user type, method, path template, max queries).
+# The templates are filled from the ids picked in ``pick_fixtures``.
+BUDGETS = [
+    ('classroom_details', 'teacher', 'GET', '/classroom/{classroom_id}', 3),
+    ('quiz_details', 'teacher', 'GET', '/quiz/{teacher_quiz_id}', 4),
+    ('take_quiz_denied', 'student', 'GET', '/take-quiz/{denied_quiz_id}', 4),
+    ('take_quiz_submit', 'student', 'POST', '/take-quiz/{open_quiz_id}', 9),
+    ('student_dashboard', 'student', 'GET', '/student-dashboard', 3),
+    ('reports', 'teacher', 'GET', '/reports', 7),
+]
+
+
+@contextmanager
+def count_queries(engine):
+    """Collects every statement executed on ``engine`` inside the block"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+
+def pick_fixtures(db):
+    from models import QuizResult, QuizAssignment, Classroom, student_classroom
+
+    classroom = Classroom.query.first()
+    student_id, classroom_id = db.session.execute(
+        student_classroom.select().limit(1)
+    ).first()
+    assigned = {
+        row.quiz_id for row in db.session.query(QuizAssignment.quiz_id).join(
+            student_classroom, student_classroom.c.classroom_id == QuizAssignment.classroom_id
+        ).filter(student_classroom.c.user_id == student_id)
+    }
+    taken = {row.quiz_id for row in QuizResult.query.filter_by(user_id=student_id)}
+    quiz_ids = [row.quiz_id for row in db.session.query(QuizAssignment.quiz_id).distinct()]
+    return {
+        'teacher_id': classroom.teacher_id,
+        'classroom_id': classroom.id,
+        'teacher_quiz_id': classroom.assignments[0].quiz_id,
+        'student_id': student_id,
+        'open_quiz_id': next(q for q in sorted(assigned) if q not in taken),
+        'denied_quiz_id': next(q for q in quiz_ids if q not in assigned),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--results', type=int, default=5000)
+    parser.add_argument('--verbose', action='store_true', help='Print the statements of failing routes')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    use_offline_env(workdir, os.path.join(workdir, 'budget.db'))
+    # Budget the inline grading path (the fallback when the queue is full); a
+    # background grader would also add its statements to whichever route is running
+    os.environ['GRADING_ASYNC'] = 'false'
+
+    import migrations
+    from app import create_app
+    from models import db
+    from benchmarks.seed import seed
+
+    app = create_app(WTF_CSRF_ENABLED=False)
+    with app.app_context():
+        migrations.create_schema(db)
+        seed(results=args.results)
+        fixtures = pick_fixtures(db)
+        engine = db.engine
+
+    client = app.test_client()
+    report, failed = {}, False
+    for name, user_type, method, path, budget in BUDGETS:
+        with client.session_transaction() as sess:
+            sess['user_id'] = fixtures['teacher_id' if user_type == 'teacher' else 'student_id']
+            sess['user_type'] = user_type
+        with count_queries(engine) as statements:
+            response = client.open(path.format(**fixtures), method=method)
+        ok = len(statements) <= budget and response.status_code < 500
+        failed = failed or not ok
+        report[name] = {'status': response.status_code, 'queries': len(statements), 'budget': budget, 'ok': ok}
+        if args.verbose and not ok:
+            report[name]['statements'] = statements
+
+    print(json.dumps(report, indent=2))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
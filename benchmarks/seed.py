@@ -0,0 +1,190 @@
+"""Synthetic data seeder for benchmarks.
+
+``--scale`` picks a preset sized by its number of quiz results (10^3 to
+10^6); the other options override single figures of the preset. The same
+``--seed`` always produces the same data.
+
+    python -m benchmarks.seed --db /tmp/bench.db --scale 100k
+    python -m benchmarks.seed --db /tmp/big.db --scale 1m --students 50000
+"""
+import json
+import random
+import argparse
+from datetime import datetime, timedelta
+from flask import Flask
+from werkzeug.security import generate_password_hash
+import database
+import migrations
+import student_summary
+from models import (
+    db, User, Classroom, Quiz, Question, QuestionOption, QuizResult,
+    QuizAssignment, student_classroom
+)
+
+BENCH_PASSWORD = 'benchmark'
+CHUNK_SIZE = 5000
+
+# Keyword arguments for seed(), by number of results. Students are sized so
+# that assigned quizzes outnumber results and some are left to take
+SCALES = {
+    '1k': dict(teachers=5, students=300, classrooms_per_teacher=3, quizzes_per_teacher=10, results=1000),
+    '10k': dict(teachers=20, students=2000, classrooms_per_teacher=4, quizzes_per_teacher=15, results=10000),
+    '100k': dict(teachers=50, students=10000, classrooms_per_teacher=4, quizzes_per_teacher=20, results=100000),
+    '1m': dict(teachers=200, students=100000, classrooms_per_teacher=5, quizzes_per_teacher=30, results=1000000),
+}
+
+
+def create_bench_app(db_path):
+    """Minimal app bound to ``db_path``, without create_app's background workers"""
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{db_path}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    database.init_app(app, db)  # Same engine options and pragmas as the app
+    return app
+
+
+def _insert(table, rows):
+    """Insert ``rows`` (any iterable of dicts) CHUNK_SIZE at a time"""
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == CHUNK_SIZE:
+            db.session.execute(table.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(table.insert(), chunk)
+
+
+def seed(teachers=50, students=2000, classrooms_per_teacher=4, quizzes_per_teacher=20,
+         questions_per_quiz=10, results=100000, random_seed=42):
+    """Bulk-insert a synthetic school into the current app's database.
+
+    Must run inside an app context on an empty schema. Returns the row counts.
+    """
+    rng = random.Random(random_seed)
+    now = datetime.utcnow()
+    # One real hash shared by every account keeps seeding fast but logins valid
+    password_hash = generate_password_hash(BENCH_PASSWORD)
+
+    users = [
+        {'id': i + 1, 'name': f"Teacher {i + 1}", 'email': f"teacher{i + 1}@bench.test",
+         'password_hash': password_hash, 'user_type': 'teacher', 'created_at': now}
+        for i in range(teachers)
+    ] + [
+        {'id': teachers + i + 1, 'name': f"Student {i + 1}", 'email': f"student{i + 1}@bench.test",
+         'password_hash': password_hash, 'user_type': 'student', 'created_at': now}
+        for i in range(students)
+    ]
+    teacher_ids = [u['id'] for u in users[:teachers]]
+    student_ids = [u['id'] for u in users[teachers:]]
+    _insert(User.__table__, users)
+
+    classrooms = []
+    for teacher_id in teacher_ids:
+        for n in range(classrooms_per_teacher):
+            classrooms.append({'id': len(classrooms) + 1, 'name': f"Class {teacher_id}-{n + 1}", 'teacher_id': teacher_id})
+    _insert(Classroom.__table__, classrooms)
+
+    quizzes, questions, options = [], [], []
+    for teacher_id in teacher_ids:
+        for n in range(quizzes_per_teacher):
+            quiz_id = len(quizzes) + 1
+            quizzes.append({
+                'id': quiz_id, 'title': f"Quiz {teacher_id}-{n + 1}", 'description': 'Seeded quiz',
+                'created_date': now - timedelta(days=rng.randint(0, 180)),
+                'difficulty': rng.choice(['easy', 'medium', 'hard']), 'teacher_id': teacher_id
+            })
+            for q in range(questions_per_quiz):
+                question_id = len(questions) + 1
+                correct = rng.randrange(4)
+                questions.append({
+                    'id': question_id, 'quiz_id': quiz_id, 'text': f"Seeded question {q + 1} of quiz {quiz_id}?",
+                    'correct_answer': 'ABCD'[correct]
+                })
+                options.extend(
+                    {'question_id': question_id, 'ordinal': o, 'text': f"Choice {o + 1}", 'is_correct': o == correct}
+                    for o in range(4)
+                )
+    _insert(Quiz.__table__, quizzes)
+    _insert(Question.__table__, questions)
+    _insert(QuestionOption.__table__, options)
+
+    # Quizzes are assigned to one or two of their teacher's classrooms
+    classrooms_by_teacher = {}
+    for classroom in classrooms:
+        classrooms_by_teacher.setdefault(classroom['teacher_id'], []).append(classroom['id'])
+    assignments, quizzes_by_classroom = [], {}
+    for quiz in quizzes:
+        own = classrooms_by_teacher[quiz['teacher_id']]
+        for classroom_id in rng.sample(own, min(len(own), rng.randint(1, 2))):
+            assignments.append({
+                'quiz_id': quiz['id'], 'classroom_id': classroom_id,
+                'due_date': now + timedelta(days=rng.randint(-60, 30))
+            })
+            quizzes_by_classroom.setdefault(classroom_id, []).append(quiz['id'])
+    _insert(QuizAssignment.__table__, assignments)
+
+    enrolments = set()
+    classroom_ids = [c['id'] for c in classrooms]
+    for student_id in student_ids:
+        for classroom_id in rng.sample(classroom_ids, min(len(classroom_ids), rng.randint(1, 3))):
+            enrolments.add((student_id, classroom_id))
+    _insert(student_classroom, [{'user_id': s, 'classroom_id': c} for s, c in enrolments])
+
+    # Prefer attempts on quizzes the student can actually see, then pad with random pairs
+    accessible = {
+        (student_id, quiz_id)
+        for student_id, classroom_id in enrolments
+        for quiz_id in quizzes_by_classroom.get(classroom_id, ())
+    }
+    pairs = rng.sample(sorted(accessible), min(results, len(accessible)))
+    chosen = set(pairs)
+    max_pairs = len(student_ids) * len(quizzes)
+    while len(pairs) < min(results, max_pairs):
+        pair = (rng.choice(student_ids), rng.randint(1, len(quizzes)))
+        if pair not in chosen:
+            chosen.add(pair)
+            pairs.append(pair)
+    # A generator, so a million result rows are never built up front
+    _insert(QuizResult.__table__, (
+        {'user_id': s, 'quiz_id': q, 'score': round(rng.betavariate(5, 2) * 100, 1),
+         'completed_date': now - timedelta(minutes=rng.randint(0, 60 * 24 * 120))}
+        for s, q in pairs
+    ))
+
+    # Bulk inserts skip the ORM flush hooks, so derive the dashboard read model in one pass
+    student_summary.rebuild(db.session.connection())
+    db.session.commit()
+    return {
+        'users': len(users), 'classrooms': len(classrooms), 'quizzes': len(quizzes),
+        'questions': len(questions), 'assignments': len(assignments),
+        'enrolments': len(enrolments), 'results': len(pairs)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--db', required=True, help='SQLite file to create/seed')
+    parser.add_argument('--scale', choices=SCALES, default='100k')
+    parser.add_argument('--teachers', type=int)
+    parser.add_argument('--students', type=int)
+    parser.add_argument('--classrooms-per-teacher', type=int)
+    parser.add_argument('--quizzes-per-teacher', type=int)
+    parser.add_argument('--questions-per-quiz', type=int)
+    parser.add_argument('--results', type=int)
+    parser.add_argument('--seed', type=int, default=42, dest='random_seed')
+    args = parser.parse_args()
+
+    options = dict(SCALES[args.scale], random_seed=args.random_seed)
+    for name in ('teachers', 'students', 'classrooms_per_teacher', 'quizzes_per_teacher', 'questions_per_quiz', 'results'):
+        if getattr(args, name) is not None:
+            options[name] = getattr(args, name)
+
+    app = create_bench_app(args.db)
+    with app.app_context():
+        migrations.create_schema(db)
+        print(json.dumps(seed(**options), indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,343 @@
+"""Streaming bulk import/export of quizzes and quiz results as JSONL or CSV.
+
+Exporters are generators of text lines fed by server-side cursors
+(``yield_per``), so a semester of results never sits in memory at once.
+Importers read any iterable of lines and write in chunks, one transaction
+per chunk. Quizzes go through quiz_authoring; results use Core bulk inserts
+followed by a targeted rebuild of the dashboard read model.
+
+The same functions back the ``flask quiz import/export`` commands and the
+/api/export and /api/import endpoints.
+
+Formats
+-------
+quizzes, JSONL: one quiz per line, as accepted by quiz_authoring.
+quizzes, CSV:   one question per row, with consecutive rows for the same
+                quiz_title grouped into one quiz. Options are a JSON array of
+                strings, e.g. ["4", "5 | five"], so any text survives a
+                round trip; any other options cell skips the quiz.
+results, both:  student_email, quiz_id, quiz_title, score, completed_date
+                (ISO 8601). Imports need only student_email, quiz_id and score.
+"""
+import io
+import csv
+import json
+import logging
+from datetime import datetime
+from itertools import groupby
+import click
+from flask.cli import AppGroup
+from sqlalchemy import select, insert, tuple_
+from models import db, User, Quiz, Question, QuizResult
+import quiz_authoring
+import student_summary
+from reports import report_engine
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+KINDS = ('quizzes', 'results')
+QUIZ_CSV_FIELDS = ['quiz_title', 'quiz_description', 'difficulty', 'question_text', 'correct_answer', 'options']
+RESULT_CSV_FIELDS = ['student_email', 'quiz_id', 'quiz_title', 'score', 'completed_date']
+YIELD_PER = 1000
+CHUNK_SIZE = 1000
+MAX_REPORTED_ERRORS = 20
+
+quiz_cli = AppGroup('quiz', help='Bulk import/export of quizzes and results.')
+
+
+def init_app(app):
+    app.cli.add_command(quiz_cli)
+
+
+# Export
+
+def export_lines(kind, teacher_id, fmt):
+    """Text lines (with newlines) for every quiz or result owned by the teacher"""
+    rows = export_quizzes(teacher_id) if kind == 'quizzes' else export_results(teacher_id)
+    if fmt == 'jsonl':
+        for row in rows:
+            yield json.dumps(row, default=str) + '\n'
+        return
+
+    fields = QUIZ_CSV_FIELDS if kind == 'quizzes' else RESULT_CSV_FIELDS
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=fields)
+    writer.writeheader()
+    for row in rows:
+        for csv_row in (_quiz_csv_rows(row) if kind == 'quizzes' else [row]):
+            writer.writerow(csv_row)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_quizzes(teacher_id):
+    quizzes = db.session.execute(
+        select(Quiz)
+        .where(Quiz.teacher_id == teacher_id)
+        .order_by(Quiz.id)
+        .options(db.selectinload(Quiz.questions).selectinload(Question.options))
+        .execution_options(yield_per=YIELD_PER // 10)
+    ).scalars()
+    for quiz in quizzes:
+        yield {
+            'title': quiz.title,
+            'description': quiz.description or '',
+            'difficulty': quiz.difficulty,
+            'questions': [
+                {
+                    'text': question.text,
+                    'options': [option.text for option in question.options],
+                    'correct_answer': question.correct_answer
+                }
+                for question in sorted(quiz.questions, key=lambda q: q.id)
+            ]
+        }
+
+
+def export_results(teacher_id):
+    rows = db.session.execute(
+        select(User.email, QuizResult.quiz_id, Quiz.title, QuizResult.score, QuizResult.completed_date)
+        .join(User, User.id == QuizResult.user_id)
+        .join(Quiz, Quiz.id == QuizResult.quiz_id)
+        .where(Quiz.teacher_id == teacher_id)
+        .order_by(QuizResult.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    for email, quiz_id, title, score, completed_date in rows:
+        yield {
+            'student_email': email,
+            'quiz_id': quiz_id,
+            'quiz_title': title,
+            'score': score,
+            'completed_date': completed_date.isoformat() if completed_date else None
+        }
+
+
+def _quiz_csv_rows(quiz):
+    for question in quiz['questions']:
+        yield {
+            'quiz_title': quiz['title'],
+            'quiz_description': quiz['description'],
+            'difficulty': quiz['difficulty'],
+            'question_text': question['text'],
+            'correct_answer': question['correct_answer'],
+            'options': json.dumps(question['options'])
+        }
+
+
+# Import
+
+def import_lines(kind, teacher_id, lines, fmt, chunk_size=CHUNK_SIZE):
+    """Import an iterable of text lines; returns counts and the first errors"""
+    summary = _new_summary()
+    records = _jsonl_records(lines, summary) if fmt == 'jsonl' else csv.DictReader(lines)
+    if kind == 'quizzes':
+        if fmt == 'csv':
+            records = _quizzes_from_csv(records, summary)
+        return import_quizzes(teacher_id, records, chunk_size, summary)
+    return import_results(teacher_id, records, chunk_size, summary)
+
+
+def _jsonl_records(lines, summary):
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            _skip(summary, f"Line {number}: {e}")
+
+
+def import_quizzes(teacher_id, quizzes, chunk_size=CHUNK_SIZE, summary=None):
+    summary = summary or _new_summary()
+    chunk, questions = [], 0
+    for quiz in quizzes:
+        chunk.append(quiz)
+        questions += len(quiz.get('questions') or []) if isinstance(quiz, dict) else 0
+        if questions >= chunk_size:
+            _write_quizzes(teacher_id, chunk, summary)
+            chunk, questions = [], 0
+    if chunk:
+        _write_quizzes(teacher_id, chunk, summary)
+    return summary
+
+
+def _write_quizzes(teacher_id, chunk, summary):
+    try:
+        quiz_authoring.create_quizzes(teacher_id, chunk)
+        db.session.commit()
+        summary['imported'] += len(chunk)
+        return
+    except quiz_authoring.QuizValidationError:
+        db.session.rollback()
+    # Retry one by one so a single bad quiz does not sink the whole chunk
+    for quiz in chunk:
+        try:
+            quiz_authoring.create_quizzes(teacher_id, [quiz])
+            db.session.commit()
+            summary['imported'] += 1
+        except quiz_authoring.QuizValidationError as e:
+            db.session.rollback()
+            title = quiz.get('title') if isinstance(quiz, dict) else None
+            _skip(summary, f"{title or '(untitled)'}: {str(e).split(': ', 1)[-1]}")
+
+
+def _quizzes_from_csv(rows, summary):
+    for title, group in groupby(rows, key=lambda row: row.get('quiz_title', '')):
+        group = list(group)
+        try:
+            questions = [
+                {
+                    'text': row.get('question_text', ''),
+                    'correct_answer': row.get('correct_answer', ''),
+                    'options': _csv_options(row.get('options'))
+                }
+                for row in group
+            ]
+        except ValueError as e:
+            _skip(summary, f"{title or '(untitled)'}: {e}")
+            continue
+        yield {
+            'title': title,
+            'description': group[0].get('quiz_description', ''),
+            'difficulty': group[0].get('difficulty') or 'medium',
+            'questions': questions
+        }
+
+
+def _csv_options(cell):
+    # A separator-joined list cannot tell "a|b" from two options, so only a JSON array is accepted
+    if not (cell or '').strip():
+        return []
+    try:
+        options = json.loads(cell)
+    except ValueError:
+        options = None
+    if not isinstance(options, list) or not all(isinstance(o, str) for o in options):
+        raise ValueError(f"options must be a JSON array of strings, got {cell[:50]!r}")
+    return [o for o in options if o]
+
+
+def import_results(teacher_id, records, chunk_size=CHUNK_SIZE, summary=None):
+    summary = summary or _new_summary()
+    own_quizzes = set(db.session.execute(select(Quiz.id).where(Quiz.teacher_id == teacher_id)).scalars())
+    chunk = []
+    for record in records:
+        chunk.append(record)
+        if len(chunk) >= chunk_size:
+            _write_results(chunk, own_quizzes, summary)
+            chunk = []
+    if chunk:
+        _write_results(chunk, own_quizzes, summary)
+    report_engine.invalidate([teacher_id])
+    return summary
+
+
+def _write_results(chunk, own_quizzes, summary):
+    emails = {str(record.get('student_email', '')).strip().lower() for record in chunk}
+    students = dict(db.session.execute(
+        select(User.email, User.id).where(User.email.in_(emails), User.user_type == 'student')
+    ).all())
+    students = {email.lower(): user_id for email, user_id in students.items()}
+
+    rows = []
+    for record in chunk:
+        try:
+            row = {
+                'user_id': students[str(record.get('student_email', '')).strip().lower()],
+                'quiz_id': int(record['quiz_id']),
+                'score': float(record['score']),
+                'completed_date': _parse_date(record.get('completed_date'))
+            }
+        except KeyError as e:
+            _skip(summary, f"{record.get('student_email')}: unknown student or missing field {e}")
+            continue
+        except (TypeError, ValueError) as e:
+            _skip(summary, f"{record.get('student_email')}: {e}")
+            continue
+        if row['quiz_id'] not in own_quizzes:
+            _skip(summary, f"{record.get('student_email')}: quiz {row['quiz_id']} is not yours")
+            continue
+        rows.append(row)
+
+    # One result per student and quiz: skip pairs already stored or repeated in the file
+    existing = set(db.session.execute(
+        select(QuizResult.user_id, QuizResult.quiz_id).where(
+            tuple_(QuizResult.user_id, QuizResult.quiz_id).in_({(r['user_id'], r['quiz_id']) for r in rows})
+        )
+    ).all()) if rows else set()
+    fresh = []
+    for row in rows:
+        pair = (row['user_id'], row['quiz_id'])
+        if pair in existing:
+            summary['skipped'] += 1
+            continue
+        existing.add(pair)
+        fresh.append(row)
+
+    if fresh:
+        db.session.execute(insert(QuizResult.__table__), fresh)
+        # Core inserts bypass the flush hooks that maintain the dashboard read model
+        student_summary.rebuild(db.session.connection(), {row['user_id'] for row in fresh})
+    db.session.commit()
+    summary['imported'] += len(fresh)
+
+
+def _parse_date(value):
+    if not value:
+        return datetime.utcnow()
+    return datetime.fromisoformat(str(value))
+
+
+def _new_summary():
+    return {'imported': 0, 'skipped': 0, 'errors': []}
+
+
+def _skip(summary, message):
+    summary['skipped'] += 1
+    if len(summary['errors']) < MAX_REPORTED_ERRORS:
+        summary['errors'].append(message)
+
+
+# CLI
+
+def _teacher_id(email):
+    teacher = User.query.filter_by(email=email, user_type='teacher').first()
+    if not teacher:
+        raise click.BadParameter(f"No teacher with email {email}", param_hint='--teacher')
+    return teacher.id
+
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path and path.lower().endswith('.csv') else 'jsonl'
+
+
+@quiz_cli.command('export')
+@click.argument('kind', type=click.Choice(KINDS))
+@click.option('--teacher', required=True, help='Email of the teacher whose data to export.')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults from the file extension, else jsonl.')
+@click.option('--output', '-o', default='-', help='File to write, or - for stdout.')
+def export_command(kind, teacher, fmt, output):
+    """Stream a teacher's quizzes or results to JSONL/CSV."""
+    fmt = _format_for(output, fmt)
+    with click.open_file(output, 'w', encoding='utf-8') as f:
+        for line in export_lines(kind, _teacher_id(teacher), fmt):
+            f.write(line)
+
+
+@quiz_cli.command('import')
+@click.argument('kind', type=click.Choice(KINDS))
+@click.argument('path')
+@click.option('--teacher', required=True, help='Email of the teacher who will own the data.')
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), help='Defaults from the file extension, else jsonl.')
+@click.option('--chunk-size', default=CHUNK_SIZE, show_default=True, help='Rows (questions for quizzes) per transaction.')
+def import_command(kind, path, teacher, fmt, chunk_size):
+    """Import quizzes or results from a JSONL/CSV file (- for stdin)."""
+    with click.open_file(path, 'r', encoding='utf-8') as f:
+        summary = import_lines(kind, _teacher_id(teacher), f, _format_for(path, fmt), chunk_size)
+    click.echo(json.dumps(summary, indent=2))
@@ -0,0 +1,89 @@
+"""Configuration objects for ``create_app``.
+
+Every setting is read from the environment (and a ``.env`` file) when this
+module is imported. Pick a config with ``create_app('config.DevelopmentConfig')``
+or APP_CONFIG; keyword overrides to create_app win over both.
+"""
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+class Config:
+    SECRET_KEY = os.getenv('SECRET_KEY', 'your_secret_key')
+    LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
+    LOG_LEVELS = os.getenv('LOG_LEVELS', '')  # e.g. "ai_quiz_generator=DEBUG,werkzeug=WARNING"
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'json')
+    LOG_PAYLOAD_SAMPLE_RATE = float(os.getenv('LOG_PAYLOAD_SAMPLE_RATE', 0.01))
+    METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')  # Unset leaves /metrics open; set it outside private networks
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))  # 0: only requests with X-Profile-Token
+    PROFILE_ENDPOINTS = os.getenv('PROFILE_ENDPOINTS', '')  # e.g. "main.student_dashboard,main.quiz_details"
+    PROFILE_INTERVAL = float(os.getenv('PROFILE_INTERVAL', 0.005))  # Seconds between stack samples
+    PROFILE_KEEP = int(os.getenv('PROFILE_KEEP', 200))
+    PROFILE_DIR = os.getenv('PROFILE_DIR')  # Unset: <instance>/profiles
+    PROFILE_TOKEN_MAX_AGE = int(os.getenv('PROFILE_TOKEN_MAX_AGE', 3600))
+    PROFILE_ADMINS = os.getenv('PROFILE_ADMINS', '')  # Teacher emails allowed to open /admin/profiles
+    SQLALCHEMY_DATABASE_URI = os.getenv('DATABASE_URL', 'sqlite:///classquiz.db')
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    DATABASE_POOL_SIZE = int(os.getenv('DATABASE_POOL_SIZE', 10))
+    DATABASE_MAX_OVERFLOW = int(os.getenv('DATABASE_MAX_OVERFLOW', 20))
+    DATABASE_POOL_TIMEOUT = float(os.getenv('DATABASE_POOL_TIMEOUT', 30))
+    DATABASE_POOL_RECYCLE = int(os.getenv('DATABASE_POOL_RECYCLE', 1800))
+    DATABASE_POOL_PRE_PING = os.getenv('DATABASE_POOL_PRE_PING', 'true').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_BUSY_TIMEOUT = int(os.getenv('SQLITE_BUSY_TIMEOUT', 5000))  # milliseconds
+    SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL')
+    GENERATION_WORKERS = int(os.getenv('GENERATION_WORKERS', 2))
+    GENERATION_HEARTBEAT_INTERVAL = float(os.getenv('GENERATION_HEARTBEAT_INTERVAL', 30))
+    GENERATION_CACHE_SIZE = int(os.getenv('GENERATION_CACHE_SIZE', 256))
+    GENERATION_CACHE_TTL = int(os.getenv('GENERATION_CACHE_TTL', 24 * 3600))
+    GENERATION_CACHE_PATH = os.getenv('GENERATION_CACHE_PATH')  # Unset disables the disk tier
+    LLM_RATE_PER_SECOND = float(os.getenv('LLM_RATE_PER_SECOND', 1))
+    LLM_BURST = int(os.getenv('LLM_BURST', 2))
+    LLM_MAX_IN_FLIGHT = int(os.getenv('LLM_MAX_IN_FLIGHT', 2))
+    LLM_QUEUE_TIMEOUT = float(os.getenv('LLM_QUEUE_TIMEOUT', 30))
+    LLM_LOCK_DIR = os.getenv('LLM_LOCK_DIR')  # Set to share limits across worker processes
+    LLM_API_URL = os.getenv('LLM_API_URL', 'http://localhost:11434/api/generate')
+    LLM_MODEL = os.getenv('LLM_MODEL', 'mistral')
+    LLM_POOL_SIZE = int(os.getenv('LLM_POOL_SIZE', 4))
+    LLM_CONNECT_TIMEOUT = float(os.getenv('LLM_CONNECT_TIMEOUT', 5))
+    LLM_READ_TIMEOUT = float(os.getenv('LLM_READ_TIMEOUT', 180))
+    LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', 2))
+    LLM_MAX_FANOUT_QUESTIONS = int(os.getenv('LLM_MAX_FANOUT_QUESTIONS', 100))
+    LLM_FANOUT_THRESHOLD = int(os.getenv('LLM_FANOUT_THRESHOLD', 10))
+    LLM_FANOUT_CHUNK_SIZE = int(os.getenv('LLM_FANOUT_CHUNK_SIZE', 5))
+    LLM_FANOUT_WORKERS = int(os.getenv('LLM_FANOUT_WORKERS', 4))
+    QUESTION_BANK_BACKEND = os.getenv('QUESTION_BANK_BACKEND', 'mysql')
+    QUESTION_BANK_POOL_SIZE = int(os.getenv('QUESTION_BANK_POOL_SIZE', 5))
+    QUESTION_BANK_SQLITE_PATH = os.getenv('QUESTION_BANK_SQLITE_PATH', ':memory:')
+    QUESTION_WRITER_BATCH_SIZE = int(os.getenv('QUESTION_WRITER_BATCH_SIZE', 500))
+    QUESTION_WRITER_FLUSH_INTERVAL = float(os.getenv('QUESTION_WRITER_FLUSH_INTERVAL', 2))
+    QUESTION_WRITER_MAX_QUEUE = int(os.getenv('QUESTION_WRITER_MAX_QUEUE', 10000))
+    STUDENT_DASHBOARD_PAGE_SIZE = int(os.getenv('STUDENT_DASHBOARD_PAGE_SIZE', 20))
+    REPORT_CACHE_TTL = int(os.getenv('REPORT_CACHE_TTL', 300))
+    PAGE_CACHE_SIZE = int(os.getenv('PAGE_CACHE_SIZE', 512))
+    PAGE_CACHE_TTL = int(os.getenv('PAGE_CACHE_TTL', 300))
+    PAGE_CACHE_REDIS_URL = os.getenv('PAGE_CACHE_REDIS_URL')  # Unset keeps the cache in-process
+    PAGE_CACHE_VERSIONS_PATH = os.getenv('PAGE_CACHE_VERSIONS_PATH')  # Unset: <instance>/page_cache_versions.db
+    QUESTION_WRITER_SPOOL_DIR = os.getenv('QUESTION_WRITER_SPOOL_DIR')  # Unset: <instance>/question_spool
+    PASSWORD_HASH_METHOD = os.getenv('PASSWORD_HASH_METHOD', 'scrypt')  # Any Werkzeug method string
+    PASSWORD_HASH_WORKERS = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv('PASSWORD_HASH_MAX_PENDING', 256))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv('PASSWORD_HASH_TIMEOUT', 10))
+    GRADING_ASYNC = os.getenv('GRADING_ASYNC', 'true').lower() == 'true'
+    GRADING_BATCH_SIZE = int(os.getenv('GRADING_BATCH_SIZE', 200))
+    GRADING_FLUSH_INTERVAL = float(os.getenv('GRADING_FLUSH_INTERVAL', 0.2))
+    GRADING_MAX_QUEUE = int(os.getenv('GRADING_MAX_QUEUE', 20000))
+    GRADING_SPOOL_DIR = os.getenv('GRADING_SPOOL_DIR')  # Unset: <instance>/grading_spool
+
+
+class DevelopmentConfig(Config):
+    DEBUG = True
+    LOG_FORMAT = os.getenv('LOG_FORMAT', 'text')
+
+
+class ProductionConfig(Config):
+    SESSION_COOKIE_SECURE = True
+    SESSION_COOKIE_HTTPONLY = True
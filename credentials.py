@@ -0,0 +1,123 @@
+"""Password hashing and verification off the request thread.
+
+Hashes are computed in a bounded process pool (PASSWORD_HASH_WORKERS), so a
+login storm at the start of a class period queues for a fixed number of
+workers. Without the pool, every request thread runs its own KDF at once:
+scrypt's defaults need 32 MB per hash, and the CPU is split between hundreds
+of hashes. At most PASSWORD_HASH_MAX_PENDING hashes wait for the pool; past
+that, callers wait up to PASSWORD_HASH_TIMEOUT seconds and then get
+CredentialServiceBusy.
+
+PASSWORD_HASH_METHOD takes any Werkzeug method string, e.g. ``scrypt``,
+``scrypt:16384:8:1`` or ``pbkdf2:sha256:600000``. A stored hash made with
+other parameters is replaced on the user's next successful login.
+PASSWORD_HASH_WORKERS=0 hashes on the calling thread, still bounded.
+"""
+import os
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from werkzeug.security import generate_password_hash, check_password_hash
+
+logger = logging.getLogger(__name__)
+
+
+class CredentialServiceBusy(RuntimeError):
+    pass
+
+
+class CredentialService:
+    def __init__(self, method='scrypt', workers=2, max_pending=256, timeout=10):
+        self.method = method
+        self.workers = workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._params = None
+        self._pool = None
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self.rehashed = 0
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.max_pending = app.config.get('PASSWORD_HASH_MAX_PENDING', self.max_pending)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._params = None
+        app.extensions['credentials'] = self
+
+    @property
+    def params(self):
+        """The configured method with Werkzeug's defaults filled in, as stored in front of the salt"""
+        if self._params is None:
+            self._params = generate_password_hash('', self.method).split('$', 1)[0]
+        return self._params
+
+    def hash_password(self, password):
+        return self._run(generate_password_hash, password, self.params)
+
+    def verify(self, password_hash, password):
+        return self._run(check_password_hash, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        return password_hash.split('$', 1)[0] != self.params
+
+    def check_password(self, user, password):
+        """Verify ``user``'s password, upgrading the stored hash when the parameters changed.
+
+        The new hash is set on ``user``; the caller commits it.
+        """
+        if not self.verify(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            user.password_hash = self.hash_password(password)
+            self.rehashed += 1
+            logger.info(f"Rehashed password for user {user.id} with {self.params}")
+        return True
+
+    def stats(self):
+        return {'method': self.params, 'workers': self.workers, 'rehashed': self.rehashed}
+
+    def _run(self, fn, *args):
+        if not self._slots.acquire(timeout=self.timeout):
+            raise CredentialServiceBusy("Too many password checks waiting")
+        try:
+            if not self.workers:
+                return fn(*args)
+            return self._executor().submit(fn, *args).result(timeout=self.timeout)
+        except TimeoutError:
+            raise CredentialServiceBusy("Password check timed out")
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool on the next call
+            with self._lock:
+                self._pool = None
+            raise CredentialServiceBusy("Password hashing workers restarted")
+        finally:
+            self._slots.release()
+
+    def _executor(self):
+        with self._lock:
+            if self._pool is None:
+                # By now the log listener, write-behind and grading threads are running, and forking a
+                # multithreaded process can copy a held lock into the child. Workers start from a clean
+                # forkserver (or spawn) instead; app import does no work, so re-importing __main__ is cheap
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                    context.set_forkserver_preload(['werkzeug.security'])
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                logger.info(f"Started {self.workers} password hashing workers ({self.params})")
+            return self._pool
+
+    def shutdown(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+                self._pool = None
+
+
+credential_service = CredentialService(workers=min(4, os.cpu_count() or 1))
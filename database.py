@@ -0,0 +1,87 @@
+"""Engine configuration for the main database.
+
+DATABASE_URL selects the backend: a SQLite file by default, or any
+SQLAlchemy URL (``mysql+mysqlconnector://...``, ``postgresql://...``) in
+production. ``init_app(app, db)`` turns the DATABASE_* settings into
+SQLALCHEMY_ENGINE_OPTIONS (pool size, overflow, pre-ping, recycle), keeping
+any options set explicitly, and then calls ``db.init_app`` itself so the
+pragmas below can be attached to this app's own engines.
+
+SQLite connections get ``journal_mode=WAL`` (readers no longer wait for the
+writer), ``busy_timeout`` (a writer waits for the lock instead of failing with
+"database is locked") and ``synchronous=NORMAL`` (no fsync per commit in WAL
+mode; a power loss can drop the last commits but cannot corrupt the file).
+"""
+import logging
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+logger = logging.getLogger(__name__)
+
+
+def engine_options(uri, config):
+    """SQLALCHEMY_ENGINE_OPTIONS suited to the backend of ``uri``"""
+    url = make_url(uri)
+    if url.get_backend_name() == 'sqlite':
+        if not url.database or url.database == ':memory:' or 'mode=memory' in str(url):
+            return {}  # A single shared connection; pool settings do not apply
+        return {
+            'pool_size': config.get('DATABASE_POOL_SIZE', 10),
+            'max_overflow': config.get('DATABASE_MAX_OVERFLOW', 20),
+            'pool_timeout': config.get('DATABASE_POOL_TIMEOUT', 30),
+            'connect_args': {'timeout': config.get('SQLITE_BUSY_TIMEOUT', 5000) / 1000}
+        }
+    return {
+        'pool_size': config.get('DATABASE_POOL_SIZE', 10),
+        'max_overflow': config.get('DATABASE_MAX_OVERFLOW', 20),
+        'pool_timeout': config.get('DATABASE_POOL_TIMEOUT', 30),
+        # Servers drop idle connections: test on checkout and retire them before the server does
+        'pool_pre_ping': config.get('DATABASE_POOL_PRE_PING', True),
+        'pool_recycle': config.get('DATABASE_POOL_RECYCLE', 1800)
+    }
+
+
+def sqlite_pragmas(config):
+    """(pragma, value) pairs applied to every new SQLite connection"""
+    pragmas = [
+        ('journal_mode', config.get('SQLITE_JOURNAL_MODE', 'WAL')),
+        ('busy_timeout', int(config.get('SQLITE_BUSY_TIMEOUT', 5000))),
+        ('synchronous', config.get('SQLITE_SYNCHRONOUS', 'NORMAL'))
+    ]
+    return [(name, value) for name, value in pragmas if value not in (None, '')]
+
+
+def apply_pragmas(dbapi_connection, pragmas):
+    cursor = dbapi_connection.cursor()
+    try:
+        for name, value in pragmas:
+            cursor.execute(f"PRAGMA {name}={value}")
+    finally:
+        cursor.close()
+
+
+def listen_once(target, identifier, fn):
+    """``event.listen`` unless ``fn`` is already registered, for global targets shared by every app"""
+    if not event.contains(target, identifier, fn):
+        event.listen(target, identifier, fn)
+
+
+def init_app(app, db):
+    uri = app.config['SQLALCHEMY_DATABASE_URI']
+    options = engine_options(uri, app.config)
+    options.update(app.config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    db.init_app(app)
+
+    pragmas = sqlite_pragmas(app.config)
+
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_pragmas(dbapi_connection, pragmas)
+
+    with app.app_context():
+        # Only this app's engines (binds included); a listener on the Engine class would outlive the app
+        for engine in db.engines.values():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', set_sqlite_pragmas)
+
+    logger.info(f"Database backend {make_url(uri).get_backend_name()} with engine options {options}")
@@ -0,0 +1,161 @@
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+
+class GenerationCache:
+    """Two-tier cache for generated questions.
+
+    The first tier is an in-process LRU; the optional second tier is a SQLite
+    file shared by every worker on the host. Both tiers expire entries after
+    ``ttl`` seconds and are bounded in size.
+    """
+
+    def __init__(self, max_entries=256, ttl=24 * 3600, db_path=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.db_path = db_path
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if self.db_path:
+            with self._connect() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS generation_cache (
+                        key TEXT PRIMARY KEY,
+                        questions TEXT NOT NULL,
+                        created_at REAL NOT NULL,
+                        last_access REAL NOT NULL
+                    )
+                """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_generation_cache_last_access "
+                    "ON generation_cache (last_access)"
+                )
+
+    @staticmethod
+    def make_key(prompt_data, model, temperature):
+        # Normalize so that 'Math, Algebra' and ' algebra,math ' share an entry
+        normalized = {
+            'topics': sorted({t.strip().lower() for t in prompt_data['topics'] if t.strip()}),
+            'type': prompt_data.get('type', 'multiple choice').strip().lower(),
+            'difficulty': prompt_data.get('difficulty', 'medium').strip().lower(),
+            'num_questions': int(prompt_data.get('num_questions', 1)),
+            'chunk': int(prompt_data.get('chunk', 0)),  # Fan-out sub-prompts each keep their own entry
+            'model': model,
+            'temperature': temperature
+        }
+        encoded = json.dumps(normalized, sort_keys=True).encode('utf-8')
+        return hashlib.sha256(encoded).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            if entry:
+                del self._entries[key]
+
+        questions = self._disk_get(key, now)
+        with self._lock:
+            if questions is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._store(key, questions, now)
+        return questions
+
+    def set(self, key, questions):
+        questions = [tuple(q) for q in questions]
+        now = time.time()
+        with self._lock:
+            self._store(key, questions, now)
+        self._disk_set(key, questions, now)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_ratio': (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+                'entries': len(self._entries)
+            }
+
+    def _store(self, key, questions, now):
+        self._entries[key] = (now + self.ttl, questions)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _disk_get(self, key, now):
+        if not self.db_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT questions, created_at FROM generation_cache WHERE key = ?",
+                    (key,)
+                ).fetchone()
+                if not row:
+                    return None
+                if row[1] + self.ttl <= now:
+                    conn.execute("DELETE FROM generation_cache WHERE key = ?", (key,))
+                    return None
+                conn.execute(
+                    "UPDATE generation_cache SET last_access = ? WHERE key = ?",
+                    (now, key)
+                )
+                return [tuple(q) for q in json.loads(row[0])]
+        except sqlite3.Error as e:
+            logger.warning(f"Generation cache read failed: {str(e)}")
+            return None
+
+    def _disk_set(self, key, questions, now):
+        if not self.db_path:
+            return
+        try:
+            with self._connect() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO generation_cache "
+                    "(key, questions, created_at, last_access) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(questions), now, now)
+                )
+                conn.execute(
+                    "DELETE FROM generation_cache WHERE created_at <= ?",
+                    (now - self.ttl,)
+                )
+                # Size bound: drop the least recently used rows beyond the limit
+                conn.execute(
+                    """DELETE FROM generation_cache WHERE key IN (
+                        SELECT key FROM generation_cache
+                        ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_disk_entries,)
+                )
+        except sqlite3.Error as e:
+            logger.warning(f"Generation cache write failed: {str(e)}")
@@ -0,0 +1,206 @@
+import json
+import uuid
+import logging
+import threading
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import inspect, update, or_, and_
+from models import db, GenerationJob
+from ai_quiz_generator import quiz_generator, format_questions
+import quiz_authoring
+
+logger = logging.getLogger(__name__)
+
+FINISHED_STATUSES = ('completed', 'failed')
+STALE_HEARTBEATS = 4  # Missed heartbeats before a running job is considered abandoned
+
+
+class GenerationJobQueue:
+    """Runs AI quiz generation on a bounded worker pool instead of the request thread.
+
+    Jobs are stored in the ``generation_jobs`` table, so anything still pending
+    when the process stops is picked up again in the background after the next
+    ``init_app``. A running job refreshes ``heartbeat_at`` every
+    ``heartbeat_interval`` seconds; only a job whose heartbeat has stopped for
+    ``STALE_HEARTBEATS`` intervals is treated as abandoned, however long the
+    generation itself takes.
+    """
+
+    def __init__(self, generator=quiz_generator, max_workers=2, heartbeat_interval=30):
+        self.generator = generator
+        self.max_workers = max_workers
+        self.heartbeat_interval = heartbeat_interval
+        self.app = None
+        self.executor = None
+        self.question_bank = None
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('GENERATION_WORKERS', self.max_workers)
+        self.heartbeat_interval = app.config.get('GENERATION_HEARTBEAT_INTERVAL', self.heartbeat_interval)
+        # Prefer the write-behind queue so jobs never wait on the question bank
+        self.question_bank = app.extensions.get('question_writer') or app.extensions.get('question_bank')
+        self.executor = ThreadPoolExecutor(
+            max_workers=self.max_workers,
+            thread_name_prefix='quiz-generation'
+        )
+        app.extensions['generation_jobs'] = self
+
+        # Off the startup path: a worker should not wait on the database before serving
+        self.executor.submit(self._resume)
+
+    def submit(self, prompt_data, teacher_id=None, save_to_bank=False):
+        job = GenerationJob(
+            id=uuid.uuid4().hex,
+            teacher_id=teacher_id,
+            prompt_data=json.dumps(prompt_data),
+            save_to_bank=save_to_bank,
+            status='pending'
+        )
+        db.session.add(job)
+        db.session.commit()
+
+        self.executor.submit(self._run, job.id)
+        return job
+
+    def _resume(self):
+        with self.app.app_context():
+            try:
+                if not inspect(db.engine).has_table(GenerationJob.__tablename__):
+                    # Schema not created yet (`flask db upgrade`), so there is nothing to resume
+                    logger.info("No generation_jobs table; skipping job resume")
+                    return
+                self.resume_unfinished()
+            except Exception as e:
+                logger.error(f"Could not resume generation jobs: {str(e)}")
+
+    def resume_unfinished(self):
+        # A running job whose heartbeat stopped belongs to a dead worker. One conditional UPDATE,
+        # so a job that heartbeats in the meantime is left alone
+        stale_before = datetime.utcnow() - timedelta(seconds=self.heartbeat_interval * STALE_HEARTBEATS)
+        reset = GenerationJob.query.filter(
+            GenerationJob.status == 'running',
+            or_(
+                GenerationJob.heartbeat_at < stale_before,
+                and_(GenerationJob.heartbeat_at.is_(None), GenerationJob.started_at < stale_before)
+            )
+        ).update({'status': 'pending'}, synchronize_session=False)
+        db.session.commit()
+        if reset:
+            logger.warning(f"Re-queued {reset} generation jobs abandoned by a dead worker")
+
+        pending = GenerationJob.query.filter_by(status='pending').all()
+        for job in pending:
+            self.executor.submit(self._run, job.id)
+        if pending:
+            logger.info(f"Resumed {len(pending)} pending generation jobs")
+
+    def _claim(self, job_id):
+        # Atomic pending -> running transition so two workers never run the same job
+        now = datetime.utcnow()
+        claimed = GenerationJob.query.filter_by(id=job_id, status='pending').update(
+            {'status': 'running', 'started_at': now, 'heartbeat_at': now},
+            synchronize_session=False
+        )
+        db.session.commit()
+        return claimed == 1
+
+    def _heartbeat(self, job_id, stop):
+        with self.app.app_context():
+            while not stop.wait(self.heartbeat_interval):
+                try:
+                    with db.engine.begin() as conn:
+                        conn.execute(
+                            update(GenerationJob.__table__)
+                            .where(GenerationJob.id == job_id, GenerationJob.status == 'running')
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                except Exception as e:
+                    logger.warning(f"Heartbeat for generation job {job_id} failed: {str(e)}")
+
+    def _run(self, job_id):
+        stop = threading.Event()
+        with self.app.app_context():
+            try:
+                if not self._claim(job_id):
+                    return
+                threading.Thread(
+                    target=self._heartbeat, args=(job_id, stop), name=f"generation-heartbeat-{job_id[:8]}", daemon=True
+                ).start()
+
+                job = db.session.get(GenerationJob, job_id)
+                prompt_data = json.loads(job.prompt_data)
+
+                def publish(questions):
+                    # Store partial results so pollers see progress early
+                    job.result = json.dumps([{"question": q, "answer": a} for q, a in questions])
+                    db.session.commit()
+
+                if int(prompt_data.get('num_questions', 1)) > self.generator.fanout_threshold:
+                    questions, error = self.generator.generate_questions_fanout(prompt_data, on_progress=publish)
+                    if error:
+                        raise ValueError(error)
+                    publish(questions)
+                else:
+                    questions = []
+                    for question in self.generator.stream_questions(prompt_data):
+                        questions.append(question)
+                        publish(questions)
+
+                if job.teacher_id:
+                    job.quiz_id = self._create_quiz(job.teacher_id, prompt_data, questions)
+                if job.save_to_bank and self.question_bank:
+                    self._save_to_bank(job, prompt_data, questions)
+                self._finish(job)
+            except Exception as e:
+                logger.error(f"Generation job {job_id} failed: {str(e)}", exc_info=True)
+                db.session.rollback()
+                job = db.session.get(GenerationJob, job_id)
+                if job:
+                    self._finish(job, error=str(e))
+            finally:
+                stop.set()
+                db.session.remove()
+
+    def _create_quiz(self, teacher_id, prompt_data, questions):
+        subject = ', '.join(prompt_data['topics'])
+        quiz_id, = quiz_authoring.create_quizzes(teacher_id, [{
+            'title': f"{subject} Quiz",
+            'description': f"AI-generated quiz about {subject}",
+            'difficulty': prompt_data.get('difficulty', 'medium'),
+            'questions': [
+                {'text': q['question'], 'options': q['options'], 'correct_answer': q['correct_answer']}
+                for q in format_questions(questions)
+                if q['question'].strip() and q['correct_answer'].strip()  # Skip unparseable model output
+            ]
+        }])
+        return quiz_id
+
+    def _save_to_bank(self, job, prompt_data, questions):
+        db_questions = [
+            (
+                json.dumps(prompt_data['topics']),
+                question,
+                answer,
+                prompt_data.get('type', 'multiple choice'),
+                prompt_data.get('difficulty', 'medium')
+            )
+            for question, answer in questions
+        ]
+        if hasattr(self.question_bank, 'enqueue'):
+            success, db_error = self.question_bank.enqueue(db_questions), "write queue is full"
+        else:
+            success, db_error = self.question_bank.save_questions(db_questions)
+        if not success:
+            # The questions themselves are still available from the job result
+            job.error = f"Questions generated but not saved: {db_error}"
+
+    def _finish(self, job, error=None):
+        job.status = 'failed' if error else 'completed'
+        if error:
+            job.error = error
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+generation_queue = GenerationJobQueue()
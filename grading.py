@@ -0,0 +1,172 @@
+"""Asynchronous grading of quiz submissions.
+
+take_quiz hands each submission to ``GradingPipeline.submit``, which appends
+it to a durable write-behind queue (an fsync'd spool, see write_behind.py)
+and returns a receipt straight away. A grader thread drains the queue in
+batches: it loads every quiz in the batch once, grades all submissions and
+writes their QuizResult/QuizResponses rows in a single transaction. A burst
+of submissions at a deadline becomes a few large commits instead of hundreds
+of small ones contending for the SQLite write lock.
+
+``status(receipt)`` reports 'queued', 'graded' (with the score), 'duplicate'
+or 'failed'. Recent outcomes are kept in memory; after a restart, or in
+another worker, graded receipts are found through QuizResult.receipt.
+"""
+import time
+import uuid
+import logging
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from sqlalchemy import select, tuple_
+from models import db, Quiz, Question, QuizResult, QuizResponses
+from write_behind import WriteBehindQueue
+
+logger = logging.getLogger(__name__)
+
+FIELDS = ('receipt', 'student_id', 'quiz_id', 'answers', 'submitted_at')
+
+
+class GradingPipeline:
+    def __init__(self, batch_size=200, flush_interval=0.2, max_queue=20000, max_statuses=20000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.max_statuses = max_statuses
+        self.app = None
+        self.queue = None
+        self._statuses = OrderedDict()  # receipt -> status dict
+        self._pending = {}  # (student_id, quiz_id) -> receipt still in the queue
+        self._lock = threading.Lock()
+        self.graded = 0
+        self.batches = 0
+
+    def init_app(self, app):
+        self.app = app
+        self.queue = WriteBehindQueue(
+            None,
+            batch_size=app.config.get('GRADING_BATCH_SIZE', self.batch_size),
+            flush_interval=app.config.get('GRADING_FLUSH_INTERVAL', self.flush_interval),
+            max_queue=app.config.get('GRADING_MAX_QUEUE', self.max_queue),
+            spool_dir=app.config.get('GRADING_SPOOL_DIR'),
+            max_backoff=5.0,
+            save=self._grade_batch,
+            name='grader'
+        )
+        app.extensions['grading'] = self
+        self.queue.start()
+
+    def submit(self, student_id, quiz_id, answers):
+        """Queue a submission; returns its receipt, or None when the queue is full"""
+        with self._lock:
+            # A double-clicked submit gets the receipt of the one already queued
+            receipt = self._pending.get((student_id, quiz_id))
+            if receipt:
+                return receipt
+            receipt = uuid.uuid4().hex
+            self._pending[(student_id, quiz_id)] = receipt
+            self._set_status(receipt, {'status': 'queued', 'student_id': student_id, 'quiz_id': quiz_id})
+
+        row = (receipt, student_id, quiz_id, {str(k): v for k, v in answers.items()}, time.time())
+        if not self.queue.enqueue([row]):
+            with self._lock:
+                self._pending.pop((student_id, quiz_id), None)
+                self._statuses.pop(receipt, None)
+            return None
+        return receipt
+
+    def status(self, receipt):
+        """Status dict for a receipt (including its student_id), or None if unknown"""
+        with self._lock:
+            status = self._statuses.get(receipt)
+        if status:
+            return dict(status)
+        result = QuizResult.query.filter_by(receipt=receipt).first()
+        if result:
+            return {
+                'status': 'graded', 'student_id': result.user_id, 'quiz_id': result.quiz_id,
+                'score': result.score, 'result_id': result.id
+            }
+        return None
+
+    def stats(self):
+        stats = self.queue.stats() if self.queue else {}
+        stats.update(graded=self.graded, grading_batches=self.batches)
+        return stats
+
+    def _set_status(self, receipt, status):
+        self._statuses[receipt] = status
+        self._statuses.move_to_end(receipt)
+        while len(self._statuses) > self.max_statuses:
+            self._statuses.popitem(last=False)
+
+    def _grade_batch(self, rows):
+        records = [dict(zip(FIELDS, row)) for row in rows]
+        outcomes = {}
+        with self.app.app_context():
+            try:
+                quizzes = {
+                    quiz.id: quiz for quiz in Quiz.query.options(
+                        db.selectinload(Quiz.questions).selectinload(Question.options)
+                    ).filter(Quiz.id.in_({r['quiz_id'] for r in records}))
+                }
+                # Results already stored (e.g. replayed from a spool after a crash) are not graded twice
+                taken = set(db.session.execute(
+                    select(QuizResult.user_id, QuizResult.quiz_id).where(
+                        tuple_(QuizResult.user_id, QuizResult.quiz_id).in_(
+                            {(r['student_id'], r['quiz_id']) for r in records}
+                        )
+                    )
+                ).all())
+
+                graded = []
+                for record in records:
+                    pair = (record['student_id'], record['quiz_id'])
+                    quiz = quizzes.get(record['quiz_id'])
+                    if quiz is None:
+                        outcomes[record['receipt']] = {'status': 'failed', 'error': 'Quiz not found'}
+                        continue
+                    if pair in taken:
+                        outcomes[record['receipt']] = {'status': 'duplicate'}
+                        continue
+                    taken.add(pair)
+
+                    responses = QuizResponses.from_answers(
+                        quiz.questions, {int(k): v for k, v in record['answers'].items()}
+                    )
+                    responses.quiz_id = quiz.id
+                    result = QuizResult(
+                        user_id=record['student_id'],
+                        quiz_id=quiz.id,
+                        score=responses.score,
+                        completed_date=datetime.utcfromtimestamp(record['submitted_at']),
+                        receipt=record['receipt'],
+                        responses=responses
+                    )
+                    db.session.add(result)
+                    graded.append((record['receipt'], result))
+
+                db.session.commit()
+                for receipt, result in graded:
+                    outcomes[receipt] = {'status': 'graded', 'score': result.score, 'result_id': result.id}
+            except Exception as e:
+                # Typically 'database is locked'. The batch stays spooled and is retried with backoff
+                db.session.rollback()
+                logger.error(f"Grading batch of {len(records)} failed: {str(e)}", exc_info=True)
+                return False, str(e)
+            finally:
+                db.session.remove()
+
+        with self._lock:
+            for record in records:
+                self._pending.pop((record['student_id'], record['quiz_id']), None)
+                outcome = outcomes[record['receipt']]
+                outcome.update(student_id=record['student_id'], quiz_id=record['quiz_id'])
+                self._set_status(record['receipt'], outcome)
+            self.graded += len(graded)
+            self.batches += 1
+        logger.info(f"Graded {len(graded)} of {len(records)} submissions in one transaction")
+        return True, ""
+
+
+grading_pipeline = GradingPipeline()
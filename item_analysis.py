@@ -0,0 +1,162 @@
+"""Classical item analysis over the stored per-question responses.
+
+Attempts are loaded into an (attempts x questions) response matrix and every
+statistic is a column-wise NumPy reduction over it, so the cost is a handful
+of vectorised passes however many attempts a quiz has:
+
+* p-value: share of attempts answering the question correctly;
+* discrimination: point-biserial correlation between the question and the
+  rest of the test (total minus the item, so it does not correlate with itself);
+* distractors: how often each option, a blank or an unmatched answer was given;
+* Cronbach's alpha over the attempts that saw every question.
+
+Questions added or removed after some attempts were graded are handled as
+"not administered" (NaN) for the attempts that never saw them.
+"""
+import string
+import logging
+from collections import defaultdict
+from sqlalchemy import select
+from models import db, Question, QuizResponses
+
+try:
+    import numpy as np
+except ImportError:  # item analysis is unavailable; the API reports it as such
+    np = None
+
+logger = logging.getLogger(__name__)
+
+LETTERS = string.ascii_uppercase
+UNMATCHED, BLANK = len(LETTERS), len(LETTERS) + 1
+NUM_CODES = len(LETTERS) + 2
+NOT_ADMINISTERED = -1
+
+# Conventional review thresholds
+EASY_P_VALUE = 0.9
+HARD_P_VALUE = 0.2
+LOW_DISCRIMINATION = 0.2
+
+
+def _code_table():
+    table = np.full(256, UNMATCHED, dtype=np.int8)
+    table[np.frombuffer(LETTERS.encode('ascii'), dtype=np.uint8)] = np.arange(len(LETTERS))
+    table[ord('-')] = BLANK
+    return table
+
+
+def load_response_matrix(quiz_id):
+    """(question_ids, codes, scored) for every graded attempt at a quiz.
+
+    ``codes`` is an int8 matrix of option indexes (UNMATCHED, BLANK or
+    NOT_ADMINISTERED otherwise); ``scored`` is 1.0/0.0, NaN where not administered.
+    """
+    groups = defaultdict(lambda: ([], []))
+    for ids, choices, correct in db.session.execute(
+        select(QuizResponses.question_ids, QuizResponses.choices, QuizResponses.correct)
+        .where(QuizResponses.quiz_id == quiz_id)
+    ):
+        if ids:
+            groups[ids][0].append(choices)
+            groups[ids][1].append(correct)
+
+    question_ids = sorted({int(i) for ids in groups for i in ids.split(',')})
+    column = {question_id: j for j, question_id in enumerate(question_ids)}
+    attempts = sum(len(choices) for choices, _ in groups.values())
+    codes = np.full((attempts, len(question_ids)), NOT_ADMINISTERED, dtype=np.int8)
+    scored = np.full((attempts, len(question_ids)), np.nan)
+
+    # Attempts graded against the same question list decode as one block
+    table, row = _code_table(), 0
+    for ids, (choices, correct) in groups.items():
+        columns = [column[int(i)] for i in ids.split(',')]
+        block = slice(row, row + len(choices))
+        shape = (len(choices), len(columns))
+        codes[block, columns] = table[np.frombuffer(''.join(choices).encode('ascii'), dtype=np.uint8).reshape(shape)]
+        scored[block, columns] = np.frombuffer(''.join(correct).encode('ascii'), dtype=np.uint8).reshape(shape) - ord('0')
+        row += len(choices)
+    return question_ids, codes, scored
+
+
+def item_statistics(scored):
+    """p-values and corrected point-biserial discrimination per column"""
+    administered = ~np.isnan(scored)
+    x = np.where(administered, scored, 0.0)
+    n = administered.sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        p_values = x.sum(axis=0) / n
+        rest = x.sum(axis=1)[:, None] - x
+        rest_mean = (rest * administered).sum(axis=0) / n
+        xc = (x - p_values) * administered
+        rc = (rest - rest_mean) * administered
+        denominator = np.sqrt((xc ** 2).sum(axis=0) * (rc ** 2).sum(axis=0))
+        discrimination = np.where(denominator > 0, (xc * rc).sum(axis=0) / denominator, np.nan)
+    return n, p_values, discrimination
+
+
+def choice_frequencies(codes):
+    """(questions x NUM_CODES) counts of each option letter, unmatched and blank answers"""
+    columns = np.broadcast_to(np.arange(codes.shape[1]), codes.shape)
+    given = codes != NOT_ADMINISTERED
+    return np.bincount(
+        columns[given] * NUM_CODES + codes[given], minlength=codes.shape[1] * NUM_CODES
+    ).reshape(codes.shape[1], NUM_CODES)
+
+
+def cronbach_alpha(scored):
+    """Internal consistency over the attempts that were administered every question"""
+    complete = scored[~np.isnan(scored).any(axis=1)]
+    k = complete.shape[1]
+    if k < 2 or complete.shape[0] < 2:
+        return None
+    total_variance = complete.sum(axis=1).var(ddof=1)
+    if total_variance == 0:
+        return None
+    return float(k / (k - 1) * (1 - complete.var(axis=0, ddof=1).sum() / total_variance))
+
+
+def analyze_quiz(quiz_id):
+    """Item analysis report for a quiz, ready to serialise as JSON"""
+    if np is None:
+        raise RuntimeError("Item analysis requires NumPy")
+
+    question_ids, codes, scored = load_response_matrix(quiz_id)
+    texts = dict(db.session.execute(
+        select(Question.id, Question.text).where(Question.id.in_(question_ids))
+    ).all()) if question_ids else {}
+    n, p_values, discrimination = item_statistics(scored)
+    frequencies = choice_frequencies(codes)
+
+    questions = []
+    for j, question_id in enumerate(question_ids):
+        counts = frequencies[j]
+        choices = {LETTERS[c]: int(counts[c]) for c in np.flatnonzero(counts[:len(LETTERS)])}
+        choices.update(unmatched=int(counts[UNMATCHED]), blank=int(counts[BLANK]))
+        p_value, r = _float(p_values[j]), _float(discrimination[j])
+        flags = []
+        if p_value is not None and p_value >= EASY_P_VALUE:
+            flags.append('too_easy')
+        if p_value is not None and p_value <= HARD_P_VALUE:
+            flags.append('too_hard')
+        if r is not None and r < LOW_DISCRIMINATION:
+            flags.append('low_discrimination')
+        questions.append({
+            'question_id': question_id,
+            'text': texts.get(question_id),  # None once a question is deleted
+            'attempts': int(n[j]),
+            'p_value': p_value,
+            'discrimination': r,
+            'choices': choices,
+            'flags': flags
+        })
+
+    alpha = cronbach_alpha(scored)
+    return {
+        'quiz_id': quiz_id,
+        'attempts': int(codes.shape[0]),
+        'cronbach_alpha': round(alpha, 4) if alpha is not None else None,
+        'questions': questions
+    }
+
+
+def _float(value):
+    return None if np.isnan(value) else round(float(value), 4)
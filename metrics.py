@@ -0,0 +1,248 @@
+"""Request, SQL and model-server instrumentation, exposed as Prometheus text at /metrics.
+
+Recorded per process:
+
+- ``classquiz_http_request_duration_seconds`` per endpoint, method and status
+  (for streamed responses this is the time until the headers went out)
+- ``classquiz_request_sql_queries`` / ``classquiz_request_sql_duration_seconds``:
+  statements run and time spent in the database per request, from engine
+  ``before/after_cursor_execute`` events
+- ``classquiz_sql_query_duration_seconds`` per statement kind, including
+  statements from background workers
+- ``classquiz_llm_request_duration_seconds``, prompt and response sizes and
+  ``classquiz_llm_parse_failures_total`` for calls to the model server
+- hits, misses and hit ratio of every cache registered with ``register_cache``
+
+Each worker process keeps its own figures, so with several workers every
+scrape sees one of them. METRICS_TOKEN, when set, must be sent as a bearer
+token; METRICS_ENABLED=false turns the request and SQL hooks off.
+"""
+import time
+import bisect
+import threading
+from flask import g, request, has_request_context
+from sqlalchemy.engine import Engine
+from database import listen_once
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+SQL_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+QUERY_COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 21, 34, 55, 89)
+LLM_BUCKETS = (0.5, 1, 2.5, 5, 10, 20, 40, 80, 160, 300)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144)
+STATEMENT_KINDS = ('select', 'insert', 'update', 'delete')
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, _labels(self.labelnames, key), value
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [per-bucket counts..., +Inf count, sum]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels[name] for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), values):
+                cumulative += count
+                yield f"{self.name}_bucket", _labels(self.labelnames, key, [('le', _number(bound))]), cumulative
+            yield f"{self.name}_sum", _labels(self.labelnames, key), values[-1]
+            yield f"{self.name}_count", _labels(self.labelnames, key), cumulative
+
+
+class _Gauge:
+    """Read-only gauge whose samples come from a callback at scrape time"""
+    type = 'gauge'
+
+    def __init__(self, name, documentation, collect):
+        self.name = name
+        self.documentation = documentation
+        self.collect = collect
+
+    def samples(self):
+        for labels, value in self.collect():
+            yield self.name, _labels([name for name, _ in labels], [value for _, value in labels]), value
+
+
+class Metrics:
+    def __init__(self):
+        self._metrics = []
+        self._caches = {}
+        self._lock = threading.Lock()
+        self.token = None
+
+        self.request_duration = self.histogram(
+            'classquiz_http_request_duration_seconds', 'Time to handle a request', ['endpoint', 'method', 'status']
+        )
+        self.request_sql_queries = self.histogram(
+            'classquiz_request_sql_queries', 'SQL statements run per request', ['endpoint'], QUERY_COUNT_BUCKETS
+        )
+        self.request_sql_duration = self.histogram(
+            'classquiz_request_sql_duration_seconds', 'Time spent in SQL per request', ['endpoint']
+        )
+        self.sql_duration = self.histogram(
+            'classquiz_sql_query_duration_seconds', 'Duration of one SQL statement', ['statement'], SQL_BUCKETS
+        )
+        self.llm_duration = self.histogram(
+            'classquiz_llm_request_duration_seconds', 'Model server call latency', ['mode', 'outcome'], LLM_BUCKETS
+        )
+        self.llm_prompt_bytes = self.histogram(
+            'classquiz_llm_prompt_bytes', 'Prompt size sent to the model server', ['mode'], SIZE_BUCKETS
+        )
+        self.llm_response_bytes = self.histogram(
+            'classquiz_llm_response_bytes', 'Response size received from the model server', ['mode'], SIZE_BUCKETS
+        )
+        self.llm_parse_failures = self.counter(
+            'classquiz_llm_parse_failures_total', 'Model output that could not be used', ['reason']
+        )
+        for suffix, field, documentation in (
+            ('hits', 'hits', 'Cache lookups answered from the cache'),
+            ('misses', 'misses', 'Cache lookups that fell through'),
+            ('hit_ratio', 'hit_ratio', 'Share of lookups answered from the cache')
+        ):
+            self._metrics.append(_Gauge(f"classquiz_cache_{suffix}", documentation, self._cache_samples(field)))
+
+    def init_app(self, app):
+        self.token = app.config.get('METRICS_TOKEN')
+        app.extensions['metrics'] = self
+        if not app.config.get('METRICS_ENABLED', True):
+            return
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        with self._lock:
+            # Every engine in the process, once however many apps are created; statements outside a
+            # request only feed sql_duration
+            listen_once(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            listen_once(Engine, 'after_cursor_execute', self._after_cursor_execute)
+
+    def counter(self, name, documentation, labelnames=()):
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name, stats):
+        """Report a cache's ``stats()`` dict (hits, optional disk_hits, misses) under cache=<name>"""
+        self._caches[name] = stats
+
+    def authorized(self, req):
+        return not self.token or req.headers.get('Authorization') == f"Bearer {self.token}"
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_number(value)}")
+        return '\n'.join(lines) + '\n'
+
+    def _cache_samples(self, field):
+        def collect():
+            for name, stats in sorted(self._caches.items()):
+                current = stats()
+                if not current:
+                    continue
+                hits = current['hits'] + current.get('disk_hits', 0)
+                lookups = hits + current['misses']
+                value = {'hits': hits, 'misses': current['misses']}.get(field)
+                if value is None:
+                    value = round(hits / lookups, 3) if lookups else 0.0
+                yield [('cache', name)], value
+        return collect
+
+    def _start_request(self):
+        g._metrics_started = time.perf_counter()
+        g._metrics_sql = [0, 0.0]
+
+    def _finish_request(self, response):
+        started = g.pop('_metrics_started', None)
+        if started is None:
+            return response
+        endpoint = request.endpoint or 'unmatched'
+        self.request_duration.observe(
+            time.perf_counter() - started, endpoint=endpoint, method=request.method, status=response.status_code
+        )
+        count, seconds = g.pop('_metrics_sql', (0, 0.0))
+        self.request_sql_queries.observe(count, endpoint=endpoint)
+        self.request_sql_duration.observe(seconds, endpoint=endpoint)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        kind = statement.lstrip()[:6].lower()
+        self.sql_duration.observe(elapsed, statement=kind if kind in STATEMENT_KINDS else 'other')
+        if has_request_context():
+            totals = g.get('_metrics_sql')
+            if totals is not None:
+                totals[0] += 1
+                totals[1] += elapsed
+
+
+metrics = Metrics()
@@ -0,0 +1,154 @@
+"""Versioned schema and data migrations for the ClassQuiz database.
+
+``db.create_all()`` creates missing tables; the functions registered here
+handle everything it cannot, such as backfilling data or adding indexes to
+tables that already exist. Each migration runs once, in version order, in
+its own transaction.
+
+Run them with ``flask db upgrade`` when deploying; the app does not touch the
+schema on startup.
+"""
+import logging
+import click
+from flask.cli import AppGroup
+from sqlalchemy import text, inspect
+from sqlalchemy.exc import IntegrityError
+import student_summary
+from models import db as models_db, Classroom, Question, QuestionOption, Quiz, QuizResult, build_option_rows
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS = []
+
+db_cli = AppGroup('db', help='Database schema commands.')
+
+
+def init_app(app):
+    app.cli.add_command(db_cli)
+
+
+def migration(version, description):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        MIGRATIONS.sort(key=lambda m: m[0])
+        return fn
+    return register
+
+
+def applied_versions(db):
+    with db.engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version INTEGER PRIMARY KEY, description VARCHAR(200), applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)"
+        ))
+        return {row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))}
+
+
+def upgrade(db):
+    """Apply pending migrations; safe to call from several processes at once"""
+    done = applied_versions(db)
+    for version, description, fn in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with db.engine.begin() as conn:
+                # Claiming the version first makes a concurrent runner fail fast on the primary key
+                conn.execute(
+                    text("INSERT INTO schema_migrations (version, description) VALUES (:v, :d)"),
+                    {'v': version, 'd': description}
+                )
+                fn(conn)
+            logger.info(f"Applied migration {version}: {description}")
+        except IntegrityError:
+            logger.info(f"Migration {version} already applied by another process")
+
+
+def create_schema(db):
+    """Create missing tables, then apply pending migrations"""
+    db.create_all()
+    upgrade(db)
+
+
+@db_cli.command('upgrade')
+def upgrade_command():
+    """Create missing tables and apply pending migrations."""
+    create_schema(models_db)
+    click.echo(f"Schema at version {max(applied_versions(models_db), default=0)}")
+
+
+def _create_indexes(conn, names_by_model):
+    for model, names in names_by_model.items():
+        for index in model.__table__.indexes:
+            if index.name in names:
+                index.create(conn, checkfirst=True)
+
+
+@migration(1, "Move comma-separated question options into question_options")
+def backfill_question_options(conn):
+    rows = conn.execute(text(
+        "SELECT q.id, q.options, q.correct_answer FROM question q "
+        "WHERE q.options IS NOT NULL AND q.options != '' "
+        "AND NOT EXISTS (SELECT 1 FROM question_options o WHERE o.question_id = q.id)"
+    )).fetchall()
+
+    values = []
+    for question_id, options, correct_answer in rows:
+        for row in build_option_rows(options.split(','), correct_answer):
+            values.append(dict(row, question_id=question_id))
+    if values:
+        conn.execute(QuestionOption.__table__.insert(), values)
+
+
+@migration(2, "Index hot lookup columns and make (user_id, quiz_id) unique on quiz_result")
+def add_lookup_indexes(conn):
+    # Keep the first attempt when a student has several results for one quiz
+    duplicates = conn.execute(text(
+        "DELETE FROM quiz_result WHERE id NOT IN "
+        "(SELECT MIN(id) FROM quiz_result GROUP BY user_id, quiz_id)"
+    ))
+    if duplicates.rowcount:
+        logger.warning(f"Removed {duplicates.rowcount} duplicate quiz results before adding unique index")
+
+    # Only the indexes this migration introduced; later ones may need columns later migrations add
+    _create_indexes(conn, {
+        QuizResult: ('ix_quiz_result_quiz_id', 'uq_quiz_result_user_quiz'),
+        Quiz: ('ix_quiz_teacher_id',),
+        Classroom: ('ix_classroom_teacher_id',),
+        Question: ('ix_question_quiz_id',)
+    })
+
+
+@migration(3, "Backfill the student dashboard read model")
+def backfill_student_summary(conn):
+    student_summary.rebuild(conn)
+
+
+@migration(4, "Add quiz_result.receipt for asynchronously graded submissions")
+def add_result_receipt(conn):
+    if 'receipt' not in {column['name'] for column in inspect(conn).get_columns('quiz_result')}:
+        conn.execute(text("ALTER TABLE quiz_result ADD COLUMN receipt VARCHAR(32)"))
+    _create_indexes(conn, {QuizResult: ('ix_quiz_result_receipt',)})
+
+
+@migration(5, "Widen user.password_hash for scrypt and high-iteration hashes")
+def widen_password_hash(conn):
+    # SQLite does not enforce VARCHAR lengths; server databases would truncate or reject long hashes
+    if conn.dialect.name == 'mysql':
+        conn.execute(text("ALTER TABLE user MODIFY password_hash VARCHAR(255) NOT NULL"))
+    elif conn.dialect.name == 'postgresql':
+        conn.execute(text('ALTER TABLE "user" ALTER COLUMN password_hash TYPE VARCHAR(255)'))
+
+
+@migration(6, "Widen quiz_responses.choices and correct to TEXT for long quizzes")
+def widen_quiz_responses(conn):
+    # One character per question; VARCHAR(255) capped server databases at 255 questions
+    if conn.dialect.name == 'mysql':
+        conn.execute(text("ALTER TABLE quiz_responses MODIFY choices TEXT NOT NULL, MODIFY correct TEXT NOT NULL"))
+    elif conn.dialect.name == 'postgresql':
+        conn.execute(text("ALTER TABLE quiz_responses ALTER COLUMN choices TYPE TEXT, ALTER COLUMN correct TYPE TEXT"))
+
+
+@migration(7, "Add generation_jobs.heartbeat_at so live jobs are not re-queued")
+def add_generation_heartbeat(conn):
+    if 'heartbeat_at' not in {column['name'] for column in inspect(conn).get_columns('generation_jobs')}:
+        conn.execute(text("ALTER TABLE generation_jobs ADD COLUMN heartbeat_at TIMESTAMP"))
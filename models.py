@@ -1,6 +1,7 @@
 from flask_sqlalchemy import SQLAlchemy
+import json
 from datetime import datetime
-from werkzeug.security import generate_password_hash, check_password_hash
+from credentials import credential_service
 
 db = SQLAlchemy()
 
@@ -19,7 +20,7 @@ class User(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(100), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(255), nullable=False)
     user_type = db.Column(db.String(10), nullable=False)  # 'teacher' or 'student'
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -33,15 +34,16 @@ class User(db.Model):
     )
 
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
+        self.password_hash = credential_service.hash_password(password)
 
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        # May replace password_hash with one made with the current parameters; commit after a login
+        return credential_service.check_password(self, password)
 
 class Classroom(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
-    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
     # Add relationship to QuizAssignment
     assignments = db.relationship('QuizAssignment', back_populates='classroom')
@@ -52,7 +54,7 @@ class Quiz(db.Model):
     description = db.Column(db.Text)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     difficulty = db.Column(db.String(20), default='medium')
-    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
     
     # Changed from lazy='dynamic' to lazy='select'
     questions = db.relationship('Question', backref='quiz', lazy='select')
@@ -69,17 +71,120 @@ class Quiz(db.Model):
 
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     text = db.Column(db.Text, nullable=False)
-    options = db.Column(db.Text)  # Comma-separated
+    # Pre-migration comma-separated options; superseded by the options relationship
+    legacy_options = db.Column('options', db.Text)
     correct_answer = db.Column(db.String(100), nullable=False)
 
+    options = db.relationship(
+        'QuestionOption',
+        backref='question',
+        order_by='QuestionOption.ordinal',
+        cascade='all, delete-orphan',
+        lazy='select'
+    )
+
+    def set_options(self, texts):
+        """Replace the options, flagging the one that matches correct_answer"""
+        self.options = [QuestionOption(**row) for row in build_option_rows(texts, self.correct_answer)]
+
+    def choice_code(self, answer):
+        """Option letter for a submitted answer (its letter or text), '-' if blank, '?' if unmatched"""
+        if not answer:
+            return '-'
+        for option in self.options:
+            if answer == option.text or answer.upper() == option.letter:
+                return option.letter
+        return '?'
+
+    def is_correct_response(self, answer):
+        answer = (answer or '').strip()
+        if answer == self.correct_answer.strip():
+            return True
+        return any(option.is_correct and option.text == answer for option in self.options)
+
+MAX_OPTIONS = 26  # Option letters A-Z, one character each in QuizResponses.choices
+
+class QuestionOption(db.Model):
+    __tablename__ = 'question_options'
+    id = db.Column(db.Integer, primary_key=True)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
+    ordinal = db.Column(db.Integer, nullable=False)  # 0-based display order
+    text = db.Column(db.Text, nullable=False)
+    is_correct = db.Column(db.Boolean, nullable=False, default=False)
+
+    @property
+    def letter(self):
+        # Rows from before MAX_OPTIONS was enforced have no letter of their own
+        return chr(ord('A') + self.ordinal) if self.ordinal < MAX_OPTIONS else '?'
+
+def build_option_rows(texts, correct_answer):
+    """Option rows (ordinal, text, is_correct) for a list of option texts.
+
+    The correct answer may be given as a letter ('B') or as the option text.
+    Only the first MAX_OPTIONS options are kept, one per letter A-Z.
+    """
+    texts = [t.strip() for t in texts if t and t.strip()][:MAX_OPTIONS]
+    answer = (correct_answer or '').strip()
+    correct_index = None
+    if len(answer) == 1 and answer.isalpha() and ord(answer.upper()) - ord('A') < len(texts):
+        correct_index = ord(answer.upper()) - ord('A')
+    else:
+        for index, text in enumerate(texts):
+            if text.lower() == answer.lower():
+                correct_index = index
+                break
+    return [
+        {'ordinal': index, 'text': text, 'is_correct': index == correct_index}
+        for index, text in enumerate(texts)
+    ]
+
 class QuizResult(db.Model):
+    __table_args__ = (
+        # One attempt per student and quiz; also serves lookups by user_id alone
+        db.Index('uq_quiz_result_user_quiz', 'user_id', 'quiz_id', unique=True),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     score = db.Column(db.Float, nullable=False)
     completed_date = db.Column(db.DateTime, default=datetime.utcnow)
+    receipt = db.Column(db.String(32), unique=True, index=True)  # Set when graded by grading.py
+
+    responses = db.relationship('QuizResponses', uselist=False, cascade='all, delete-orphan', lazy='select')
+
+class QuizResponses(db.Model):
+    """Per-question answers for one QuizResult, one character per question.
+
+    ``choices`` holds the chosen option letter, '?' for an answer that matched
+    no option and '-' for a blank; ``correct`` holds '1'/'0'. Both line up with
+    the comma-separated ``question_ids`` as they were at grading time.
+    """
+    __tablename__ = 'quiz_responses'
+    result_id = db.Column(db.Integer, db.ForeignKey('quiz_result.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
+    question_ids = db.Column(db.Text, nullable=False)
+    choices = db.Column(db.Text, nullable=False)  # One character per question; quizzes can exceed 255
+    correct = db.Column(db.Text, nullable=False)
+
+    @classmethod
+    def from_answers(cls, questions, answers):
+        """Grade ``answers`` ({question_id: raw answer}) against ``questions``"""
+        choices, correct = [], []
+        for question in questions:
+            answer = (answers.get(question.id) or '').strip()
+            choices.append(question.choice_code(answer))
+            correct.append('1' if question.is_correct_response(answer) else '0')
+        return cls(
+            question_ids=','.join(str(question.id) for question in questions),
+            choices=''.join(choices),
+            correct=''.join(correct)
+        )
+
+    @property
+    def score(self):
+        return 100.0 * self.correct.count('1') / len(self.correct) if self.correct else 0
 
 class QuizAssignment(db.Model):
     __tablename__ = 'quiz_assignments'
@@ -89,4 +194,58 @@ class QuizAssignment(db.Model):
     
     # Use back_populates for bidirectional relationships
     quiz = db.relationship('Quiz', back_populates='assignments')
-    classroom = db.relationship('Classroom', back_populates='assignments')
\ No newline at end of file
+    classroom = db.relationship('Classroom', back_populates='assignments')
+
+class StudentQuizSummary(db.Model):
+    """Read model: one row per quiz assigned to a student, maintained by student_summary.py"""
+    __tablename__ = 'student_quiz_summary'
+    __table_args__ = (
+        db.Index('ix_student_quiz_summary_completed', 'user_id', 'completed_date'),
+    )
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), primary_key=True)
+    quiz_title = db.Column(db.String(100), nullable=False)
+    quiz_description = db.Column(db.Text)
+    question_count = db.Column(db.Integer, nullable=False, default=0)
+    due_date = db.Column(db.DateTime)  # Earliest due date across the student's classrooms
+    result_id = db.Column(db.Integer, db.ForeignKey('quiz_result.id'))  # Set once completed
+    score = db.Column(db.Float)
+    completed_date = db.Column(db.DateTime)
+
+class StudentSummary(db.Model):
+    """Read model: per-student dashboard totals over student_quiz_summary"""
+    __tablename__ = 'student_summary'
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    available_count = db.Column(db.Integer, nullable=False, default=0)
+    completed_count = db.Column(db.Integer, nullable=False, default=0)
+    score_total = db.Column(db.Float, nullable=False, default=0)
+
+    @property
+    def average_score(self):
+        return round(self.score_total / self.completed_count, 1) if self.completed_count else 0
+
+class GenerationJob(db.Model):
+    __tablename__ = 'generation_jobs'
+    id = db.Column(db.String(32), primary_key=True)  # uuid4 hex
+    teacher_id = db.Column(db.Integer, db.ForeignKey('user.id'))
+    prompt_data = db.Column(db.Text, nullable=False)  # JSON-encoded generator input
+    save_to_bank = db.Column(db.Boolean, default=False)  # Also store in the MySQL question bank
+    status = db.Column(db.String(20), nullable=False, default='pending', index=True)
+    result = db.Column(db.Text)  # JSON list of {"question", "answer"}
+    error = db.Column(db.Text)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    heartbeat_at = db.Column(db.DateTime)  # Refreshed by the worker while the job runs
+    finished_at = db.Column(db.DateTime)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'error': self.error,
+            'quiz_id': self.quiz_id,
+            'questions': json.loads(self.result) if self.result else [],
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
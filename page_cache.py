@@ -0,0 +1,257 @@
+"""Per-teacher response cache for the teacher list pages.
+
+Rendered pages are stored under a per-teacher version number. SQLAlchemy
+``after_insert``/``after_update``/``after_delete`` events on Quiz, Classroom
+and QuizAssignment (and question inserts/deletes, which change the counts the
+pages show) note the teachers whose data changed; the version is bumped when
+the transaction commits, so every cached page for that teacher is skipped
+from then on. ``ttl`` bounds staleness for changes that raise no event, such as
+enrolments.
+
+Responses carry an ETag and Last-Modified and are served as 304 when the
+browser already has the current version. Requests with pending flash messages
+bypass the cache, because the messages are part of the page.
+
+Entries live in an in-process LRU by default. The version numbers live in a
+SQLite file shared by every worker on the host (PAGE_CACHE_VERSIONS_PATH,
+default ``<instance>/page_cache_versions.db``), so a change committed in one
+worker invalidates the pages every other worker holds. Set it to an empty
+string to keep versions per process; other workers then serve stale pages
+for up to ``ttl``. Set PAGE_CACHE_REDIS_URL to keep entries and versions in a
+Redis-compatible server shared by all workers (requires ``redis``).
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+from contextlib import contextmanager
+from email.utils import formatdate
+from flask import request, session, make_response
+from sqlalchemy import select
+from sqlalchemy.orm import object_session
+from models import db, Quiz, Classroom, QuizAssignment, Question
+from database import listen_once
+
+try:
+    import redis
+except ImportError:  # Only the in-process backend is available
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class _LocalBackend:
+    def __init__(self, max_entries, versions_path=None):
+        self.max_entries = max_entries
+        self.versions_path = versions_path
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._lock = threading.Lock()
+        self._table_ready = False
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry['expires_at'] < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl):
+        with self._lock:
+            self._entries[key] = dict(entry, expires_at=time.time() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def version(self, teacher_id):
+        if self.versions_path:
+            try:
+                with self._connect() as conn:
+                    row = conn.execute(
+                        "SELECT version FROM page_cache_versions WHERE teacher_id = ?", (teacher_id,)
+                    ).fetchone()
+                return row[0] if row else 0
+            except sqlite3.Error as e:
+                logger.warning(f"Page cache version read failed: {str(e)}")
+        with self._lock:
+            return self._versions.get(teacher_id, 0)
+
+    def bump(self, teacher_id):
+        with self._lock:
+            self._versions[teacher_id] = self._versions.get(teacher_id, 0) + 1
+        if self.versions_path:
+            try:
+                with self._connect() as conn:
+                    conn.execute(
+                        "INSERT INTO page_cache_versions (teacher_id, version) VALUES (?, 1) "
+                        "ON CONFLICT (teacher_id) DO UPDATE SET version = version + 1",
+                        (teacher_id,)
+                    )
+            except sqlite3.Error as e:
+                logger.warning(f"Page cache version bump failed: {str(e)}")
+
+    @contextmanager
+    def _connect(self):
+        if not self._table_ready:
+            os.makedirs(os.path.dirname(os.path.abspath(self.versions_path)), exist_ok=True)
+        conn = sqlite3.connect(self.versions_path, timeout=5)
+        try:
+            with conn:
+                if not self._table_ready:
+                    # Created on first use so that building the app does not touch the disk
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS page_cache_versions "
+                        "(teacher_id INTEGER PRIMARY KEY, version INTEGER NOT NULL)"
+                    )
+                    self._table_ready = True
+                yield conn
+        finally:
+            conn.close()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _RedisBackend:
+    def __init__(self, url):
+        self._redis = redis.Redis.from_url(url)
+
+    def get(self, key):
+        raw = self._redis.get(f"page:{key}")
+        return json.loads(raw) if raw else None
+
+    def set(self, key, entry, ttl):
+        self._redis.setex(f"page:{key}", int(ttl), json.dumps(entry))
+
+    def version(self, teacher_id):
+        return int(self._redis.get(f"page-version:{teacher_id}") or 0)
+
+    def bump(self, teacher_id):
+        self._redis.incr(f"page-version:{teacher_id}")
+
+    def __len__(self):
+        return 0  # Not tracked for a shared server
+
+
+class PageCache:
+    def __init__(self, max_entries=512, ttl=300):
+        self.ttl = ttl
+        self.backend = _LocalBackend(max_entries)
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bypassed = 0
+        self.invalidations = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('PAGE_CACHE_TTL', self.ttl)
+        max_entries = app.config.get('PAGE_CACHE_SIZE', self.backend.max_entries)
+        redis_url = app.config.get('PAGE_CACHE_REDIS_URL')
+        if redis_url and redis is not None:
+            self.backend = _RedisBackend(redis_url)
+        else:
+            if redis_url:
+                logger.warning("PAGE_CACHE_REDIS_URL is set but redis is not installed; using the in-process cache")
+            versions_path = app.config.get('PAGE_CACHE_VERSIONS_PATH')
+            if versions_path is None:
+                versions_path = os.path.join(app.instance_path, 'page_cache_versions.db')
+            self.backend = _LocalBackend(max_entries, versions_path or None)
+        app.extensions['page_cache'] = self
+
+        # Mappers and db.session are shared by every app in the process
+        for model in (Quiz, Classroom, QuizAssignment):
+            for name in ('after_insert', 'after_update', 'after_delete'):
+                listen_once(model, name, self._on_change)
+        for name in ('after_insert', 'after_delete'):
+            listen_once(Question, name, self._on_change)
+        listen_once(db.session, 'after_commit', self._invalidate_changed)
+        listen_once(db.session, 'after_rollback', self._discard_changes)
+
+    def cached(self, view):
+        """Cache a teacher page's GET responses; apply below @teacher_required"""
+        @wraps(view)
+        def decorated_function(*args, **kwargs):
+            if request.method != 'GET' or session.get('_flashes'):
+                self.bypassed += 1
+                return view(*args, **kwargs)
+
+            teacher_id = session['user_id']
+            key = f"{teacher_id}:{self.backend.version(teacher_id)}:{request.full_path}"
+            entry = self.backend.get(key)
+            if entry is None:
+                self.misses += 1
+                response = make_response(view(*args, **kwargs))
+                if response.status_code != 200 or session.get('_flashes'):
+                    return response
+                body = response.get_data(as_text=True)
+                entry = {
+                    'body': body,
+                    'mimetype': response.mimetype,
+                    'etag': hashlib.sha1(body.encode('utf-8')).hexdigest(),
+                    'last_modified': time.time()
+                }
+                self.backend.set(key, entry, self.ttl)
+            else:
+                self.hits += 1
+                response = make_response(entry['body'])
+                response.mimetype = entry['mimetype']
+
+            response.set_etag(entry['etag'])
+            response.headers['Last-Modified'] = formatdate(entry['last_modified'], usegmt=True)
+            response.headers['Cache-Control'] = 'private, no-cache'
+            response.vary.add('Cookie')
+            response.make_conditional(request)
+            if response.status_code == 304:
+                self.not_modified += 1
+            return response
+        return decorated_function
+
+    def invalidate(self, teacher_id):
+        self.backend.bump(teacher_id)
+        self.invalidations += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'not_modified': self.not_modified,
+            'bypassed': self.bypassed,
+            'invalidations': self.invalidations,
+            'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+            'entries': len(self.backend)
+        }
+
+    def _on_change(self, mapper, connection, target):
+        if isinstance(target, (Quiz, Classroom)):
+            teacher_id = target.teacher_id
+        elif isinstance(target, QuizAssignment):
+            teacher_id = connection.execute(
+                select(Classroom.teacher_id).where(Classroom.id == target.classroom_id)
+            ).scalar()
+        else:
+            teacher_id = connection.execute(
+                select(Quiz.teacher_id).where(Quiz.id == target.quiz_id)
+            ).scalar()
+        session = object_session(target)
+        if teacher_id is not None and session is not None:
+            session.info.setdefault('page_cache_teachers', set()).add(teacher_id)
+
+    def _invalidate_changed(self, session):
+        for teacher_id in session.info.pop('page_cache_teachers', ()):
+            self.invalidate(teacher_id)
+
+    def _discard_changes(self, session):
+        session.info.pop('page_cache_teachers', None)
+
+
+page_cache = PageCache()
@@ -0,0 +1,279 @@
+"""Opt-in per-request profiling with a stack sampler.
+
+A request is profiled when it carries a valid signed ``X-Profile-Token``
+header (mint one with ``flask profile token``), or at random with probability
+PROFILE_SAMPLE_RATE (default 0, i.e. header only). PROFILE_ENDPOINTS limits
+random sampling to a comma-separated list of endpoints such as
+``main.student_dashboard,main.quiz_details``.
+
+While a profiled request runs, one shared background thread reads the
+request thread's stack every PROFILE_INTERVAL seconds. Nothing is traced, so
+requests that are not profiled pay only for the sampling decision. SQL
+statements the request runs are recorded with their durations.
+
+Each capture is written under PROFILE_DIR (default ``<instance>/profiles``)
+as ``<endpoint>/<id>.folded``, collapsed stacks that flamegraph.pl or
+speedscope read directly, plus ``<id>.json`` with the timing, top functions
+and SQL. Only the newest PROFILE_KEEP captures are kept. Teachers listed in
+PROFILE_ADMINS see the slowest captures at /admin/profiles.
+"""
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import logging
+import threading
+from collections import Counter
+import click
+from flask import g, request, current_app, has_request_context
+from flask.cli import AppGroup
+from itsdangerous import URLSafeTimedSerializer, BadSignature
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+HEADER = 'X-Profile-Token'
+TOKEN_SALT = 'request-profile'
+CAPTURE_ID = re.compile(r'^[0-9]+-[0-9a-f]{8}$')
+MAX_STATEMENTS = 200
+TOP_FUNCTIONS = 15
+
+profile_cli = AppGroup('profile', help='Request profiling.')
+
+
+class _Capture:
+    def __init__(self, thread_id, reason):
+        self.wall_time = time.time()
+        self.id = f"{int(self.wall_time * 1000)}-{uuid.uuid4().hex[:8]}"
+        self.thread_id = thread_id
+        self.reason = reason
+        self.started = time.perf_counter()
+        self.stacks = Counter()
+        self.statements = []
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+class RequestProfiler:
+    def __init__(self, sample_rate=0.0, interval=0.005, keep=200):
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.keep = keep
+        self.endpoints = set()
+        self.admins = set()
+        self.directory = None
+        self.token_max_age = 3600
+        self._active = {}  # thread id -> _Capture
+        self._wake = threading.Condition()
+        self._sampler = None
+        self._sql_listening = False
+
+    def init_app(self, app):
+        config = app.config
+        self.sample_rate = config.get('PROFILE_SAMPLE_RATE', self.sample_rate)
+        self.interval = config.get('PROFILE_INTERVAL', self.interval)
+        self.keep = config.get('PROFILE_KEEP', self.keep)
+        self.token_max_age = config.get('PROFILE_TOKEN_MAX_AGE', self.token_max_age)
+        self.endpoints = {e.strip() for e in config.get('PROFILE_ENDPOINTS', '').split(',') if e.strip()}
+        self.admins = {e.strip().lower() for e in config.get('PROFILE_ADMINS', '').split(',') if e.strip()}
+        self.directory = config.get('PROFILE_DIR') or os.path.join(app.instance_path, 'profiles')
+        app.extensions['profiler'] = self
+        app.cli.add_command(profile_cli)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not self._sql_listening:
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            self._sql_listening = True
+
+    def make_token(self):
+        return URLSafeTimedSerializer(current_app.secret_key, salt=TOKEN_SALT).dumps('profile')
+
+    def is_admin(self, email):
+        return bool(email) and email.lower() in self.admins
+
+    def captures(self, limit=50):
+        """Summaries of the slowest captures on disk, slowest first"""
+        summaries = []
+        for path in self._capture_files('.json'):
+            try:
+                with open(path, encoding='utf-8') as f:
+                    summaries.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # Removed or half-written by another worker
+        summaries.sort(key=lambda s: s['duration_ms'], reverse=True)
+        return summaries[:limit]
+
+    def folded_path(self, capture_id):
+        if not CAPTURE_ID.match(capture_id):
+            return None
+        for path in self._capture_files('.folded'):
+            if os.path.basename(path) == f"{capture_id}.folded":
+                return path
+        return None
+
+    # Request hooks
+
+    def _reason(self):
+        token = request.headers.get(HEADER)
+        if token:
+            try:
+                URLSafeTimedSerializer(current_app.secret_key, salt=TOKEN_SALT).loads(token, max_age=self.token_max_age)
+                return 'header'
+            except BadSignature:
+                logger.warning(f"Ignoring invalid {HEADER} on {request.path}")
+        if self.sample_rate and (not self.endpoints or request.endpoint in self.endpoints):
+            if random.random() < self.sample_rate:
+                return 'sampled'
+        return None
+
+    def _start_request(self):
+        reason = self._reason()
+        if reason is None:
+            return
+        capture = _Capture(threading.get_ident(), reason)
+        g._profile = capture
+        with self._wake:
+            self._active[capture.thread_id] = capture
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_forever, name='request-profiler', daemon=True)
+                self._sampler.start()
+            self._wake.notify()
+
+    def _finish_request(self, response):
+        capture = g.pop('_profile', None)
+        if capture is None:
+            return response
+        with self._wake:
+            self._active.pop(capture.thread_id, None)
+        duration = time.perf_counter() - capture.started
+        try:
+            self._write(capture, duration, response.status_code)
+            response.headers['X-Profile-Id'] = capture.id
+        except Exception as e:
+            # A profile is a side product; never fail the request over it
+            logger.error(f"Could not write profile {capture.id}: {str(e)}", exc_info=True)
+        return response
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if has_request_context() and g.get('_profile') is not None:
+            conn.info.setdefault('profile_query_start', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('profile_query_start')
+        capture = g.get('_profile') if has_request_context() else None
+        if not starts or capture is None:
+            return
+        elapsed = time.perf_counter() - starts.pop()
+        capture.sql_count += 1
+        capture.sql_seconds += elapsed
+        if len(capture.statements) < MAX_STATEMENTS:
+            capture.statements.append({'sql': ' '.join(statement.split()), 'ms': round(elapsed * 1000, 2)})
+
+    # Sampling
+
+    def _sample_forever(self):
+        while True:
+            with self._wake:
+                while not self._active:
+                    self._wake.wait()
+                # Sampled under the lock: once _finish_request pops a capture, its stacks never change again
+                frames = sys._current_frames()
+                for capture in self._active.values():
+                    frame = frames.get(capture.thread_id)
+                    if frame is not None:
+                        capture.stacks[_collapse(frame)] += 1
+                del frames
+            time.sleep(self.interval)
+
+    # Output
+
+    def _write(self, capture, duration, status):
+        endpoint = request.endpoint or 'unmatched'
+        directory = os.path.join(self.directory, endpoint)
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"{capture.id}.folded"), 'w', encoding='utf-8') as f:
+            for stack, count in capture.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+        summary = {
+            'id': capture.id,
+            'endpoint': endpoint,
+            'method': request.method,
+            'path': request.full_path.rstrip('?'),
+            'status': status,
+            'reason': capture.reason,
+            'captured_at': time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(capture.wall_time)),
+            'duration_ms': round(duration * 1000, 1),
+            'samples': sum(capture.stacks.values()),
+            'sql_count': capture.sql_count,
+            'sql_ms': round(capture.sql_seconds * 1000, 1),
+            'top_functions': _top_functions(capture.stacks),
+            'statements': capture.statements
+        }
+        path = os.path.join(directory, f"{capture.id}.json")
+        with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+            json.dump(summary, f)
+        os.replace(f"{path}.tmp", path)
+        self._prune()
+
+    def _capture_files(self, suffix):
+        if not self.directory or not os.path.isdir(self.directory):
+            return []
+        paths = []
+        for endpoint in os.listdir(self.directory):
+            folder = os.path.join(self.directory, endpoint)
+            if os.path.isdir(folder):
+                paths.extend(os.path.join(folder, name) for name in os.listdir(folder) if name.endswith(suffix))
+        return paths
+
+    def _prune(self):
+        summaries = sorted(self._capture_files('.json'), key=os.path.basename)
+        for path in summaries[:max(0, len(summaries) - self.keep)]:
+            for stale in (path, path[:-len('.json')] + '.folded'):
+                try:
+                    os.remove(stale)
+                except FileNotFoundError:
+                    pass
+
+
+def _frame_name(frame):
+    return f"{frame.f_globals.get('__name__', '?')}:{frame.f_code.co_name}"
+
+
+def _collapse(frame):
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame))
+        frame = frame.f_back
+    return ';'.join(reversed(names))
+
+
+def _top_functions(stacks):
+    """Functions by share of samples at the top of the stack (self) and anywhere on it (inclusive)"""
+    inclusive, own = Counter(), Counter()
+    for stack, count in stacks.items():
+        names = stack.split(';')
+        own[names[-1]] += count
+        for name in set(names):
+            inclusive[name] += count
+    total = sum(stacks.values()) or 1
+    return [
+        {'function': name, 'self_pct': round(100 * count / total, 1), 'inclusive_pct': round(100 * inclusive[name] / total, 1)}
+        for name, count in own.most_common(TOP_FUNCTIONS)
+    ]
+
+
+@profile_cli.command('token')
+def token_command():
+    """Print a token for the X-Profile-Token header."""
+    profiler = current_app.extensions['profiler']
+    click.echo(profiler.make_token())
+    click.echo(f"Valid for {profiler.token_max_age} seconds.", err=True)
+
+
+request_profiler = RequestProfiler()
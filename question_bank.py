@@ -0,0 +1,191 @@
+import os
+import queue
+import sqlite3
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+INSERT_COLUMNS = "(topics, question_text, correct_answer, question_type, difficulty)"
+
+
+class QuestionBankError(Exception):
+    """The bank could not hand out a connection"""
+
+
+class DatabaseManager:
+    """External MySQL question bank backed by a MySQLConnectionPool.
+
+    The driver is imported and the pool created on first use, and the schema
+    is applied once, on the first successful save, instead of per save.
+    """
+
+    placeholder = '%s'
+    schema = ["""
+        CREATE TABLE IF NOT EXISTS questions (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            topics JSON NOT NULL,
+            question_text TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            question_type VARCHAR(50) NOT NULL,
+            difficulty VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """]
+
+    def __init__(self, pool_size=5):
+        self.pool_size = pool_size
+        self._pool = None
+        self._schema_ready = False
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.pool_size = app.config.get('QUESTION_BANK_POOL_SIZE', self.pool_size)
+        app.extensions['question_bank'] = self
+
+    def _create_pool(self):
+        from mysql.connector import pooling
+        return pooling.MySQLConnectionPool(
+            pool_name='question_bank',
+            pool_size=self.pool_size,
+            pool_reset_session=True,
+            host=os.getenv('DB_HOST'),
+            user=os.getenv('DB_USER'),
+            password=os.getenv('DB_PASSWORD'),
+            database=os.getenv('DB_NAME'),
+            port=int(os.getenv('DB_PORT', 3306)),
+            connect_timeout=5
+        )
+
+    def _checkout(self):
+        from mysql.connector import Error as DBError
+        try:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = self._create_pool()
+            conn = self._pool.get_connection()
+        except DBError as e:
+            raise QuestionBankError(str(e)) from e
+        try:
+            # Health check: revive connections the server dropped while idle
+            conn.ping(reconnect=True, attempts=1, delay=0)
+        except DBError as e:
+            conn.close()
+            raise QuestionBankError(str(e)) from e
+        return conn
+
+    def get_connection(self):
+        try:
+            return self._checkout()
+        except QuestionBankError as e:
+            logger.error(f"Database connection failed: {str(e)}")
+            return None
+
+    def ensure_schema(self):
+        if self._schema_ready:
+            return True
+        db = self.get_connection()
+        if not db:
+            return False
+        try:
+            cursor = db.cursor()
+            try:
+                for statement in self.schema:
+                    cursor.execute(statement)
+            finally:
+                cursor.close()
+            db.commit()
+            self._schema_ready = True
+            return True
+        except Exception as e:
+            logger.error(f"Question bank schema setup failed: {str(e)}")
+            return False
+        finally:
+            db.close()
+
+    def save_questions(self, questions):
+        if not self.ensure_schema():
+            return False, "Database unavailable"
+        db = self.get_connection()
+        if not db:
+            return False, "Database unavailable"
+        try:
+            cursor = db.cursor()
+            try:
+                values = ', '.join([self.placeholder] * 5)
+                cursor.executemany(
+                    f"INSERT INTO questions {INSERT_COLUMNS} VALUES ({values})",
+                    questions
+                )
+            finally:
+                cursor.close()
+            db.commit()
+            return True, ""
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Database error: {str(e)}")
+            return False, str(e)
+        finally:
+            # Returns pooled connections to the pool
+            db.close()
+
+
+class _PooledSQLiteConnection:
+    """Proxy whose close() hands the connection back to its pool"""
+
+    def __init__(self, conn, pool):
+        self._conn = conn
+        self._pool = pool
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        self._pool.put(self._conn)
+
+
+class SQLiteQuestionBank(DatabaseManager):
+    """Drop-in DatabaseManager backed by SQLite, for offline runs and benchmarks"""
+
+    placeholder = '?'
+    schema = ["""
+        CREATE TABLE IF NOT EXISTS questions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            topics TEXT NOT NULL,
+            question_text TEXT NOT NULL,
+            correct_answer TEXT NOT NULL,
+            question_type VARCHAR(50) NOT NULL,
+            difficulty VARCHAR(50) NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """]
+
+    def __init__(self, path=':memory:', pool_size=5):
+        super().__init__(pool_size)
+        # A shared-cache URI keeps every pooled connection on the same in-memory database
+        self.path = 'file:question_bank?mode=memory&cache=shared' if path == ':memory:' else path
+
+    def _create_pool(self):
+        pool = queue.Queue()
+        for _ in range(self.pool_size):
+            pool.put(sqlite3.connect(self.path, uri=self.path.startswith('file:'), check_same_thread=False, timeout=5))
+        return pool
+
+    def _checkout(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = self._create_pool()
+        try:
+            return _PooledSQLiteConnection(self._pool.get(timeout=5), self._pool)
+        except queue.Empty:
+            raise QuestionBankError("Question bank pool exhausted")
+
+
+def create_question_bank(app):
+    """Build the question bank selected by QUESTION_BANK_BACKEND ('mysql' or 'sqlite')"""
+    if app.config.get('QUESTION_BANK_BACKEND') == 'sqlite':
+        bank = SQLiteQuestionBank(app.config.get('QUESTION_BANK_SQLITE_PATH', ':memory:'))
+    else:
+        bank = DatabaseManager()
+    bank.init_app(app)
+    return bank
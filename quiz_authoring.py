@@ -0,0 +1,116 @@
+"""Quiz authoring: validate quiz payloads and write them with bulk inserts.
+
+A quiz arrives as a dict::
+
+    {"title": "...", "description": "...", "difficulty": "medium",
+     "questions": [{"text": "...", "options": ["..."], "correct_answer": "B"}]}
+
+``create_quizzes`` writes any number of them in the caller's transaction: the
+quizzes are flushed to get their ids, then questions and options go in as
+bulk executemany INSERTs. A failure rolls back every quiz in the call, so no
+half-built quiz remains. The caller commits.
+"""
+import logging
+from sqlalchemy import insert, select
+from models import db, Quiz, Question, QuestionOption, MAX_OPTIONS, build_option_rows
+
+logger = logging.getLogger(__name__)
+
+DIFFICULTIES = ('easy', 'medium', 'hard')
+MAX_QUESTIONS_PER_CALL = 2000
+
+
+class QuizValidationError(ValueError):
+    pass
+
+
+def normalize_quiz(data, index=0):
+    """Validated copy of one quiz payload; raises QuizValidationError"""
+    where = f"Quiz {index + 1}"
+    if not isinstance(data, dict):
+        raise QuizValidationError(f"{where}: expected an object")
+    title = str(data.get('title') or '').strip()
+    if not title:
+        raise QuizValidationError(f"{where}: title is required")
+    difficulty = str(data.get('difficulty') or 'medium').strip().lower()
+    if difficulty not in DIFFICULTIES:
+        raise QuizValidationError(f"{where}: difficulty must be one of {', '.join(DIFFICULTIES)}")
+    questions = data.get('questions') or []
+    if not isinstance(questions, list):
+        raise QuizValidationError(f"{where}: questions must be a list")
+
+    normalized = []
+    for n, question in enumerate(questions, start=1):
+        if not isinstance(question, dict):
+            raise QuizValidationError(f"{where}, question {n}: expected an object")
+        text = str(question.get('text') or question.get('question') or '').strip()
+        correct_answer = str(question.get('correct_answer') or '').strip()
+        options = question.get('options') or []
+        if not text:
+            raise QuizValidationError(f"{where}, question {n}: text is required")
+        if not correct_answer:
+            raise QuizValidationError(f"{where}, question {n}: correct_answer is required")
+        if not isinstance(options, list):
+            raise QuizValidationError(f"{where}, question {n}: options must be a list")
+        if len(options) > MAX_OPTIONS:
+            raise QuizValidationError(f"{where}, question {n}: at most {MAX_OPTIONS} options are allowed")
+        normalized.append({
+            'text': text,
+            'correct_answer': correct_answer[:100],
+            'options': [str(option) for option in options]
+        })
+
+    return {
+        'title': title[:100],
+        'description': str(data.get('description') or '').strip(),
+        'difficulty': difficulty,
+        'questions': normalized
+    }
+
+
+def create_quizzes(teacher_id, quizzes):
+    """Insert validated quizzes and their questions; returns the new quiz ids in order"""
+    quizzes = [normalize_quiz(quiz, index) for index, quiz in enumerate(quizzes)]
+    total = sum(len(quiz['questions']) for quiz in quizzes)
+    if total > MAX_QUESTIONS_PER_CALL:
+        raise QuizValidationError(f"At most {MAX_QUESTIONS_PER_CALL} questions per call (got {total})")
+    if not quizzes:
+        return []
+
+    # Quizzes are few: flush them through the ORM to get their ids
+    new_quizzes = [
+        Quiz(title=quiz['title'], description=quiz['description'], difficulty=quiz['difficulty'], teacher_id=teacher_id)
+        for quiz in quizzes
+    ]
+    db.session.add_all(new_quizzes)
+    db.session.flush()
+    quiz_ids = [quiz.id for quiz in new_quizzes]
+
+    questions = [
+        (quiz_id, question)
+        for quiz_id, quiz in zip(quiz_ids, quizzes)
+        for question in quiz['questions']
+    ]
+    question_ids = []
+    if questions:
+        db.session.execute(insert(Question.__table__), [
+            {'quiz_id': quiz_id, 'text': question['text'], 'correct_answer': question['correct_answer']}
+            for quiz_id, question in questions
+        ])
+        # Nobody else can see these quizzes yet, and ids increase in insertion order,
+        # so reading them back by id lines up with ``questions``
+        question_ids = list(db.session.execute(
+            select(Question.id).where(Question.quiz_id.in_(quiz_ids)).order_by(Question.quiz_id, Question.id)
+        ).scalars())
+
+    options = [
+        dict(row, question_id=question_id)
+        for question_id, (_, question) in zip(question_ids, questions)
+        for row in build_option_rows(question['options'], question['correct_answer'])
+    ]
+    if options:
+        db.session.execute(insert(QuestionOption.__table__), options)
+
+    logger.info(f"Created {len(quiz_ids)} quizzes with {len(question_ids)} questions for teacher {teacher_id}")
+    return quiz_ids
+
@@ -0,0 +1,198 @@
+import os
+import time
+import asyncio
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager, asynccontextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: cross-process slots are unavailable
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class RateLimitExceeded(Exception):
+    """Raised when a request cannot be scheduled on the LLM backend before its deadline"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket that hands out reservations instead of polling.
+
+    Each caller reserves the next free slot (the token count may go negative)
+    and sleeps exactly until that slot, so a burst is spread out at ``rate``
+    per second rather than waking up together.
+    """
+
+    def __init__(self, rate, capacity):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, deadline):
+        """Return seconds to wait for a token, or None if that would pass ``deadline``"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+
+            wait = 0.0 if self._tokens >= 1 else (1 - self._tokens) / self.rate
+            if now + wait > deadline:
+                return None
+            self._tokens -= 1
+            return wait
+
+
+class SQLiteTokenBucket:
+    """Token bucket whose state lives in a SQLite file shared by every worker process"""
+
+    def __init__(self, rate, capacity, db_path):
+        self.rate = float(rate)
+        self.capacity = float(capacity)
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS token_bucket "
+                "(id INTEGER PRIMARY KEY CHECK (id = 1), tokens REAL NOT NULL, updated REAL NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO token_bucket (id, tokens, updated) VALUES (1, ?, ?)",
+                (self.capacity, time.time())
+            )
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")  # Serializes bucket updates across processes
+            try:
+                yield conn
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+
+    def reserve(self, deadline):
+        # ``deadline`` is monotonic; the shared state has to use wall-clock time
+        remaining = deadline - time.monotonic()
+        with self._connect() as conn:
+            tokens, updated = conn.execute(
+                "SELECT tokens, updated FROM token_bucket WHERE id = 1"
+            ).fetchone()
+            now = time.time()
+            tokens = min(self.capacity, tokens + max(0.0, now - updated) * self.rate)
+
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if wait > remaining:
+                conn.execute("UPDATE token_bucket SET tokens = ?, updated = ? WHERE id = 1", (tokens, now))
+                return None
+            conn.execute("UPDATE token_bucket SET tokens = ?, updated = ? WHERE id = 1", (tokens - 1, now))
+            return wait
+
+
+class FileSlots:
+    """Cross-process counting semaphore built from ``flock`` on N slot files.
+
+    The kernel drops the lock when a worker dies, so a crashed process can
+    never leak a slot.
+    """
+
+    poll_interval = 0.05
+
+    def __init__(self, count, lock_dir):
+        self.paths = [os.path.join(lock_dir, f"llm-slot-{i}.lock") for i in range(count)]
+
+    def acquire(self, deadline):
+        while True:
+            for path in self.paths:
+                fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except OSError:
+                    os.close(fd)
+            if time.monotonic() + self.poll_interval > deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def release(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+
+class LLMConcurrencyController:
+    """Admission control for the model server: a request rate plus a cap on in-flight calls.
+
+    With ``lock_dir`` set, both limits are shared by every process on the host
+    (e.g. gunicorn workers); otherwise they apply per process.
+    """
+
+    def __init__(self, rate=1.0, burst=2, max_in_flight=2, queue_timeout=30, lock_dir=None):
+        self.queue_timeout = queue_timeout
+        self.max_in_flight = max_in_flight
+        self._semaphore = threading.BoundedSemaphore(max_in_flight)
+        self._file_slots = None
+
+        if lock_dir and fcntl is None:
+            logger.warning("Cross-process LLM limits need fcntl; falling back to per-process limits")
+            lock_dir = None
+        if lock_dir:
+            os.makedirs(lock_dir, exist_ok=True)
+            self._bucket = SQLiteTokenBucket(rate, burst, os.path.join(lock_dir, 'llm-bucket.db'))
+            self._file_slots = FileSlots(max_in_flight, lock_dir)
+        else:
+            self._bucket = TokenBucket(rate, burst)
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Hold an in-flight slot for the duration of one model call.
+
+        Waits at most ``timeout`` (default ``queue_timeout``) seconds in total
+        and raises RateLimitExceeded if the call cannot start in time.
+        """
+        deadline = time.monotonic() + (self.queue_timeout if timeout is None else timeout)
+
+        if not self._semaphore.acquire(timeout=max(0.0, deadline - time.monotonic())):
+            raise RateLimitExceeded("Too many concurrent requests to the model server")
+        fd = None
+        try:
+            if self._file_slots:
+                fd = self._file_slots.acquire(deadline)
+                if fd is None:
+                    raise RateLimitExceeded("Too many concurrent requests to the model server")
+
+            wait = self._bucket.reserve(deadline)
+            if wait is None:
+                raise RateLimitExceeded("Model server request rate exceeded")
+            if wait:
+                time.sleep(wait)
+            yield
+        finally:
+            if fd is not None:
+                self._file_slots.release(fd)
+            self._semaphore.release()
+
+    @asynccontextmanager
+    async def aslot(self, timeout=None):
+        """Async form of ``slot``; the blocking wait runs in a thread, not on the event loop"""
+        slot = self.slot(timeout)
+        acquire = asyncio.ensure_future(asyncio.to_thread(slot.__enter__))
+        try:
+            await asyncio.shield(acquire)
+        except asyncio.CancelledError:
+            # The thread keeps waiting after a cancel; hand the slot back as soon as it gets one
+            def release(future):
+                if not future.cancelled() and future.exception() is None:
+                    slot.__exit__(None, None, None)
+            acquire.add_done_callback(release)
+            raise
+        try:
+            yield
+        finally:
+            slot.__exit__(None, None, None)
@@ -0,0 +1,258 @@
+"""Class report aggregates for the /reports page.
+
+Every figure is computed in the database with GROUP BY over
+quiz_result ⋈ student_classroom ⋈ quiz_assignments, so the cost of a report
+does not depend on how many result rows Python would otherwise walk.
+Percentiles use the nearest-rank method over ROW_NUMBER() windows, which
+SQLite (3.25+) and MySQL 8 both support.
+
+Reports are cached per teacher and dropped when a commit adds results or
+changes the assignments/enrolments behind them. The cache is per process;
+``ttl`` bounds how stale another worker's copy can get.
+"""
+import time
+import logging
+import threading
+from sqlalchemy import select, func, case, and_, literal_column
+from database import listen_once
+from models import db, User, Classroom, Quiz, QuizResult, QuizAssignment, student_classroom
+
+logger = logging.getLogger(__name__)
+
+PERCENTILES = (25, 50, 75, 90)
+
+
+class ReportEngine:
+    def __init__(self, ttl=300):
+        self.ttl = ttl
+        self._reports = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def init_app(self, app):
+        self.ttl = app.config.get('REPORT_CACHE_TTL', self.ttl)
+        app.extensions['reports'] = self
+        # db.session outlives any one app; named handlers so a second create_app finds them registered
+        listen_once(db.session, 'after_flush', self._collect_changes)
+        listen_once(db.session, 'after_commit', self._invalidate_changed)
+        listen_once(db.session, 'after_rollback', self._discard_changes)
+
+    def class_reports(self, teacher_id):
+        """Per-classroom reports (with per-quiz breakdowns) for one teacher"""
+        now = time.monotonic()
+        with self._lock:
+            cached = self._reports.get(teacher_id)
+            if cached and cached[0] > now:
+                self.hits += 1
+                return cached[1]
+            self.misses += 1
+
+        reports = self._build(teacher_id)
+        with self._lock:
+            self._reports[teacher_id] = (now + self.ttl, reports)
+        return reports
+
+    def invalidate(self, teacher_ids=None):
+        with self._lock:
+            if teacher_ids is None:
+                self._reports.clear()
+            for teacher_id in teacher_ids or ():
+                self._reports.pop(teacher_id, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': round(self.hits / total, 3) if total else 0.0,
+                'teachers': len(self._reports)
+            }
+
+    def _collect_changes(self, session, flush_context):
+        # Remember whose reports this transaction touches; drop them once it commits
+        quiz_ids, classroom_ids = set(), set()
+        for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+            if isinstance(obj, QuizResult):
+                quiz_ids.add(obj.quiz_id)
+            elif isinstance(obj, QuizAssignment):
+                classroom_ids.add(obj.classroom_id)
+            elif isinstance(obj, User):
+                history = db.inspect(obj).attrs.enrolled_classrooms.history
+                classroom_ids.update(c.id for c in history.added + history.deleted)
+            elif isinstance(obj, Classroom) and obj in session.dirty:
+                classroom_ids.add(obj.id)
+        if not (quiz_ids or classroom_ids):
+            return
+
+        teachers = session.info.setdefault('report_teachers', set())
+        for model, ids in ((Quiz, quiz_ids), (Classroom, classroom_ids)):
+            # Rows the request already loaded are in the identity map; query only the rest
+            missing = set()
+            for pk in ids:
+                obj = session.identity_map.get(db.inspect(model).identity_key_from_primary_key((pk,)))
+                if obj is None:
+                    missing.add(pk)
+                else:
+                    teachers.add(obj.teacher_id)
+            if missing:
+                teachers.update(session.connection().execute(
+                    select(model.teacher_id).where(model.id.in_(missing))
+                ).scalars())
+
+    def _invalidate_changed(self, session):
+        teachers = session.info.pop('report_teachers', None)
+        if teachers:
+            self.invalidate(teachers)
+
+    def _discard_changes(self, session):
+        session.info.pop('report_teachers', None)
+
+    def _build(self, teacher_id):
+        classrooms = {
+            row.id: {
+                'id': row.id, 'name': row.name, 'students': [], 'quizzes': [],
+                'student_count': 0, 'assigned_quizzes': 0
+            }
+            for row in db.session.execute(
+                select(Classroom.id, Classroom.name).where(Classroom.teacher_id == teacher_id).order_by(Classroom.name)
+            )
+        }
+        if not classrooms:
+            return []
+
+        # Per-student averages over the quizzes assigned to each classroom
+        per_student = db.session.execute(
+            select(
+                student_classroom.c.classroom_id, User.name,
+                func.avg(QuizResult.score).label('score'), func.count(QuizResult.id).label('completed')
+            )
+            .join(Classroom, Classroom.id == student_classroom.c.classroom_id)
+            .join(User, User.id == student_classroom.c.user_id)
+            .outerjoin(QuizAssignment, QuizAssignment.classroom_id == student_classroom.c.classroom_id)
+            .outerjoin(QuizResult, and_(
+                QuizResult.user_id == student_classroom.c.user_id,
+                QuizResult.quiz_id == QuizAssignment.quiz_id
+            ))
+            .where(Classroom.teacher_id == teacher_id)
+            .group_by(student_classroom.c.classroom_id, User.id, User.name)
+            .order_by(User.name)
+        )
+        for row in per_student:
+            classroom = classrooms[row.classroom_id]
+            classroom['students'].append({
+                'name': row.name,
+                'score': _round(row.score) if row.completed else '-',
+                'completed': row.completed
+            })
+            classroom['student_count'] += 1
+
+        quizzes = {}
+        for row in db.session.execute(
+            select(QuizAssignment.classroom_id, QuizAssignment.quiz_id, QuizAssignment.due_date, Quiz.title)
+            .join(Quiz, Quiz.id == QuizAssignment.quiz_id)
+            .join(Classroom, Classroom.id == QuizAssignment.classroom_id)
+            .where(Classroom.teacher_id == teacher_id)
+            .order_by(QuizAssignment.due_date)
+        ):
+            classroom = classrooms[row.classroom_id]
+            quiz = {'id': row.quiz_id, 'title': row.title, 'due_date': row.due_date}
+            quiz.update(_summary(None, classroom['student_count']))
+            classroom['quizzes'].append(quiz)
+            classroom['assigned_quizzes'] += 1
+            quizzes[(row.classroom_id, row.quiz_id)] = quiz
+        for classroom in classrooms.values():
+            classroom.update(_summary(None, classroom['student_count'] * classroom['assigned_quizzes']))
+
+        base = self._results(teacher_id)
+        for keys, target in (
+            ((base.c.classroom_id,), lambda row: classrooms[row.classroom_id]),
+            ((base.c.classroom_id, base.c.quiz_id), lambda row: quizzes[(row.classroom_id, row.quiz_id)]),
+        ):
+            for row in db.session.execute(self._aggregate(base, keys)):
+                entry = target(row)
+                entry.update(_summary(row, entry['expected']))
+            for row in db.session.execute(self._percentiles(base, keys)):
+                target(row)[f"p{row.percentile}"] = _round(row.score)
+
+        for classroom in classrooms.values():
+            for entry in [classroom] + classroom['quizzes']:
+                entry['median'] = entry.get('p50')
+        return list(classrooms.values())
+
+    @staticmethod
+    def _results(teacher_id):
+        """One row per result a student submitted for a quiz assigned to their classroom"""
+        return (
+            select(
+                student_classroom.c.classroom_id, QuizResult.quiz_id, QuizResult.score,
+                case(
+                    (and_(QuizAssignment.due_date.isnot(None), QuizResult.completed_date > QuizAssignment.due_date), 1),
+                    else_=0
+                ).label('late')
+            )
+            .select_from(QuizResult)
+            .join(student_classroom, student_classroom.c.user_id == QuizResult.user_id)
+            .join(QuizAssignment, and_(
+                QuizAssignment.classroom_id == student_classroom.c.classroom_id,
+                QuizAssignment.quiz_id == QuizResult.quiz_id
+            ))
+            .join(Classroom, Classroom.id == student_classroom.c.classroom_id)
+            .where(Classroom.teacher_id == teacher_id)
+            .subquery()
+        )
+
+    @staticmethod
+    def _aggregate(base, keys):
+        return select(
+            *keys,
+            func.count().label('submissions'),
+            func.avg(base.c.score).label('average'),
+            func.min(base.c.score).label('minimum'),
+            func.max(base.c.score).label('maximum'),
+            func.sum(base.c.late).label('late')
+        ).group_by(*keys)
+
+    @staticmethod
+    def _percentiles(base, keys):
+        # Nearest rank: the smallest rank r with r * 100 >= p * n, in integer arithmetic
+        ranked = select(
+            *keys, base.c.score,
+            func.row_number().over(partition_by=keys, order_by=base.c.score).label('rank'),
+            func.count().over(partition_by=keys).label('n')
+        ).subquery()
+        rows = [
+            select(
+                *(ranked.c[key.name] for key in keys),
+                literal_column(str(p)).label('percentile'),
+                ranked.c.score
+            ).where(
+                ranked.c.rank * 100 >= ranked.c.n * p,
+                (ranked.c.rank - 1) * 100 < ranked.c.n * p
+            )
+            for p in PERCENTILES
+        ]
+        return rows[0].union_all(*rows[1:])
+
+
+def _round(value):
+    return round(float(value), 1) if value is not None else None
+
+
+def _summary(row, expected):
+    """Headline figures for one group; ``row`` is None before any results arrive"""
+    submissions = row.submissions if row else 0
+    return {
+        'expected': expected,
+        'submissions': submissions,
+        'average_score': _round(row.average) if row else None,
+        'min_score': _round(row.minimum) if row else None,
+        'max_score': _round(row.maximum) if row else None,
+        'late_submissions': int(row.late or 0) if row else 0,
+        'completion_rate': round(100.0 * submissions / expected, 1) if expected else 0.0,
+        **({f"p{p}": None for p in PERCENTILES} if row is None else {})
+    }
+
+
+report_engine = ReportEngine()
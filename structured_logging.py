@@ -0,0 +1,125 @@
+"""Process-wide logging: JSON lines written off the request thread.
+
+``init_app`` replaces the root handlers with a QueueHandler. Request threads
+only put records on an in-memory queue; a QueueListener thread formats them
+and does the blocking write to stderr. Levels come from config:
+
+    LOG_LEVEL=INFO
+    LOG_LEVELS=ai_quiz_generator=DEBUG,werkzeug=WARNING
+    LOG_FORMAT=json            # or text
+
+Large payloads (prompts, raw model output, request bodies) go through
+``log_payload``. It logs to the ``<module>.payload`` child logger at DEBUG,
+and only for a LOG_PAYLOAD_SAMPLE_RATE fraction of calls. When DEBUG is off
+for that logger, the call costs one level check and formats nothing.
+"""
+import sys
+import copy
+import json
+import queue
+import atexit
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+# Attributes every LogRecord has; anything else was passed through ``extra``
+_RECORD_ATTRS = set(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime', 'taskName'}
+
+_listener = None
+_payload_sample_rate = 0.0
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, logger, message, any ``extra`` fields and exc"""
+
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'thread': record.threadName
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_ATTRS and not key.startswith('_'):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Merge the args now, since they may change after the call, but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def parse_levels(spec):
+    """'a=DEBUG,b.c=warning' -> {'a': 'DEBUG', 'b.c': 'WARNING'}"""
+    levels = {}
+    for item in (spec or '').split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def configure(level='INFO', levels=None, fmt='json', payload_sample_rate=0.0, stream=None):
+    """Route all logging through a queue to one stream handler; safe to call again"""
+    global _listener, _payload_sample_rate
+    _stop()
+
+    handler = logging.StreamHandler(stream or sys.stderr)
+    handler.setFormatter(JsonFormatter() if fmt == 'json' else logging.Formatter(TEXT_FORMAT))
+    records = queue.SimpleQueue()
+    _listener = logging.handlers.QueueListener(records, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(_QueueHandler(records))
+    root.setLevel(level.upper())
+    for name, module_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(module_level)
+
+    _payload_sample_rate = payload_sample_rate
+    _listener.start()
+
+
+def init_app(app):
+    configure(
+        level=app.config.get('LOG_LEVEL', 'INFO'),
+        levels=parse_levels(app.config.get('LOG_LEVELS')),
+        fmt=app.config.get('LOG_FORMAT', 'json'),
+        payload_sample_rate=app.config.get('LOG_PAYLOAD_SAMPLE_RATE', 0.0)
+    )
+    app.extensions['structured_logging'] = _listener
+
+
+def payload_logger(name):
+    return logging.getLogger(f"{name}.payload")
+
+
+def log_payload(logger, msg, *args):
+    """Log a large payload at DEBUG for a sample of calls; pass it as args so skipped calls format nothing"""
+    if _payload_sample_rate and logger.isEnabledFor(logging.DEBUG) and random.random() < _payload_sample_rate:
+        logger.debug(msg, *args)
+
+
+def _stop():
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(_stop)
@@ -0,0 +1,175 @@
+"""Keeps the student dashboard read model in step with the tables it summarises.
+
+``student_quiz_summary`` holds one row per quiz assigned to a student and
+``student_summary`` the totals the dashboard shows. A session ``after_flush``
+hook updates both inside the transaction that changed the source rows:
+
+* a new QuizResult marks its row completed and bumps the totals in place;
+* a created, changed or deleted QuizAssignment rebuilds that quiz's rows
+  for the students of the classroom;
+* enrolment changes rebuild the affected students;
+* quiz title/description edits and added/removed questions patch the
+  denormalised columns.
+"""
+import logging
+from sqlalchemy import text, bindparam
+from database import listen_once
+from models import (
+    db, User, Classroom, Quiz, Question, QuizResult, QuizAssignment
+)
+
+logger = logging.getLogger(__name__)
+
+# Canonical rows for the (student, quiz) pairs matched by {where}
+INSERT_ROWS = """
+    INSERT INTO student_quiz_summary (
+        user_id, quiz_id, quiz_title, quiz_description, question_count,
+        due_date, result_id, score, completed_date
+    )
+    SELECT a.user_id, a.quiz_id, q.title, q.description,
+           (SELECT COUNT(*) FROM question qn WHERE qn.quiz_id = q.id),
+           a.due_date, r.id, r.score, r.completed_date
+    FROM (
+        SELECT sc.user_id AS user_id, qa.quiz_id AS quiz_id, MIN(qa.due_date) AS due_date
+        FROM student_classroom sc
+        JOIN quiz_assignments qa ON qa.classroom_id = sc.classroom_id
+        WHERE {where}
+        GROUP BY sc.user_id, qa.quiz_id
+    ) a
+    JOIN quiz q ON q.id = a.quiz_id
+    LEFT JOIN quiz_result r ON r.user_id = a.user_id AND r.quiz_id = a.quiz_id
+"""
+
+INSERT_TOTALS = """
+    INSERT INTO student_summary (user_id, available_count, completed_count, score_total)
+    SELECT user_id,
+           SUM(CASE WHEN result_id IS NULL THEN 1 ELSE 0 END),
+           COUNT(result_id),
+           COALESCE(SUM(score), 0)
+    FROM student_quiz_summary
+    WHERE {where}
+    GROUP BY user_id
+"""
+
+CLASSROOM_STUDENTS = "SELECT user_id FROM student_classroom WHERE classroom_id = :classroom_id"
+
+
+def init_app(app):
+    # The session is shared by every app in the process; a second create_app must not rebuild twice
+    listen_once(db.session, 'after_flush', _after_flush)
+
+
+def rebuild(conn, student_ids=None):
+    """Rebuild rows and totals for the given students, or for everyone"""
+    if student_ids is None:
+        conn.execute(text("DELETE FROM student_quiz_summary"))
+        conn.execute(text("DELETE FROM student_summary"))
+        conn.execute(text(INSERT_ROWS.format(where='1 = 1')))
+        conn.execute(text(INSERT_TOTALS.format(where='1 = 1')))
+        return
+    if not student_ids:
+        return
+
+    params = {'ids': list(student_ids)}
+
+    def run(sql):
+        conn.execute(text(sql).bindparams(bindparam('ids', expanding=True)), params)
+
+    run("DELETE FROM student_quiz_summary WHERE user_id IN :ids")
+    run(INSERT_ROWS.format(where='sc.user_id IN :ids'))
+    _rebuild_totals(conn, 'user_id IN :ids', params, expanding=True)
+
+
+def refresh_assignment(conn, quiz_id, classroom_id):
+    """Re-derive one quiz's rows for every student in the classroom"""
+    params = {'quiz_id': quiz_id, 'classroom_id': classroom_id}
+    conn.execute(text(
+        f"DELETE FROM student_quiz_summary WHERE quiz_id = :quiz_id AND user_id IN ({CLASSROOM_STUDENTS})"
+    ), params)
+    conn.execute(text(INSERT_ROWS.format(
+        where=f"qa.quiz_id = :quiz_id AND sc.user_id IN ({CLASSROOM_STUDENTS})"
+    )), params)
+    _rebuild_totals(conn, f"user_id IN ({CLASSROOM_STUDENTS})", params)
+
+
+def record_result(conn, result):
+    """Mark a pending row completed and fold the score into the running totals"""
+    marked = conn.execute(text(
+        "UPDATE student_quiz_summary SET result_id = :id, score = :score, completed_date = :completed_date "
+        "WHERE user_id = :user_id AND quiz_id = :quiz_id AND result_id IS NULL"
+    ), {
+        'id': result.id, 'score': result.score, 'completed_date': result.completed_date,
+        'user_id': result.user_id, 'quiz_id': result.quiz_id
+    })
+    if not marked.rowcount:
+        return  # Quiz is not assigned to this student (or already counted)
+    conn.execute(text(
+        "UPDATE student_summary SET available_count = available_count - 1, "
+        "completed_count = completed_count + 1, score_total = score_total + :score "
+        "WHERE user_id = :user_id"
+    ), {'score': result.score, 'user_id': result.user_id})
+
+
+def _rebuild_totals(conn, where, params, expanding=False):
+    for sql in (f"DELETE FROM student_summary WHERE {where}", INSERT_TOTALS.format(where=where)):
+        statement = text(sql)
+        if expanding:
+            statement = statement.bindparams(bindparam('ids', expanding=True))
+        conn.execute(statement, params)
+
+
+def _changed(obj, *attrs):
+    state = db.inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _after_flush(session, flush_context):
+    students, assignments, results, quizzes = set(), set(), [], set()
+    touched_quizzes = set()
+
+    for obj in session.new:
+        if isinstance(obj, QuizResult):
+            results.append(obj)
+        elif isinstance(obj, QuizAssignment):
+            assignments.add((obj.quiz_id, obj.classroom_id))
+        elif isinstance(obj, Question):
+            touched_quizzes.add(obj.quiz_id)
+        elif isinstance(obj, User) and _changed(obj, 'enrolled_classrooms'):
+            students.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, QuizAssignment) and _changed(obj, 'due_date'):
+            assignments.add((obj.quiz_id, obj.classroom_id))
+        elif isinstance(obj, User) and _changed(obj, 'enrolled_classrooms'):
+            students.add(obj.id)
+        elif isinstance(obj, Classroom) and _changed(obj, 'students'):
+            history = db.inspect(obj).attrs.students.history
+            students.update(user.id for user in history.added + history.deleted)
+        elif isinstance(obj, Quiz) and _changed(obj, 'title', 'description'):
+            quizzes.add(obj)
+    for obj in session.deleted:
+        if isinstance(obj, QuizAssignment):
+            assignments.add((obj.quiz_id, obj.classroom_id))
+        elif isinstance(obj, Question):
+            touched_quizzes.add(obj.quiz_id)
+
+    if not (students or assignments or results or quizzes or touched_quizzes):
+        return
+
+    conn = session.connection()
+    # Full rebuilds first: they already include any result from this flush,
+    # which record_result then skips because the row is no longer pending
+    rebuild(conn, students)
+    for quiz_id, classroom_id in assignments:
+        refresh_assignment(conn, quiz_id, classroom_id)
+    for quiz in quizzes:
+        conn.execute(text(
+            "UPDATE student_quiz_summary SET quiz_title = :title, quiz_description = :description "
+            "WHERE quiz_id = :quiz_id"
+        ), {'title': quiz.title, 'description': quiz.description, 'quiz_id': quiz.id})
+    for quiz_id in touched_quizzes:
+        conn.execute(text(
+            "UPDATE student_quiz_summary SET question_count = "
+            "(SELECT COUNT(*) FROM question WHERE quiz_id = :quiz_id) WHERE quiz_id = :quiz_id"
+        ), {'quiz_id': quiz_id})
+    for result in results:
+        record_result(conn, result)
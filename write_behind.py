@@ -0,0 +1,186 @@
+import os
+import json
+import time
+import uuid
+import atexit
+import logging
+import threading
+from collections import deque
+
+try:
+    import fcntl
+except ImportError:  # Windows: spools are not shared between processes
+    fcntl = None
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindQueue:
+    """Buffers question bank rows in memory and writes them in large batches.
+
+    Every enqueued row is also appended to a spool file unique to this queue,
+    so rows survive a crash or restart. Spools left behind by dead processes
+    are adopted on startup (a live process keeps an flock on its own spool).
+    A background thread flushes when ``batch_size`` rows are waiting or
+    ``flush_interval`` seconds have passed, retrying with backoff while the
+    bank is unavailable.
+    """
+
+    def __init__(self, bank, batch_size=500, flush_interval=2.0, max_queue=10000,
+                 spool_dir=None, max_backoff=60.0, save=None, name='question-writer'):
+        self.bank = bank
+        # Anything with the save_questions(rows) -> (success, error) contract can be the sink
+        self.save = save or bank.save_questions
+        self.name = name
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.spool_dir = spool_dir
+        self.max_backoff = max_backoff
+
+        self._rows = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread = None
+        self._spool = None
+        self._spool_name = None
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error = None
+        self.last_flush_at = None
+
+    def init_app(self, app):
+        config = app.config
+        self.batch_size = config.get('QUESTION_WRITER_BATCH_SIZE', self.batch_size)
+        self.flush_interval = config.get('QUESTION_WRITER_FLUSH_INTERVAL', self.flush_interval)
+        self.max_queue = config.get('QUESTION_WRITER_MAX_QUEUE', self.max_queue)
+        self.spool_dir = config.get('QUESTION_WRITER_SPOOL_DIR', self.spool_dir)
+        app.extensions['question_writer'] = self
+        self.start()
+
+    def start(self):
+        if self.spool_dir:
+            os.makedirs(self.spool_dir, exist_ok=True)
+            self._open_spool()
+            self._adopt_orphaned_spools()
+
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        atexit.register(self.stop)
+
+    def enqueue(self, rows):
+        """Queue rows for the bank; returns False (and counts a rejection) when full"""
+        rows = [tuple(row) for row in rows]
+        with self._cond:
+            if len(self._rows) + len(rows) > self.max_queue:
+                self.rejected += len(rows)
+                logger.warning(f"{self.name} queue full; rejected {len(rows)} rows")
+                return False
+            self._append_spool(rows)
+            self._rows.extend(rows)
+            self.enqueued += len(rows)
+            if len(self._rows) >= self.batch_size:
+                self._cond.notify()
+        return True
+
+    def stats(self):
+        with self._cond:
+            return {
+                'queued': len(self._rows),
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'batches': self.batches,
+                'failures': self.failures,
+                'rejected': self.rejected,
+                'last_error': self.last_error,
+                'last_flush_at': self.last_flush_at
+            }
+
+    def stop(self, timeout=5):
+        with self._cond:
+            self._stopping = True
+            self._cond.notify()
+        if self._thread:
+            self._thread.join(timeout)
+
+    def _run(self):
+        backoff = self.flush_interval
+        while True:
+            with self._cond:
+                if not self._stopping and len(self._rows) < self.batch_size:
+                    self._cond.wait(backoff)
+                if self._stopping and not self._rows:
+                    return
+                batch = [self._rows[i] for i in range(min(self.batch_size, len(self._rows)))]
+            if not batch:
+                continue
+
+            success, error = self.save(batch)
+            with self._cond:
+                if success:
+                    for _ in batch:
+                        self._rows.popleft()
+                    self.flushed += len(batch)
+                    self.batches += 1
+                    self.last_flush_at = time.time()
+                    self._rewrite_spool()
+                    backoff = self.flush_interval
+                else:
+                    self.failures += 1
+                    self.last_error = error
+                    backoff = min(backoff * 2, self.max_backoff)
+                    logger.warning(f"{self.name} flush failed, retrying in {backoff:.1f}s: {error}")
+                    if self._stopping:
+                        # Rows stay in the spool and are adopted by the next process
+                        return
+
+    def _open_spool(self):
+        # pid plus a random suffix: a restarted process that reuses a pid must not reopen an orphan as its own
+        self._spool_name = f"spool-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"
+        self._spool = open(os.path.join(self.spool_dir, self._spool_name), 'a+', encoding='utf-8')
+        if fcntl:
+            fcntl.flock(self._spool.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+    def _adopt_orphaned_spools(self):
+        for name in sorted(os.listdir(self.spool_dir)):
+            path = os.path.join(self.spool_dir, name)
+            if name == self._spool_name or not name.endswith('.jsonl'):
+                continue
+            try:
+                f = open(path, 'r', encoding='utf-8')
+            except FileNotFoundError:
+                continue  # Adopted by another worker starting at the same time
+            with f:
+                if fcntl:
+                    try:
+                        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    except OSError:
+                        continue  # Owned by a live process
+                if not os.path.exists(path):
+                    continue  # Another worker replayed and removed it before we got the lock
+                rows = [tuple(json.loads(line)) for line in f if line.strip()]
+                with self._cond:
+                    self._append_spool(rows)
+                    self._rows.extend(rows)
+                os.remove(path)
+            if rows:
+                logger.info(f"{self.name} recovered {len(rows)} unsaved rows from {name}")
+
+    def _append_spool(self, rows):
+        if not self._spool:
+            return
+        self._spool.write(''.join(json.dumps(row) + '\n' for row in rows))
+        self._spool.flush()
+        os.fsync(self._spool.fileno())
+
+    def _rewrite_spool(self):
+        # Compact the spool down to the rows that are still pending
+        if not self._spool:
+            return
+        self._spool.seek(0)
+        self._spool.truncate()
+        self._append_spool(list(self._rows))